@@ -1,7 +1,12 @@
+import csv
 from django.contrib import admin
+from django.http import HttpResponse
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
+from .forms import RoleUserCreationForm
 from .models import User, Profile, CustomerProfile, DeletedUser
+from .provisioning import provision_user
+from .whatsapp import WELCOME_CSV_HEADERS, welcome_csv_row, welcome_links
 
 class ProfileInline(admin.StackedInline):
     model = Profile
@@ -24,6 +29,7 @@ class CustomUserAdmin(UserAdmin):
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'is_deleted', 'groups')
     search_fields = ('username', 'email', 'first_name', 'last_name')
     ordering = ('-date_joined',)
+    actions = ['export_whatsapp_welcome_links']
     
     fieldsets = (
         (None, {'fields': ('username', 'password')}),
@@ -35,15 +41,35 @@ class CustomUserAdmin(UserAdmin):
         (_('Status'), {'fields': ('is_deleted',)}),
     )
     
+    add_form = RoleUserCreationForm
     add_fieldsets = (
         (None, {
             'classes': ('wide',),
-            'fields': ('username', 'email', 'password1', 'password2', 'first_name', 'last_name'),
+            'fields': ('username', 'email', 'password1', 'password2', 'first_name', 'last_name', 'role'),
         }),
     )
     
     readonly_fields = ('deleted_at', 'last_login', 'date_joined')
     
+    def save_model(self, request, obj, form, change):
+        if change:
+            return super().save_model(request, obj, form, change)
+        # New users go through the provisioning service so they get the group and profile of their role
+        user, _ = provision_user(
+            form.cleaned_data['role'],
+            username=obj.username,
+            email=obj.email,
+            first_name=obj.first_name,
+            last_name=obj.last_name,
+            password=form.cleaned_data['password1'],
+            password_hash=obj.password,  # already hashed by the form
+        )
+        obj.pk = user.pk
+        obj.is_superuser = user.is_superuser
+        obj.is_staff = user.is_staff
+        obj._state.adding = False
+        obj._state.db = user._state.db
+
     def get_inline_instances(self, request, obj=None):
         # Only show inlines when editing an existing object
         if not obj:
@@ -74,6 +100,16 @@ class CustomUserAdmin(UserAdmin):
         return "-"
     get_press_name.short_description = 'Press Name'
 
+    @admin.action(description='Download WhatsApp welcome links (CSV)')
+    def export_whatsapp_welcome_links(self, request, queryset):
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="whatsapp_welcome_links.csv"'
+        writer = csv.writer(response)
+        writer.writerow(WELCOME_CSV_HEADERS)
+        for entry in welcome_links(queryset):
+            writer.writerow(welcome_csv_row(entry))
+        return response
+
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
@@ -94,6 +130,9 @@ class DeletedUserAdmin(admin.ModelAdmin):
     list_display = ['username', 'email', 'role', 'deleted_at', 'deleted_reason']
     list_filter = ['deleted_at', 'role']
     search_fields = ['username', 'email', 'first_name', 'last_name', 'deleted_reason']
+    # Matches the (deleted_at, id) indexes; skip the unfiltered COUNT(*) on every page
+    ordering = ['-deleted_at', '-id']
+    show_full_result_count = False
     readonly_fields = [
         'original_id', 'username', 'email', 'first_name', 
         'last_name', 'date_joined', 'deleted_at', 'unique_deleted_id'
@@ -0,0 +1,69 @@
+# accounts/async_views.py
+# Async variants of the export, listing and JSON views, routed instead of
+# the ones in views.py when settings.ASYNC_VIEWS is on (the ASGI entry
+# point turns it on). Database reads are awaited and files are streamed
+# without holding a worker thread.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import JsonResponse
+from django.shortcuts import render
+from core.replica import use_replica
+from core.streaming import stream_file_async
+from .conditional import all_users_etag, all_users_last_modified, conditional_page, export_etag
+from .exports import export_response
+from .models import User
+from .recycle_bin import arecycle_bin_page, entry_json, filter_recycle_bin
+from .views import is_admin
+
+
+@login_required
+@conditional_page(all_users_etag, all_users_last_modified)
+async def all_users(request):
+    """Display list of all users"""
+    users = [
+        user async for user in User.objects.live().select_related('account_profile', 'customer_profile')
+    ]
+    viewer = await request.auser()
+
+    context = {
+        "all_users": users,
+        "first_name": viewer.first_name,
+    }
+    # Context processors read request.user and the session synchronously
+    return await sync_to_async(render)(request, "accounts/all_users.html", context)
+
+
+@login_required
+@user_passes_test(is_admin)
+async def recycle_bin_json(request):
+    """JSON listing of the recycle bin with the same filters and cursor as the page"""
+    try:
+        entries = filter_recycle_bin(request.GET)
+        deleted_users, next_cursor = await arecycle_bin_page(entries, request.GET.get("after"))
+    except ValueError as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    return JsonResponse({
+        "success": True,
+        "results": [entry_json(entry) for entry in deleted_users],
+        "next": next_cursor,
+    })
+
+
+@login_required
+@user_passes_test(is_admin)
+@use_replica
+@conditional_page(export_etag, all_users_last_modified)
+async def download_excel(request):
+    """Export users to Excel"""
+    # Building a missing cache file is synchronous (openpyxl), so it runs in the sync thread
+    return stream_file_async(await sync_to_async(export_response)(request, "users_excel"))
+
+
+@login_required
+@user_passes_test(is_admin)
+@use_replica
+@conditional_page(export_etag, all_users_last_modified)
+async def download_pdf(request):
+    """Export users to PDF"""
+    return stream_file_async(await sync_to_async(export_response)(request, "users_pdf"))
@@ -0,0 +1,115 @@
+# accounts/conditional.py
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import versioning
+from .exports import data_version
+from .models import User, Profile, CustomerProfile, DeletedUser
+
+USER_DATA = (versioning.USERS, versioning.PROFILES, versioning.CUSTOMER_PROFILES, versioning.GROUPS)
+
+
+def latest_update(*models):
+    """Newest updated_at across the given models (one indexed MAX per model)"""
+    latest = [model.objects.aggregate(latest=Max('updated_at'))['latest'] for model in models]
+    latest = [value for value in latest if value]
+    return max(latest) if latest else None
+
+
+def page_etag(request, *names):
+    """
+    ETag for a rendered page: the data it shows, who is viewing it and the
+    CSRF secret embedded in its forms, so a 304 never revives a stale token.
+    """
+    csrf = hashlib.sha1(request.META.get("CSRF_COOKIE", "").encode()).hexdigest()[:8]
+    return f"{versioning.version_stamp(*names)}-{request.user.pk}-{csrf}"
+
+
+def all_users_etag(request, *args, **kwargs):
+    return page_etag(request, *USER_DATA)
+
+
+def all_users_last_modified(request, *args, **kwargs):
+    return latest_update(User, Profile, CustomerProfile)
+
+
+def recycle_bin_etag(request, *args, **kwargs):
+    return page_etag(request, versioning.DELETED_USERS, versioning.USERS)
+
+
+def recycle_bin_last_modified(request, *args, **kwargs):
+    return latest_update(DeletedUser)
+
+
+def export_etag(request, *args, **kwargs):
+    # Same stamp the export cache files are named by
+    return data_version()
+
+
+def has_pending_messages(request):
+    # len() looks at the stored messages without marking them as shown
+    return len(messages.get_messages(request)) > 0
+
+
+def conditional_page(etag_func, last_modified_func):
+    """
+    condition() plus Cache-Control: private, no-cache, so browsers and proxies
+    always revalidate and get a 304 when nothing changed, but never share
+    these pages between users. A page with flash messages waiting is always
+    rendered (and sent without validators): a 304 would leave them queued
+    for some later page.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return async_conditional_page(view, etag_func, last_modified_func)
+
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if has_pending_messages(request):
+                response = view(request, *args, **kwargs)
+            else:
+                response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def async_conditional_page(view, etag_func, last_modified_func):
+    """
+    conditional_page for async views. condition() would call the ETag and
+    Last-Modified functions (database queries) on the event loop, so it
+    runs in a thread around a placeholder view instead; the real view is
+    awaited only when the placeholder comes back, i.e. no 304/412.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        placeholder = HttpResponse()
+        conditional_check = condition(etag_func=etag_func, last_modified_func=last_modified_func)(
+            lambda *a, **kw: placeholder
+        )
+
+        def check(request, *args, **kwargs):
+            # Loading the messages may read the session, so it is done here too
+            if has_pending_messages(request):
+                return placeholder
+            return conditional_check(request, *args, **kwargs)
+
+        response = await sync_to_async(check)(request, *args, **kwargs)
+        if response is placeholder:
+            response = await view(request, *args, **kwargs)
+            for header in ("ETag", "Last-Modified"):
+                if header in placeholder and header not in response:
+                    response[header] = placeholder[header]
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
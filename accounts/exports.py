@@ -0,0 +1,242 @@
+# accounts/exports.py
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import openpyxl
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
+
+from core.streaming import stream_queryset
+
+from .models import User
+from .versioning import CUSTOMER_PROFILES, GROUPS, PROFILES, USERS, version_stamp
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to per-process locking only
+    fcntl = None
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+USER_PDF_ROWS_PER_TABLE = 500
+
+USER_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0,0), (-1,0), colors.grey),
+    ("TEXTCOLOR", (0,0), (-1,0), colors.whitesmoke),
+    ("ALIGN", (0,0), (-1,-1), "CENTER"),
+    ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
+    ("BOTTOMPADDING", (0,0), (-1,-0), 12),
+    ("BACKGROUND", (0,1), (-1,-1), colors.beige),
+    ("GRID", (0,0), (-1,-1), 1, colors.black),
+])
+
+
+def export_users():
+    """Live users with both profiles and their groups, streamed in chunks"""
+    users = (
+        User.objects.live()
+        .select_related('account_profile', 'customer_profile')
+        .prefetch_related('groups')
+        .order_by('id')
+    )
+    return stream_queryset(users)
+
+
+def export_role(user):
+    """Role column; expects groups to be prefetched"""
+    if user.is_superuser:
+        return "Admin"
+    groups = list(user.groups.all())
+    if groups:
+        return min(groups, key=lambda group: group.pk).name
+    return "User"
+
+
+def user_profile(user):
+    if hasattr(user, 'account_profile'):
+        return user.account_profile
+    elif hasattr(user, 'customer_profile'):
+        return user.customer_profile
+    return None
+
+
+def write_users_excel(output):
+    """Write the user list as an Excel workbook to a binary file object"""
+    # write_only streams rows to disk instead of keeping every cell in memory
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Users")
+
+    headers = ["First Name", "Last Name", "Username", "Email", "Password", "Role", "WhatsApp", "Press Name", "Status"]
+    ws.append(headers)
+
+    for user in export_users():
+        profile = user_profile(user)
+        whatsapp = profile.whatsapp_number if profile else None
+        password = profile.raw_password if profile else None
+        press_name = profile.press_name if profile else None
+
+        status = "Active" if not user.is_deleted else "Deleted"
+
+        ws.append([
+            user.first_name,
+            user.last_name,
+            user.username,
+            user.email,
+            password or "-",
+            export_role(user),
+            whatsapp or "-",
+            press_name or "-",
+            status
+        ])
+
+    wb.save(output)
+
+
+def write_users_pdf(output):
+    """Write the user list as a PDF table to a binary file object"""
+    doc = SimpleDocTemplate(output, pagesize=letter)
+    styles = getSampleStyleSheet()
+    elements = [Paragraph("User List", styles["Title"])]
+
+    headers = ["First Name", "Last Name", "Username", "Email", "Password", "Role", "Status"]
+    data = [headers]
+
+    # Many small tables instead of one: splitting a single huge Table across
+    # pages re-measures the remaining rows on every page break
+    for user in export_users():
+        profile = user_profile(user)
+        password = profile.raw_password if profile else None
+        status = "Active" if not user.is_deleted else "Deleted"
+
+        data.append([
+            user.first_name,
+            user.last_name,
+            user.username,
+            user.email,
+            password or "-",
+            export_role(user),
+            status
+        ])
+        if len(data) > USER_PDF_ROWS_PER_TABLE:
+            elements.append(Table(data, style=USER_TABLE_STYLE, repeatRows=1))
+            data = [headers]
+
+    if len(data) > 1 or len(elements) == 1:
+        elements.append(Table(data, style=USER_TABLE_STYLE, repeatRows=1))
+    doc.build(elements)
+
+
+# Export type -> (builder, file extension, content type, download name)
+EXPORTS = {
+    "users_excel": (
+        write_users_excel, "xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "users.xlsx",
+    ),
+    "users_pdf": (write_users_pdf, "pdf", "application/pdf", "users.pdf"),
+}
+
+
+def cache_root():
+    root = settings.EXPORT_CACHE_ROOT
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def data_version():
+    """Stamp that changes whenever users, profiles or groups change"""
+    return version_stamp(USERS, PROFILES, CUSTOMER_PROFILES, GROUPS)
+
+
+@contextmanager
+def build_lock(export_type):
+    """
+    Exclusive lock per export type. flock() locks belong to the open file
+    description, so this blocks other threads and other worker processes.
+    """
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(export_type, threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(cache_root() / f"{export_type}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def cached_export(export_type):
+    """
+    Path of the export for the current data version, building it if needed.
+    Concurrent requests for the same export wait for a single build instead
+    of each rebuilding it.
+    """
+    builder, extension, _, _ = EXPORTS[export_type]
+    version = data_version()
+    path = cache_root() / f"{export_type}-{version}.{extension}"
+    if path.exists():
+        return path
+
+    with build_lock(export_type):
+        # Another request may have finished the build while we waited
+        if path.exists():
+            return path
+
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as output:
+            builder(output)
+        os.replace(tmp_path, path)
+
+        for old in cache_root().glob(f"{export_type}-*.{extension}"):
+            if old != path:
+                old.unlink(missing_ok=True)
+    return path
+
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def export_response(request, export_type):
+    """Serve a cached export, honouring a single-range Range header"""
+    path = cached_export(export_type)
+    _, _, content_type, filename = EXPORTS[export_type]
+    size = path.stat().st_size
+
+    match = RANGE_RE.match(request.headers.get("Range", "").strip())
+    if not match or match.groups() == ("", ""):
+        response = FileResponse(open(path, "rb"), as_attachment=True, filename=filename, content_type=content_type)
+        response["Accept-Ranges"] = "bytes"
+        return response
+
+    start, end = match.groups()
+    if start:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    else:  # suffix range: the last N bytes
+        start = max(size - int(end), 0)
+        end = size - 1
+
+    if start >= size or start > end:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        content = f.read(end - start + 1)
+
+    response = HttpResponse(content, status=206, content_type=content_type)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
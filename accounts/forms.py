@@ -1,25 +1,27 @@
 # accounts/forms.py
 
 from django import forms
-from django.contrib.auth.models import Group
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from django.contrib.auth import get_user_model
-import random, string, secrets
 from .models import Profile, CustomerProfile, STAFF_TYPES, CUSTOMER_TYPES
+from .provisioning import ROLES, provision_user
+from .whatsapp import login_link
 
 User = get_user_model()
 
-# Helper function to generate passwords, which was in views.py
-def generate_password(length=12):
-    """Generate a random password with mixed characters"""
-    chars = string.ascii_letters + string.digits + "!@#$%^&*"
-    return ''.join(secrets.choice(chars) for _ in range(length))
-
 class CustomUserCreationForm(UserCreationForm):
     class Meta:
         model = User
         fields = ("username", "email", "password1", "password2")
 
+class RoleUserCreationForm(UserCreationForm):
+    """Admin "add user" form; the role decides the group and profile type"""
+    role = forms.ChoiceField(choices=[(role, role) for role in ROLES], initial="Customer", label="Role")
+
+    class Meta(UserCreationForm.Meta):
+        model = User
+        fields = ("username", "email", "first_name", "last_name")
+
 class UserCreateForm(forms.ModelForm):
     whatsapp_number = forms.CharField(max_length=20, required=False, label="WhatsApp Number")
     press_name = forms.CharField(max_length=100, required=False, label="Press Name")
@@ -60,62 +62,17 @@ class UserCreateForm(forms.ModelForm):
 
     def save(self, commit=True):
         role = self.cleaned_data.get("role")
-        first_name = self.cleaned_data.get("first_name")
-        last_name = self.cleaned_data.get("last_name")
-        email = self.cleaned_data.get("email")
-        whatsapp_number = self.cleaned_data.get("whatsapp_number")
-        press_name = self.cleaned_data.get("press_name")
-        customer_type = self.cleaned_data.get("customer_type")
-        staff_type = self.cleaned_data.get("staff_type")
-
-        prefix = {"Admin": "ADMIN", "Staff": "STAFF", "Customer": "AOP"}[role]
-        last_user = User.objects.filter(username__startswith=prefix).order_by("-id").first()
-        if last_user:
-            digits = "".join(filter(str.isdigit, last_user.username))
-            last_number = int(digits) if digits else 0
-        else:
-            last_number = 0
-        
-        username = f"{prefix}{str(last_number + 1).zfill(3 if role != 'Customer' else 4)}"
-        
-        raw_password = generate_password()
-
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            first_name=first_name,
-            last_name=last_name,
-            password=raw_password
+        user, raw_password = provision_user(
+            role,
+            first_name=self.cleaned_data.get("first_name"),
+            last_name=self.cleaned_data.get("last_name"),
+            email=self.cleaned_data.get("email"),
+            whatsapp_number=self.cleaned_data.get("whatsapp_number"),
+            press_name=self.cleaned_data.get("press_name"),
+            customer_type=self.cleaned_data.get("customer_type") if role == "Customer" else None,
+            staff_type=self.cleaned_data.get("staff_type") if role != "Customer" else None,
         )
-        
-        if role == "Admin":
-            user.is_superuser = True
-            user.is_staff = True
-            user.save()
-        else:
-            group, _ = Group.objects.get_or_create(name=role)
-            user.groups.add(group)
-            
-        if hasattr(user, 'account_profile') and role != 'Customer':
-            profile = user.account_profile
-            profile.whatsapp_number = whatsapp_number
-            profile.press_name = press_name
-            profile.raw_password = raw_password
-            profile.staff_type = staff_type
-            profile.save()
-        elif hasattr(user, 'customer_profile') and role == 'Customer':
-            profile = user.customer_profile
-            profile.whatsapp_number = whatsapp_number
-            profile.press_name = press_name
-            profile.raw_password = raw_password
-            profile.customer_type = customer_type
-            profile.save()
-
-        from django.contrib.sites.models import Site
-        current_site = Site.objects.get_current()
-        login_link = f"http://{current_site.domain}/accounts/login/"
-        
-        return user, raw_password, login_link
+        return user, raw_password, login_link()
 
 class UserEditForm(forms.ModelForm):
     whatsapp_number = forms.CharField(max_length=20, required=False, label="WhatsApp Number")
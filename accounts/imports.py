@@ -0,0 +1,308 @@
+# accounts/imports.py
+# Reading and checking the user upload sheet. Validation runs on whole
+# columns of a DataFrame, with one query per kind of collision, so a
+# dry run reports on every row before anything is written.
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from core.uploads import open_csv_bytes, upload_format
+
+from . import versioning
+from .models import CustomerProfile, Profile, User
+from .provisioning import SPEC_FIELDS
+
+# Columns of the upload sheet, in order; extra columns are ignored
+SHEET_COLUMNS = ["first_name", "last_name", "email", "whatsapp_number"]
+# Further columns recognised by their header ("Press Name", "customer_id", ...)
+OPTIONAL_COLUMNS = ["press_name", "customer_id", "username"]
+
+# Fields an upsert may change, by the model that stores them
+USER_FIELDS = ["first_name", "last_name", "email"]
+PROFILE_FIELDS = ["whatsapp_number", "press_name"]
+
+COLUMN_LIMITS = {
+    **{column: SPEC_FIELDS[column] for column in SHEET_COLUMNS + ["press_name"]},
+    "customer_id": CustomerProfile._meta.get_field("customer_id").max_length,
+    "username": User._meta.get_field("username").max_length,
+}
+
+# Close to Django's EmailValidator for the addresses people actually type
+EMAIL_PATTERN = r"[A-Za-z0-9.!#$%&'*+/=?^_`{|}~-]+@(?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+[A-Za-z]{2,63}"
+
+# Ids per query when fetching current values
+FETCH_CHUNK_SIZE = 2000
+
+
+def read_user_sheet(file):
+    """
+    An XLSX (first sheet), CSV or gzip-CSV upload as a DataFrame of
+    stripped strings ("" for empty cells)
+    """
+    if upload_format(file) == "csv":
+        # pandas' C parser reads the stream in blocks, like csv_rows, but builds the columns directly
+        sheet = pd.read_csv(open_csv_bytes(file), header=0, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    else:
+        sheet = pd.read_excel(file, header=0, dtype=str, engine="openpyxl")
+    frame = sheet.iloc[:, :len(SHEET_COLUMNS)]
+    frame.columns = SHEET_COLUMNS[:len(frame.columns)]
+    frame = frame.reindex(columns=SHEET_COLUMNS)
+    for header in sheet.columns[len(SHEET_COLUMNS):]:
+        name = str(header).strip().lower().replace(" ", "_")
+        if name in OPTIONAL_COLUMNS and name not in frame:
+            frame[name] = sheet[header]
+    frame = frame.reindex(columns=SHEET_COLUMNS + OPTIONAL_COLUMNS).fillna("")
+    for column in frame.columns:
+        frame[column] = frame[column].str.strip()
+    # Whole numbers typed into a cell come back as "9876543210.0"
+    frame["whatsapp_number"] = frame["whatsapp_number"].str.replace(r"\.0$", "", regex=True)
+    # Spreadsheet row numbers, counting the header as row 1
+    frame.index = pd.RangeIndex(2, len(frame) + 2, name="row")
+    return frame
+
+
+def owners(pairs, columns):
+    """DataFrame of (value, user_id) pairs from a values_list query"""
+    return pd.DataFrame(list(pairs), columns=columns).drop_duplicates()
+
+
+def taken_by_others(frame, column, pairs):
+    """Rows whose value in column belongs to a user other than the row's match"""
+    owned = frame[[column, "user_id"]].reset_index().merge(pairs, on=column, suffixes=("", "_owner"))
+    clash = owned[owned["user_id_owner"] != owned["user_id"]]
+    return frame.index.isin(clash["row"]) & (frame[column] != "")
+
+
+def split_deleted(pairs):
+    """(live, deleted) owners from pairs that carry an is_deleted column"""
+    deleted = pairs["is_deleted"].astype(bool)
+    return pairs[~deleted], pairs[deleted]
+
+
+def unique_owner(values, pairs, column):
+    """Map each value to its user id where exactly one user has it"""
+    single = pairs.drop_duplicates(column, keep=False).set_index(column)["user_id"]
+    return values.map(single)
+
+
+def current_values(user_ids):
+    """
+    Current first/last name, email and profile contact fields of these
+    users, by user id; users in the recycle bin are left out
+    """
+    rows = []
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), FETCH_CHUNK_SIZE):
+        rows += User.objects.live().filter(id__in=user_ids[start:start + FETCH_CHUNK_SIZE]).values_list(
+            "id", "username", *USER_FIELDS,
+            "account_profile__id", "account_profile__whatsapp_number", "account_profile__press_name",
+            "customer_profile__id", "customer_profile__whatsapp_number", "customer_profile__press_name",
+        )
+    current = pd.DataFrame(rows, columns=[
+        "user_id", "current_username", *USER_FIELDS,
+        "profile_id", "profile_whatsapp", "profile_press",
+        "customer_profile_id", "customer_whatsapp", "customer_press",
+    ]).set_index("user_id")
+    # A user is a customer if it has a CustomerProfile (as in the exports)
+    is_customer = current["customer_profile_id"].notna()
+    current["whatsapp_number"] = current["customer_whatsapp"].where(is_customer, current["profile_whatsapp"])
+    current["press_name"] = current["customer_press"].where(is_customer, current["profile_press"])
+    current["has_profile"] = is_customer | current["profile_id"].notna()
+    return current
+
+
+def validate_user_sheet(frame, upsert=False):
+    """
+    Add username, user_id, status and errors columns to a frame from
+    read_user_sheet. Status is "ok" (user to create), "error" or "skipped"
+    (no email, as the import always did); with upsert, rows matching an
+    existing user by customer_id, username or email become "update" (with
+    a changes column) or "unchanged", and empty cells leave values as they are.
+    Only live users are matched; a row whose key belongs to a user in the
+    recycle bin is an error.
+    """
+    frame = frame.copy()
+    email = frame["email"]
+    frame["email_lower"] = email.str.lower()
+    frame["new_username"] = email.str.split("@").str[0]
+    has_email = email != ""
+    has_whatsapp = frame["whatsapp_number"] != ""
+    has_customer_id = (frame["customer_id"] != "") & upsert
+    has_username = (frame["username"] != "") & upsert
+
+    usernames = set(frame["new_username"][has_email]) | set(frame["username"][has_username])
+    emails = set(frame["email_lower"][has_email])
+    numbers = set(frame["whatsapp_number"][has_whatsapp])
+    customer_ids = set(frame["customer_id"][has_customer_id])
+    username_owners = owners(
+        User.objects.filter(username__in=usernames).values_list("username", "id", "is_deleted") if usernames else [],
+        ["username", "user_id", "is_deleted"],
+    )
+    email_owners = owners(
+        User.objects.annotate(email_lower=Lower("email")).filter(email_lower__in=emails)
+        .values_list("email_lower", "id", "is_deleted") if emails else [],
+        ["email_lower", "user_id", "is_deleted"],
+    )
+    whatsapp_owners = owners(
+        Profile.objects.filter(whatsapp_number__in=numbers).values_list("whatsapp_number", "user_id")
+        .union(CustomerProfile.objects.filter(whatsapp_number__in=numbers).values_list("whatsapp_number", "user_id"))
+        if numbers else [],
+        ["whatsapp_number", "user_id"],
+    )
+
+    # The user each row updates: customer id first, then username, then email
+    frame["user_id"] = np.nan
+    in_recycle_bin = pd.Series(False, index=frame.index)
+    checks = {}
+    if upsert:
+        customer_owners = owners(
+            CustomerProfile.objects.filter(customer_id__in=customer_ids)
+            .values_list("customer_id", "user_id", "user__is_deleted") if customer_ids else [],
+            ["customer_id", "user_id", "is_deleted"],
+        )
+        # Deleted users still count for the "already registered" checks, but are never updated
+        live_customers, deleted_customers = split_deleted(customer_owners)
+        live_usernames, deleted_usernames = split_deleted(username_owners)
+        live_emails, deleted_emails = split_deleted(email_owners)
+        by_customer_id = unique_owner(frame["customer_id"], live_customers, "customer_id")
+        by_username = frame["username"].map(live_usernames.set_index("username")["user_id"])
+        by_email = unique_owner(frame["email_lower"], live_emails, "email_lower")
+        match_by_username = has_username & ~has_customer_id
+        match_by_email = has_email & ~has_customer_id & ~has_username
+        frame["user_id"] = (
+            by_customer_id.where(has_customer_id)
+            .fillna(by_username.where(match_by_username))
+            .fillna(by_email.where(match_by_email))
+        )
+        in_recycle_bin = (
+            (has_customer_id & by_customer_id.isna() & frame["customer_id"].isin(deleted_customers["customer_id"]))
+            | (match_by_username & by_username.isna() & frame["username"].isin(deleted_usernames["username"]))
+            | (
+                match_by_email & by_email.isna() & frame["email_lower"].isin(deleted_emails["email_lower"])
+                & ~frame["email_lower"].isin(live_emails["email_lower"])
+            )
+        )
+        checks["No customer with this customer_id"] = has_customer_id & by_customer_id.isna() & ~in_recycle_bin
+        checks["No user with this username"] = match_by_username & by_username.isna() & ~in_recycle_bin
+        checks["Several users have this email"] = (
+            match_by_email & by_email.isna() & frame["email_lower"].isin(live_emails["email_lower"])
+        )
+        checks["User is in the recycle bin"] = in_recycle_bin
+    matched = frame["user_id"].notna()
+    new = has_email & ~matched & ~has_customer_id & ~has_username & ~in_recycle_bin
+
+    checks.update({
+        "Invalid email": has_email & ~email.str.fullmatch(EMAIL_PATTERN),
+        "Email used earlier in the sheet": has_email & frame["email_lower"].duplicated(),
+        "Email already registered": taken_by_others(frame, "email_lower", email_owners),
+        "Username used earlier in the sheet": new & frame["new_username"].where(new).duplicated(),
+        "Username already taken": new & frame["new_username"].isin(username_owners["username"]),
+        "WhatsApp number used earlier in the sheet": has_whatsapp & frame["whatsapp_number"].duplicated(),
+        "WhatsApp number already registered": taken_by_others(frame, "whatsapp_number", whatsapp_owners),
+        "Same user as an earlier row": matched & frame["user_id"].duplicated(),
+    })
+    for column, limit in COLUMN_LIMITS.items():
+        checks[f"{column} longer than {limit} characters"] = frame[column].str.len() > limit
+
+    frame["changes"] = [[] for _ in range(len(frame))]
+    if matched.any():
+        current = current_values(frame["user_id"][matched].astype(int).unique()).reindex(frame["user_id"])
+        current.index = frame.index
+        # Emails are matched case-insensitively, so a case-only difference is no change
+        incoming = frame[USER_FIELDS + PROFILE_FIELDS].assign(email=frame["email_lower"])
+        stored = current[USER_FIELDS + PROFILE_FIELDS].fillna("")
+        stored["email"] = stored["email"].str.lower()
+        changed = pd.DataFrame({
+            field: matched & (frame[field] != "") & (incoming[field] != stored[field])
+            for field in USER_FIELDS + PROFILE_FIELDS
+        })
+        checks["User has no profile (run fix_profiles)"] = (
+            matched & changed[PROFILE_FIELDS].any(axis=1) & ~current["has_profile"].eq(True)
+        )
+        fields = changed.columns.to_numpy()
+        frame["changes"] = [list(fields[flags]) for flags in changed.to_numpy()]
+        frame.loc[matched, "username"] = current["current_username"][matched]
+
+    considered = has_email | matched | has_customer_id | has_username
+    failed = pd.DataFrame(checks, index=frame.index).fillna(False).astype(bool)[considered]
+    messages = failed.columns.to_numpy()
+    errors = pd.Series([["No email"]] * len(frame), index=frame.index, dtype=object)
+    errors[failed.index] = [list(messages[flags]) for flags in failed.to_numpy()]
+    frame["errors"] = errors
+
+    frame["status"] = "skipped"
+    frame.loc[considered, "status"] = "ok"
+    frame.loc[matched & considered, "status"] = np.where(frame["changes"][matched & considered].str.len() > 0, "update", "unchanged")
+    frame.loc[failed.index[failed.any(axis=1)], "status"] = "error"
+    frame.loc[new, "username"] = frame["new_username"][new]
+    return frame.drop(columns=["email_lower", "new_username"])
+
+
+def sheet_report(frame):
+    """Summary counts and row-level entries for a validated frame (JSON-ready)"""
+    counts = frame["status"].value_counts()
+    return {
+        "summary": {
+            "rows": len(frame),
+            "valid": int(counts.get("ok", 0)),
+            "updates": int(counts.get("update", 0)),
+            "unchanged": int(counts.get("unchanged", 0)),
+            "errors": int(counts.get("error", 0)),
+            "skipped": int(counts.get("skipped", 0)),
+        },
+        "rows": [
+            {"row": row, "username": username, "email": email, "status": status, "changes": changes, "errors": errors}
+            for row, username, email, status, changes, errors in zip(
+                frame.index.tolist(), frame["username"], frame["email"], frame["status"],
+                frame["changes"], frame["errors"],
+            )
+        ],
+    }
+
+
+def apply_updates(frame, chunk_size=1000):
+    """
+    Write the "update" rows of a validated frame: per chunk of rows, one
+    transaction with a bulk_update per model and set of changed fields.
+    Returns the number of users updated.
+    """
+    updates = frame[frame["status"] == "update"]
+    if updates.empty:
+        return 0
+
+    updated = 0
+    for start in range(0, len(updates), chunk_size):
+        chunk = updates.iloc[start:start + chunk_size]
+        current = current_values(chunk["user_id"].astype(int))
+        # Users moved to the recycle bin since the sheet was validated are left alone
+        chunk = chunk[chunk["user_id"].astype(int).isin(current.index)]
+        # bulk_update skips auto_now, so updated_at is set here (Last-Modified relies on it)
+        now = timezone.now()
+        batches = {}
+        for user_id, record in zip(chunk["user_id"].astype(int), chunk.to_dict("records")):
+            state = current.loc[user_id]
+            user_changes = [field for field in record["changes"] if field in USER_FIELDS]
+            profile_changes = [field for field in record["changes"] if field in PROFILE_FIELDS]
+            if user_changes:
+                batches.setdefault((User, tuple(user_changes)), []).append(
+                    User(id=user_id, updated_at=now, **{field: record[field] for field in user_changes})
+                )
+            if profile_changes:
+                if pd.notna(state["customer_profile_id"]):
+                    model, profile_id = CustomerProfile, int(state["customer_profile_id"])
+                else:
+                    model, profile_id = Profile, int(state["profile_id"])
+                batches.setdefault((model, tuple(profile_changes)), []).append(
+                    model(id=profile_id, updated_at=now, **{field: record[field] for field in profile_changes})
+                )
+
+        with transaction.atomic():
+            for (model, fields), objs in batches.items():
+                model.objects.bulk_update(objs, [*fields, "updated_at"])
+        updated += len(chunk)
+
+    # bulk_update does not send post_save
+    versioning.bump(versioning.USERS, versioning.PROFILES, versioning.CUSTOMER_PROFILES)
+    return updated
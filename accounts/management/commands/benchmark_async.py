@@ -0,0 +1,133 @@
+import http.client
+import os
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarking import Browser, Recorder, percentile, start_server
+from jobs.models import Job
+from jobs.seeding import seed_jobs
+
+# Small client receive buffer, so a slow reader holds the server back the
+# way a slow mobile connection does, whatever the size of the download
+CLIENT_RCVBUF = 64 * 1024
+
+
+class SlowConnection(http.client.HTTPConnection):
+    def connect(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, CLIENT_RCVBUF)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect((self.host, self.port))
+
+
+class Command(BaseCommand):
+    help = (
+        'Start one worker process as WSGI (gunicorn sync or gthread) and as ASGI (uvicorn) '
+        'and count how many slow downloads each serves at once'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8010', help='Where to start the servers')
+        parser.add_argument('--username', required=True, help='Admin account used by every client')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--path', default='/jobs/export/?format=csv', help='Download to request')
+        parser.add_argument('--clients', type=int, default=30, help='Concurrent slow downloads')
+        parser.add_argument('--read-rate', type=int, default=256, help='KB/s each client reads')
+        parser.add_argument('--read-seconds', type=float, default=8, help='How long each client keeps reading')
+        parser.add_argument('--ttfb-limit', type=float, default=2, help='A download counts as served once its first byte arrives within this many seconds')
+        parser.add_argument('--server', action='append', choices=['wsgi', 'asgi'], help='Only this server (repeatable)')
+        parser.add_argument('--threads', type=int, default=1, help='gunicorn threads for the WSGI worker (>1 uses gthread)')
+        parser.add_argument('--seed-jobs', type=int, default=0, help='Create jobs first until this many exist')
+
+    def handle(self, *args, **options):
+        if options['seed_jobs']:
+            seed_jobs(options['seed_jobs'] - Job.objects.count(), stdout=self.stdout)
+
+        results = {}
+        for kind in options['server'] or ['wsgi', 'asgi']:
+            env = os.environ.copy()
+            env.pop('ASYNC_VIEWS', None)  # each entry point picks its own default
+            extra = ['--threads', str(options['threads'])] if kind == 'wsgi' and options['threads'] > 1 else []
+            server = start_server(kind, options['url'], 1, 120, self.stdout, extra_args=extra, env=env)
+            try:
+                results[kind] = self.run_clients(options)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+        self.stdout.write(
+            f"\n{options['clients']} clients reading {options['path']} at {options['read_rate']} KB/s "
+            f"for {options['read_seconds']:.0f}s, one worker process\n"
+        )
+        self.stdout.write(
+            f"  {'server':<8}{'served':>8}{'peak':>6}{'ttfb p50 s':>12}{'ttfb max s':>12}{'MB read':>9}{'errors':>8}"
+        )
+        for kind, result in results.items():
+            self.stdout.write(
+                f"  {kind:<8}{result['served']:>8}{result['peak']:>6}{result['ttfb_p50']:>12.2f}"
+                f"{result['ttfb_max']:>12.2f}{result['bytes'] / (1024 * 1024):>9.1f}{result['errors']:>8}"
+            )
+
+    def run_clients(self, options):
+        browser = Browser(options['url'], Recorder(), timeout=30)
+        browser.request("login_page", "GET", "/accounts/login/")
+        form = browser.csrf_form(username=options['username'], password=options['password'], role='admin')
+        browser.request("login", "POST", "/accounts/login/", form=form, expect=(302,))
+        browser.close()
+        if "sessionid" not in browser.cookies:
+            raise CommandError("Could not log in")
+        cookie = "; ".join(f"{key}={value}" for key, value in browser.cookies.items())
+
+        downloads = [{} for _ in range(options['clients'])]
+        start = time.monotonic()
+        threads = [
+            threading.Thread(target=self.download, args=(browser, cookie, options, start, result), daemon=True)
+            for result in downloads
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        started = [d for d in downloads if "first_byte" in d]
+        ttfbs = [d["first_byte"] - start for d in started] or [0.0]
+        # Most downloads in progress at the same moment
+        events = sorted([(d["first_byte"], 1) for d in started] + [(d["end"], -1) for d in started])
+        peak = current = 0
+        for _, change in events:
+            current += change
+            peak = max(peak, current)
+        return {
+            "served": sum(1 for value in ttfbs if value <= options['ttfb_limit']) if started else 0,
+            "peak": peak,
+            "ttfb_p50": percentile(ttfbs, 0.5),
+            "ttfb_max": max(ttfbs),
+            "bytes": sum(d.get("bytes", 0) for d in downloads),
+            "errors": sum(1 for d in downloads if d.get("error")),
+        }
+
+    def download(self, browser, cookie, options, start, result):
+        chunk = 16 * 1024
+        pause = chunk / (options['read_rate'] * 1024)
+        conn = SlowConnection(browser.host, browser.port, timeout=120)
+        try:
+            conn.request("GET", options['path'], headers={"Cookie": cookie})
+            response = conn.getresponse()
+            result["first_byte"] = time.monotonic()
+            if response.status != 200:
+                result["error"] = f"HTTP {response.status}"
+            result["bytes"] = 0
+            deadline = result["first_byte"] + options['read_seconds']
+            while time.monotonic() < deadline:
+                data = response.read(chunk)
+                if not data:
+                    break
+                result["bytes"] += len(data)
+                time.sleep(pause)
+        except (OSError, http.client.HTTPException) as e:
+            result["error"] = str(e)
+        finally:
+            result["end"] = time.monotonic()
+            conn.close()
@@ -0,0 +1,241 @@
+import gc
+import json
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import openpyxl
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+from core.benchmarking import percentile
+from accounts import versioning
+from accounts.models import DeletedUser, User
+from accounts.seeding import seed_users
+
+BENCHMARK_PASSWORD = "bench-Password-1"
+DEFAULT_BASELINE = settings.BASE_DIR / "benchmarks" / "views.json"
+
+# Run in this order: delete_user fills the recycle bin that restore_user empties
+SCENARIOS = [
+    "login", "dashboard_home", "all_users", "add_user", "edit_user",
+    "delete_user", "restore_user", "upload_users", "download_excel", "download_pdf",
+]
+# Password hashing or full export builds: run fewer iterations
+SLOW_SCENARIOS = {"login", "upload_users", "download_excel", "download_pdf"}
+UPLOAD_ROWS = 5
+
+# Absolute slack on top of --tolerance, so tiny timings don't flap
+LATENCY_SLACK_MS = 5
+MEMORY_SLACK_KB = 256
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the account views through the test client on a throwaway test database '
+        'seeded at several scales; reports latency percentiles, queries and peak memory '
+        'and fails when results regress beyond the stored baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='100,1000,5000', help='Comma-separated user counts to seed')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per view (slow views run a fifth)')
+        parser.add_argument('--only', action='append', choices=SCENARIOS, help='Only these views (repeatable)')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline JSON file')
+        parser.add_argument('--update-baseline', action='store_true', help='Write these results as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.5,
+                            help='Allowed relative growth of median latency and peak memory (0.5 = +50%%)')
+
+    def handle(self, *args, **options):
+        try:
+            scales = sorted({int(scale) for scale in options['scales'].split(',') if scale.strip()})
+        except ValueError:
+            raise CommandError(f"Invalid --scales: {options['scales']}")
+        scenarios = [name for name in SCENARIOS if not options['only'] or name in options['only']]
+        self.iterations = max(1, options['iterations'])
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases=set(connections))
+        try:
+            with TemporaryDirectory() as tmp, override_settings(
+                EXPORT_CACHE_ROOT=Path(tmp) / "exports", STATEMENT_ROOT=Path(tmp) / "statements",
+            ):
+                results = self.run_scales(scales, scenarios)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline']:
+            baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+            for scale, views in results.items():
+                baseline.setdefault(scale, {}).update(views)
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}"))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f"No baseline at {baseline_path}; run with --update-baseline"))
+            return
+
+        regressions = self.compare(results, json.loads(baseline_path.read_text()), options['tolerance'])
+        if regressions:
+            raise CommandError("Performance regressions:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def run_scales(self, scales, scenarios):
+        self.admin = User.objects.create_superuser("bench_admin", "bench_admin@example.com", BENCHMARK_PASSWORD)
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+        results = {}
+        seeded = 0
+        for scale in scales:
+            # Seed the difference; 1 in 20 seeded users starts in the recycle bin
+            seed_users(scale - seeded, deleted=(scale - seeded) // 20, password=BENCHMARK_PASSWORD)
+            seeded = scale
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{scale} users"))
+            self.stdout.write(f"  {'view':<16}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'peak KB':>10}")
+            results[str(scale)] = {}
+            for name in scenarios:
+                result = self.run_scenario(name)
+                results[str(scale)][name] = result
+                self.stdout.write(
+                    f"  {name:<16}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+                    f"{result['queries']:>9}{result['peak_kb']:>10.0f}"
+                )
+        return results
+
+    def run_scenario(self, name):
+        prepare = getattr(self, f"prepare_{name}")
+        iterations = max(3, self.iterations // 5) if name in SLOW_SCENARIOS else self.iterations
+
+        self.send(*prepare())  # warm-up: template compilation, first-use imports
+
+        timings, queries = [], 0
+        for _ in range(iterations):
+            request = prepare()
+            gc.collect()  # don't bill earlier requests' garbage to this one
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                self.send(*request)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries = max(queries, len(captured))
+
+        # Separate pass: tracemalloc slows every allocation down
+        request = prepare()
+        tracemalloc.start()
+        try:
+            self.send(*request)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "iterations": iterations,
+            "p50_ms": round(percentile(timings, 0.50), 2),
+            "p95_ms": round(percentile(timings, 0.95), 2),
+            "p99_ms": round(percentile(timings, 0.99), 2),
+            "queries": queries,
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    def send(self, client, method, path, data=None):
+        response = getattr(client, method)(path, data or {})
+        if response.status_code >= 400:
+            raise CommandError(f"{method.upper()} {path} returned {response.status_code}")
+        if response.get("Content-Type", "").startswith("application/json") and not response.json().get("success", True):
+            raise CommandError(f"{method.upper()} {path} failed: {response.json().get('message')}")
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def compare(self, results, baseline, tolerance):
+        regressions = []
+        for scale, views in results.items():
+            for name, result in views.items():
+                base = baseline.get(scale, {}).get(name)
+                if not base:
+                    continue
+                if result["queries"] > base["queries"]:
+                    regressions.append(f"{name} @ {scale}: {result['queries']} queries (baseline {base['queries']})")
+                # Gate on the median; p95/p99 of a few dozen requests are too noisy to fail on
+                if result["p50_ms"] > base["p50_ms"] * (1 + tolerance) + LATENCY_SLACK_MS:
+                    regressions.append(f"{name} @ {scale}: p50 {result['p50_ms']:.1f} ms (baseline {base['p50_ms']:.1f} ms)")
+                if result["peak_kb"] > base["peak_kb"] * (1 + tolerance) + MEMORY_SLACK_KB:
+                    regressions.append(f"{name} @ {scale}: peak {result['peak_kb']:.0f} KB (baseline {base['peak_kb']:.0f} KB)")
+        return regressions
+
+    # Each prepare_* runs untimed and returns (client, method, path, data)
+
+    def live_customer(self):
+        return User.objects.live().filter(groups__name="Customer").order_by("-id").first()
+
+    def prepare_login(self):
+        data = {"username": self.admin.username, "password": BENCHMARK_PASSWORD, "role": "admin"}
+        return Client(), "post", reverse("accounts:login"), data
+
+    def prepare_dashboard_home(self):
+        return self.client, "get", reverse("accounts:dashboard_home")
+
+    def prepare_all_users(self):
+        return self.client, "get", reverse("accounts:all_users")
+
+    def prepare_add_user(self):
+        self.added = getattr(self, "added", 0) + 1
+        data = {
+            "first_name": "Bench", "last_name": f"Added{self.added}",
+            "email": f"bench-added-{self.added}@example.com", "role": "Customer",
+            "whatsapp_number": f"8{self.added:09d}", "press_name": "Bench Press", "customer_type": "Credit",
+        }
+        return self.client, "post", reverse("accounts:add_user"), data
+
+    def prepare_edit_user(self):
+        user = self.live_customer()
+        data = {
+            "first_name": user.first_name, "last_name": "Edited", "email": user.email,
+            "username": user.username, "current_password": "",
+            "whatsapp_number": "", "press_name": "Edited Press", "customer_type": "Credit",
+        }
+        return self.client, "post", reverse("accounts:edit_user", args=[user.id]), data
+
+    def prepare_delete_user(self):
+        return self.client, "post", reverse("accounts:delete_user", args=[self.live_customer().id])
+
+    def prepare_restore_user(self):
+        entry = DeletedUser.objects.order_by("-id").first()
+        if entry is None:
+            raise CommandError("The recycle bin is empty; run delete_user first")
+        return self.client, "post", reverse("accounts:restore_user", args=[entry.id])
+
+    def prepare_upload_users(self):
+        self.uploaded = getattr(self, "uploaded", 0)
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.append(["First Name", "Last Name", "Email", "WhatsApp"])
+        for _ in range(UPLOAD_ROWS):
+            self.uploaded += 1
+            ws.append(["Bench", "Upload", f"bench-upload-{self.uploaded}@example.com", f"7{self.uploaded:09d}"])
+        output = BytesIO()
+        wb.save(output)
+        output.seek(0)
+        output.name = "users.xlsx"
+        return self.client, "post", reverse("accounts:upload_users"), {"excel_file": output}
+
+    def prepare_download_excel(self):
+        versioning.bump(versioning.USERS)  # measure a fresh build, not the cached file
+        return self.client, "get", reverse("accounts:download_excel")
+
+    def prepare_download_pdf(self):
+        versioning.bump(versioning.USERS)
+        return self.client, "get", reverse("accounts:download_pdf")
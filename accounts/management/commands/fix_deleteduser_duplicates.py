@@ -1,35 +1,51 @@
+import time
+import uuid
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from accounts import versioning
 from accounts.models import DeletedUser
-import uuid
+
 
 class Command(BaseCommand):
     help = 'Fix duplicate unique_deleted_id values in DeletedUser model'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows updated per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be fixed')
+
     def handle(self, *args, **options):
-        # Find duplicates
-        from django.db.models import Count
-        duplicates = DeletedUser.objects.values('unique_deleted_id').annotate(
-            count=Count('id')
-        ).filter(count__gt=1)
-        
-        self.stdout.write(f"Found {len(duplicates)} duplicate unique_deleted_id values")
-        
-        # Fix duplicates
-        fixed_count = 0
-        for dup in duplicates:
-            duplicate_id = dup['unique_deleted_id']
-            records = DeletedUser.objects.filter(unique_deleted_id=duplicate_id).order_by('id')
-            
-            # Keep the first record, update the rest
-            for i, record in enumerate(records):
-                if i > 0:  # Skip the first record
-                    record.unique_deleted_id = str(uuid.uuid4())
-                    record.save()
-                    fixed_count += 1
-                    self.stdout.write(
-                        f"Fixed duplicate: {record.username} -> {record.unique_deleted_id}"
-                    )
-        
+        start = time.perf_counter()
+
+        # One pass over the table: every row after the first (lowest id) of its
+        # unique_deleted_id is a duplicate
+        ranked = DeletedUser.objects.annotate(
+            position=Window(RowNumber(), partition_by=[F('unique_deleted_id')], order_by=F('id').asc())
+        )
+        duplicate_ids = list(ranked.filter(position__gt=1).order_by('id').values_list('id', flat=True))
+
+        self.stdout.write(f"Found {len(duplicate_ids)} rows with a duplicate unique_deleted_id")
+        if options['dry_run'] or not duplicate_ids:
+            return
+
+        batch_size = options['batch_size']
+        fixed = 0
+        for offset in range(0, len(duplicate_ids), batch_size):
+            batch = [
+                DeletedUser(id=entry_id, unique_deleted_id=str(uuid.uuid4()))
+                for entry_id in duplicate_ids[offset:offset + batch_size]
+            ]
+            with transaction.atomic():
+                DeletedUser.objects.bulk_update(batch, ['unique_deleted_id'])
+            fixed += len(batch)
+            self.stdout.write(f"  {fixed} fixed")
+
+        # bulk_update does not send post_save
+        versioning.bump(versioning.DELETED_USERS)
         self.stdout.write(
-            self.style.SUCCESS(f"Successfully fixed {fixed_count} duplicate records")
-        )
\ No newline at end of file
+            self.style.SUCCESS(
+                f"Successfully fixed {fixed} duplicate records in {time.perf_counter() - start:.1f}s"
+            )
+        )
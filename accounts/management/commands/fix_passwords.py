@@ -1,39 +1,146 @@
-from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
-from accounts.models import Profile
-import random
-import string
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from accounts import versioning
+from accounts.provisioning import generate_password
+from accounts.models import CustomerProfile, Profile, User
+
+ROLES = ["Admin", "Staff", "Customer"]
+
+
+def init_worker():
+    # Needed when workers are spawned rather than forked
+    django.setup()
 
-User = get_user_model()
 
 class Command(BaseCommand):
-    help = 'Fix passwords for existing users by generating new ones'
+    help = (
+        'Give users new random passwords: hashes in a process pool, writes users and '
+        'their Profile/CustomerProfile raw_password with bulk_update in chunks'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--role', action='append', choices=ROLES, help='Only users with this role (repeatable)')
+        parser.add_argument('--ids', type=int, nargs='+', help='Only these user ids')
+        parser.add_argument('--only-missing', action='store_true',
+                            help='Only users with no usable password or no stored raw password')
+        parser.add_argument('--include-deleted', action='store_true', help='Also users in the recycle bin')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Hashing processes; 1 hashes in this process')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Users hashed and written per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many users would be changed')
 
     def handle(self, *args, **options):
-        users = User.objects.all()
-        
-        for user in users:
-            # Generate a new password
-            chars = string.ascii_letters + string.digits + "!@#$%^&*"
-            raw_password = ''.join(random.choice(chars) for _ in range(12))
-            
-            # Set the password (this hashes it)
-            user.set_password(raw_password)
-            user.save()
-            
-            # Store the raw password in profile
-            profile, created = Profile.objects.get_or_create(user=user)
-            profile.raw_password = raw_password
-            
-            # Get login link
-            from django.contrib.sites.models import Site
-            current_site = Site.objects.get_current()
-            profile.login_link = f"http://{current_site.domain}/accounts/login/"
-            
-            profile.save()
-            
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f"Fixed password for {user.username}: {raw_password}"
+        users = self.select_users(options)
+        total = users.count()
+        missing_profile = users.filter(account_profile__isnull=True, customer_profile__isnull=True).count()
+        if missing_profile:
+            self.stdout.write(self.style.WARNING(
+                f"Skipping {missing_profile} users without a profile (run fix_profiles first)"
+            ))
+        users = users.exclude(account_profile__isnull=True, customer_profile__isnull=True)
+
+        if options['dry_run']:
+            self.stdout.write(f"{total - missing_profile} users would get a new password")
+            return
+
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        workers = max(1, options['workers'])
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker) if workers > 1 else None
+
+        start = time.perf_counter()
+        updated = 0
+        last_id = 0
+        try:
+            while True:
+                # Keyset over ids, so writes to earlier chunks never shift later ones
+                chunk = list(
+                    users.filter(id__gt=last_id).order_by('id')
+                    .select_related('account_profile', 'customer_profile')
+                    .only('id', 'username', 'password', 'updated_at', 'account_profile__id', 'customer_profile__id')
+                    [:chunk_size]
                 )
-            )
\ No newline at end of file
+                if not chunk:
+                    break
+                last_id = chunk[-1].id
+
+                raw_passwords = [generate_password() for _ in chunk]
+                if pool:
+                    hashes = list(pool.map(make_password, raw_passwords, chunksize=max(1, len(chunk) // (workers * 4))))
+                else:
+                    hashes = [make_password(raw) for raw in raw_passwords]
+
+                self.write_chunk(chunk, raw_passwords, hashes)
+                updated += len(chunk)
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{updated}/{total - missing_profile} users ({updated / elapsed:,.1f}/s)")
+                if options['verbosity'] >= 2:
+                    for user, raw in zip(chunk, raw_passwords):
+                        self.stdout.write(f"  {user.username}: {raw}")
+        finally:
+            if pool:
+                pool.shutdown()
+
+        if updated:
+            # bulk_update does not send post_save
+            versioning.bump(versioning.USERS, versioning.PROFILES, versioning.CUSTOMER_PROFILES)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reset {updated} passwords in {elapsed:.1f}s "
+                f"({updated / elapsed if elapsed else 0:,.1f} users/s, {workers} workers)"
+            )
+        )
+
+    def select_users(self, options):
+        users = User.objects.all() if options['include_deleted'] else User.objects.live()
+
+        if options['ids']:
+            users = users.filter(id__in=options['ids'])
+
+        if options['role']:
+            condition = Q()
+            if "Admin" in options['role']:
+                condition |= Q(is_superuser=True)
+            groups = [role for role in options['role'] if role != "Admin"]
+            if groups:
+                condition |= Q(groups__name__in=groups, is_superuser=False)
+            users = users.filter(condition).distinct()
+
+        if options['only_missing']:
+            users = users.filter(
+                Q(password="") | Q(password__startswith=UNUSABLE_PASSWORD_PREFIX)
+                | Q(account_profile__isnull=False, account_profile__raw_password__isnull=True)
+                | Q(account_profile__isnull=False, account_profile__raw_password="")
+                | Q(customer_profile__isnull=False, customer_profile__raw_password__isnull=True)
+                | Q(customer_profile__isnull=False, customer_profile__raw_password="")
+            )
+        return users
+
+    def write_chunk(self, chunk, raw_passwords, hashes):
+        # bulk_update skips auto_now, so updated_at is set here (Last-Modified relies on it)
+        now = timezone.now()
+        profiles, customer_profiles = [], []
+        for user, raw, hashed in zip(chunk, raw_passwords, hashes):
+            user.password = hashed
+            user.updated_at = now
+            if hasattr(user, 'account_profile'):
+                profiles.append(Profile(id=user.account_profile.id, raw_password=raw, updated_at=now))
+            else:
+                customer_profiles.append(CustomerProfile(id=user.customer_profile.id, raw_password=raw, updated_at=now))
+
+        with transaction.atomic():
+            User.objects.bulk_update(chunk, ['password', 'updated_at'])
+            Profile.objects.bulk_update(profiles, ['raw_password', 'updated_at'])
+            CustomerProfile.objects.bulk_update(customer_profiles, ['raw_password', 'updated_at'])
@@ -1,17 +1,104 @@
+import time
+
 from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
-from accounts.models import Profile
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from accounts import versioning
+from accounts.models import CustomerProfile, Profile, User
+from accounts.provisioning import last_customer_number
+
+# Admins and staff get a Profile, everyone else a CustomerProfile (as in accounts.provisioning)
+STAFF_PROFILE_USERS = Q(is_superuser=True) | Q(groups__name__in=["Staff", "Admin"])
+CONTACT_FIELDS = ["whatsapp_number", "press_name", "raw_password"]
 
-User = get_user_model()
 
 class Command(BaseCommand):
-    help = 'Create missing profiles for existing users'
+    help = (
+        'Create missing profiles of the right type: Profile for admins and staff, '
+        'CustomerProfile (with a customer id) for everyone else. Set-based and batched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Profiles created per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be created')
 
     def handle(self, *args, **options):
-        users_without_profile = User.objects.filter(account_profile__isnull=True)
-        
-        for user in users_without_profile:
-            Profile.objects.get_or_create(user=user)
-            self.stdout.write(f'Created profile for {user.username}')
-        
-        self.stdout.write('Profile creation completed')
\ No newline at end of file
+        start = time.perf_counter()
+        staff_ids = User.objects.filter(STAFF_PROFILE_USERS).values('id')
+
+        # Anti-joins: users of each kind with no profile of the right type
+        needs_profile = (
+            User.objects.filter(id__in=staff_ids)
+            .filter(~Exists(Profile.objects.filter(user=OuterRef('pk'))))
+        )
+        needs_customer_profile = (
+            User.objects.exclude(id__in=staff_ids)
+            .filter(~Exists(CustomerProfile.objects.filter(user=OuterRef('pk'))))
+        )
+
+        if options['dry_run']:
+            self.stdout.write(
+                f"{needs_profile.count()} Profile and {needs_customer_profile.count()} "
+                f"CustomerProfile rows would be created"
+            )
+            return
+
+        batch_size = options['batch_size']
+        created_profiles = self.create_profiles(needs_profile, batch_size)
+        created_customers = self.create_customer_profiles(needs_customer_profile, batch_size)
+
+        if created_profiles or created_customers:
+            versioning.bump(versioning.PROFILES, versioning.CUSTOMER_PROFILES)
+
+        wrong_type = (
+            User.objects.exclude(id__in=staff_ids).filter(account_profile__isnull=False).count()
+            + User.objects.filter(id__in=staff_ids, customer_profile__isnull=False).count()
+        )
+        if wrong_type:
+            self.stdout.write(self.style.WARNING(
+                f"{wrong_type} users still also have a profile of the other type (left untouched)"
+            ))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created_profiles} Profile and {created_customers} CustomerProfile rows "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+        )
+
+    def missing_batches(self, users, batch_size, other_profile):
+        """
+        Yield lists of (user_id, contact values) for users still missing a
+        profile. Contact details are copied from the other profile type, if
+        the user has one (older versions of this command gave customers a Profile).
+        """
+        while True:
+            rows = list(
+                users.order_by('id').values_list('id', *[f"{other_profile}__{field}" for field in CONTACT_FIELDS])
+                [:batch_size]
+            )
+            if not rows:
+                return
+            yield [(row[0], dict(zip(CONTACT_FIELDS, row[1:]))) for row in rows]
+
+    def create_profiles(self, users, batch_size):
+        created = 0
+        for batch in self.missing_batches(users, batch_size, 'customer_profile'):
+            with transaction.atomic():
+                Profile.objects.bulk_create([Profile(user_id=user_id, **contact) for user_id, contact in batch])
+            created += len(batch)
+            self.stdout.write(f"  {created} profiles")
+        return created
+
+    def create_customer_profiles(self, users, batch_size):
+        created = 0
+        for batch in self.missing_batches(users, batch_size, 'account_profile'):
+            with transaction.atomic():
+                customer_number = last_customer_number()
+                CustomerProfile.objects.bulk_create([
+                    CustomerProfile(user_id=user_id, customer_id=f"AOP{customer_number + offset:04d}", **contact)
+                    for offset, (user_id, contact) in enumerate(batch, start=1)
+                ])
+            created += len(batch)
+            self.stdout.write(f"  {created} customer profiles")
+        return created
@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.benchmarking import Browser, Recorder, percentile, start_server
+
+# Relative frequency of each action inside a logged-in session
+ACTIONS = {
+    "dashboard_home": 3,
+    "all_users": 5,
+    "download_excel": 1,
+    "export_jobs_csv": 1,
+    "job_entry": 2,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay scripted admin sessions (login with role, user list browsing, exports, '
+        'job entry) against a running server at a given concurrency, and report '
+        'throughput and tail latency per endpoint'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server to load')
+        parser.add_argument('--username', required=True, help='Admin account used by every virtual user')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--role', default='admin', choices=['admin', 'staff', 'customer'])
+        parser.add_argument('--concurrency', type=int, default=10, help='Virtual users')
+        parser.add_argument('--duration', type=float, default=60, help='Seconds to run')
+        parser.add_argument('--actions', type=int, default=10, help='Actions per session before logging out')
+        parser.add_argument('--think-time', type=float, default=0.0, help='Max random pause between actions (s)')
+        parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout (s)')
+        parser.add_argument('--start', choices=['wsgi', 'asgi'],
+                            help='Start gunicorn on --url first (asgi needs uvicorn installed)')
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn workers with --start')
+
+    def handle(self, *args, **options):
+        server = None
+        if options['start']:
+            server = start_server(options['start'], options['url'], options['workers'], options['timeout'], self.stdout)
+        try:
+            self.run_load(options)
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+
+    def run_load(self, options):
+        deadline = time.monotonic() + options['duration']
+        recorders = [Recorder() for _ in range(options['concurrency'])]
+        threads = [
+            threading.Thread(target=self.virtual_user, args=(options, recorder, deadline, seed), daemon=True)
+            for seed, recorder in enumerate(recorders)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        total = Recorder()
+        for recorder in recorders:
+            total.merge(recorder)
+        self.report(total, elapsed, options['concurrency'])
+
+    def virtual_user(self, options, recorder, deadline, seed):
+        rng = random.Random(seed)
+        names, weights = list(ACTIONS), list(ACTIONS.values())
+        while time.monotonic() < deadline:
+            browser = Browser(options['url'], recorder, options['timeout'])
+            try:
+                if not self.login(browser, options):
+                    time.sleep(1)
+                    continue
+                for _ in range(options['actions']):
+                    if time.monotonic() >= deadline:
+                        break
+                    getattr(self, f"action_{rng.choices(names, weights=weights)[0]}")(browser, rng)
+                    if options['think_time']:
+                        time.sleep(rng.uniform(0, options['think_time']))
+                browser.request("logout", "GET", "/accounts/logout/", expect=(302,))
+            finally:
+                browser.close()
+
+    def login(self, browser, options):
+        if browser.request("login_page", "GET", "/accounts/login/") is None:
+            return False
+        form = browser.csrf_form(username=options['username'], password=options['password'], role=options['role'])
+        browser.request("login", "POST", "/accounts/login/", form=form, expect=(302,))
+        return "sessionid" in browser.cookies
+
+    def action_dashboard_home(self, browser, rng):
+        browser.request("dashboard_home", "GET", "/accounts/dashboard-home/")
+
+    def action_all_users(self, browser, rng):
+        browser.request("all_users", "GET", "/accounts/all-users/")
+
+    def action_download_excel(self, browser, rng):
+        browser.request("download_excel", "GET", "/accounts/download-excel/")
+
+    def action_export_jobs_csv(self, browser, rng):
+        browser.request("export_jobs_csv", "GET", "/jobs/export/?format=csv")
+
+    def action_job_entry(self, browser, rng):
+        # The job entry page posts to an external script, so jobs are entered through the admin
+        if browser.request("job_entry_form", "GET", "/admin/jobs/job/add/") is None:
+            return
+        total = rng.randint(500, 20000)
+        form = browser.csrf_form(
+            date=timezone.localdate().isoformat(),
+            party_name=f"Load Test Party {rng.randint(1, 50)}",
+            job_size=rng.choice(["12X18", "18X23", "15X20", "20X28"]),
+            paper=rng.choice(["90 ART", "100 MAP", "170 ART", "300 ITC"]),
+            quantity=str(rng.choice([500, 1000, 2000])),
+            total=total,
+            payment_type=rng.choice(["CREDIT", "RECIEVED", "SHORT CREDIT"]),
+            job_details="Load test job",
+            cost=0, paper_cost=0, lami_cost=0, enve_cost=0, recieved=0, bal_amt=total,
+            _save="Save",
+        )
+        browser.request("job_entry", "POST", "/admin/jobs/job/add/", form=form, expect=(302,))
+
+    def report(self, total, elapsed, concurrency):
+        requests = sum(len(values) for values in total.latencies.values())
+        errors = sum(total.errors.values())
+        self.stdout.write(
+            f"\n{requests} requests, {errors} errors in {elapsed:.1f}s with {concurrency} virtual users: "
+            f"{requests / elapsed if elapsed else 0:.1f} req/s\n"
+        )
+        self.stdout.write(
+            f"  {'endpoint':<18}{'count':>7}{'errors':>8}{'req/s':>8}"
+            f"{'p50 ms':>9}{'p90 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        )
+        for name in sorted(set(total.latencies) | set(total.errors)):
+            values = total.latencies.get(name) or [0.0]
+            count = len(total.latencies.get(name, []))
+            self.stdout.write(
+                f"  {name:<18}{count:>7}{total.errors.get(name, 0):>8}{count / elapsed:>8.1f}"
+                f"{percentile(values, 0.50):>9.1f}{percentile(values, 0.90):>9.1f}"
+                f"{percentile(values, 0.95):>9.1f}{percentile(values, 0.99):>9.1f}{max(values):>9.1f}"
+            )
+        if errors:
+            self.stdout.write(self.style.WARNING(f"{errors} requests failed or returned an unexpected status"))
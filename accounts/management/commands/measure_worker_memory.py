@@ -0,0 +1,116 @@
+import os
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarking import Browser, Recorder, start_server
+
+# Pages that between them import and exercise most of the app
+WARM_UP_PATHS = [
+    "/accounts/dashboard-home/",
+    "/accounts/all-users/",
+    "/accounts/download-excel/",
+    "/accounts/download-pdf/",
+    "/jobs/export/?format=csv",
+    "/jobs/export/?format=xlsx",
+]
+
+
+def child_pids(pid):
+    """Pids of the direct children of a process (the gunicorn workers)"""
+    children = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            # The command name in parentheses may contain spaces
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(stat.parent.name))
+    return sorted(children)
+
+
+def memory_kb(pid):
+    """
+    Rss, Pss and Uss (private pages: what the process would free on exit)
+    of a process in kB, from /proc/<pid>/smaps_rollup
+    """
+    values = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        key, value = line.split(":", 1)
+        values[key] = int(value.split()[0])
+    return {
+        "rss": values["Rss"],
+        "pss": values["Pss"],
+        "uss": values["Private_Clean"] + values["Private_Dirty"],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Start gunicorn with gunicorn.conf.py, with and without preload_app, warm every '
+        'worker up and report its unique (USS), proportional (PSS) and resident memory'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8011', help='Where to start the server')
+        parser.add_argument('--username', required=True, help='Admin account used to warm the workers up')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--rounds', type=int, default=5, help='Warm-up passes over the pages per worker')
+        parser.add_argument('--memory-mb', type=int, default=512, help='Instance memory, to estimate how many workers fit')
+        parser.add_argument('--preload', action='append', choices=['on', 'off'], help='Only this mode (repeatable)')
+
+    def handle(self, *args, **options):
+        if not Path("/proc/self/smaps_rollup").exists():
+            raise CommandError("Needs Linux 4.14+ (/proc/<pid>/smaps_rollup)")
+
+        results = {}
+        for mode in options['preload'] or ['off', 'on']:
+            env = os.environ.copy()
+            env['GUNICORN_PRELOAD'] = '1' if mode == 'on' else '0'
+            # Recycling mid-measurement would replace a warmed worker with a cold one
+            env['GUNICORN_MAX_REQUESTS'] = '0'
+            server = start_server('wsgi', options['url'], options['workers'], 120, self.stdout, env=env)
+            try:
+                self.warm_up(options)
+                time.sleep(1)
+                results[mode] = (memory_kb(server.pid), [memory_kb(pid) for pid in child_pids(server.pid)])
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+        budget = options['memory_mb'] * 1024
+        for mode, (master, workers) in results.items():
+            self.stdout.write(f"\npreload {mode}: {len(workers)} workers")
+            self.stdout.write(f"  {'process':<10}{'USS MB':>8}{'PSS MB':>8}{'RSS MB':>8}")
+            for name, usage in [("master", master)] + [(f"worker {i + 1}", w) for i, w in enumerate(workers)]:
+                self.stdout.write(
+                    f"  {name:<10}{usage['uss'] / 1024:>8.1f}{usage['pss'] / 1024:>8.1f}{usage['rss'] / 1024:>8.1f}"
+                )
+            if not workers:
+                continue
+            total_pss = master['pss'] + sum(w['pss'] for w in workers)
+            mean_uss = sum(w['uss'] for w in workers) / len(workers)
+            # Shared pages are paid for once; every extra worker adds its USS
+            shared = total_pss - sum(w['uss'] for w in workers)
+            self.stdout.write(
+                f"  total PSS {total_pss / 1024:.1f} MB, mean worker USS {mean_uss / 1024:.1f} MB; "
+                f"about {int((budget - shared) // mean_uss)} workers fit in {options['memory_mb']} MB"
+            )
+
+    def warm_up(self, options):
+        # Each connection is accepted by whichever worker is free, so several
+        # passes reach every worker with high probability
+        for _ in range(options['rounds'] * options['workers']):
+            browser = Browser(options['url'], Recorder(), timeout=120)
+            try:
+                browser.request("login_page", "GET", "/accounts/login/")
+                form = browser.csrf_form(username=options['username'], password=options['password'], role='admin')
+                browser.request("login", "POST", "/accounts/login/", form=form, expect=(302,))
+                if "sessionid" not in browser.cookies:
+                    raise CommandError("Could not log in")
+                for path in WARM_UP_PATHS:
+                    browser.request(path, "GET", path)
+            finally:
+                browser.close()
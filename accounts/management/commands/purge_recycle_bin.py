@@ -0,0 +1,44 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from accounts.models import DeletedUser
+from accounts.recycle_bin import purge_deleted_users
+
+
+class Command(BaseCommand):
+    help = 'Permanently delete recycle bin entries (and their users) older than N days, in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Purge entries deleted more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=500, help='Entries purged per transaction')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many entries would be purged')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        expired = DeletedUser.objects.filter(deleted_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"{expired.count()} recycle bin entries older than {options['days']} days would be purged")
+            return
+
+        start = time.perf_counter()
+        purged = 0
+        while True:
+            # Each batch is its own short transaction so locks are held briefly
+            ids = list(expired.order_by('deleted_at', 'id').values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            purged += purge_deleted_users(ids)
+            self.stdout.write(f"Purged {purged} entries")
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Purged {purged} recycle bin entries older than {options['days']} days "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+        )
@@ -0,0 +1,59 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.seeding import seed_users
+from jobs.seeding import create_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Create synthetic users (Admin/Staff/Customer with their profiles), recycle bin '
+        'entries and jobs for load testing. Uses bulk_create and one shared password hash.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users to create')
+        parser.add_argument('--deleted', type=int, default=0,
+                            help='How many of the new users are soft deleted into the recycle bin')
+        parser.add_argument('--jobs', type=int, default=0, help='Jobs to create')
+        parser.add_argument('--password', default='password', help='Password shared by every seeded user')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument('--seed', type=int, help='Random seed, for repeatable data')
+
+    def handle(self, *args, **options):
+        if options['deleted'] > options['users']:
+            raise CommandError("--deleted cannot be larger than --users")
+
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+
+        if options['users']:
+            start = time.perf_counter()
+            created = seed_users(
+                options['users'],
+                deleted=options['deleted'],
+                password=options['password'],
+                batch_size=batch_size,
+                rng=rng,
+                progress=lambda done: self.stdout.write(f"  {done} users"),
+            )
+            self.report("users", created, start)
+
+        if options['jobs']:
+            start = time.perf_counter()
+            created = create_jobs(
+                options['jobs'],
+                batch_size=batch_size,
+                rng=rng,
+                progress=lambda done: self.stdout.write(f"  {done} jobs"),
+            )
+            self.report("jobs", created, start)
+
+    def report(self, what, created, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} {what} in {elapsed:.1f}s ({created / elapsed if elapsed else 0:,.0f}/s)"
+            )
+        )
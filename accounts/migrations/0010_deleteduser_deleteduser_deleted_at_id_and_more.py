@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_remove_profile_login_link_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deleteduser',
+            index=models.Index(fields=['-deleted_at', '-id'], name='deleteduser_deleted_at_id'),
+        ),
+        migrations.AddIndex(
+            model_name='deleteduser',
+            index=models.Index(fields=['role', '-deleted_at', '-id'], name='deleteduser_role_deleted_at'),
+        ),
+    ]
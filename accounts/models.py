@@ -1,7 +1,7 @@
 # accounts/models.py
 
 from django.conf import settings
-from django.contrib.auth.models import AbstractUser, Group, Permission
+from django.contrib.auth.models import AbstractUser, Group, Permission, UserManager
 from django.db import models
 from django.utils import timezone
 from django.db.models.signals import post_save
@@ -24,10 +24,38 @@ CUSTOMER_TYPES = (
     ("Received", "Received"),
 )
 
+class SoftDeleteQuerySet(models.QuerySet):
+    def live(self):
+        """Users that are not in the recycle bin"""
+        return self.filter(is_deleted=False)
+
+    def deleted(self):
+        """Users that have been soft deleted"""
+        return self.filter(is_deleted=True)
+
+    def soft_delete(self):
+        """Soft delete every row with one UPDATE, without calling save() per user"""
+        now = timezone.now()
+        return self.live().update(is_deleted=True, deleted_at=now, updated_at=now)
+
+    def restore(self):
+        return self.deleted().update(is_deleted=False, deleted_at=None, updated_at=timezone.now())
+
+class SoftDeleteUserManager(UserManager.from_queryset(SoftDeleteQuerySet)):
+    """
+    Default manager for User. It still returns every row, because auth,
+    the admin and the recycle bin need deleted users too; use
+    User.objects.live() / .deleted() to pick a side.
+    """
+    pass
+
 # Use your custom User model instead of Django's built-in
 class User(AbstractUser):
     is_deleted = models.BooleanField(default=False)
     deleted_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = SoftDeleteUserManager()
 
     # Fix reverse accessor clashes
     groups = models.ManyToManyField(
@@ -59,6 +87,13 @@ class User(AbstractUser):
 
     class Meta:
         swappable = 'AUTH_USER_MODEL'
+        indexes = [
+            # Partial indexes: live-user listings never touch soft-deleted rows.
+            # Backends without partial index support (MySQL) skip them.
+            models.Index(fields=['id'], condition=models.Q(is_deleted=False), name='user_live_id'),
+            models.Index(fields=['-date_joined'], condition=models.Q(is_deleted=False), name='user_live_date_joined'),
+            models.Index(fields=['-deleted_at'], condition=models.Q(is_deleted=True), name='user_deleted_at'),
+        ]
 
 class Profile(models.Model):
     user = models.OneToOneField(
@@ -70,6 +105,7 @@ class Profile(models.Model):
     press_name = models.CharField(max_length=100, blank=True, null=True)
     raw_password = models.CharField(max_length=100, blank=True, null=True)
     staff_type = models.CharField(max_length=20, choices=STAFF_TYPES, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def __str__(self):
         return f"{self.user.username} Profile"
@@ -85,6 +121,7 @@ class CustomerProfile(models.Model):
     press_name = models.CharField(max_length=100, blank=True, null=True)
     raw_password = models.CharField(max_length=100, blank=True, null=True)
     customer_type = models.CharField(max_length=20, choices=CUSTOMER_TYPES, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.user.username} Customer Profile"
@@ -101,31 +138,44 @@ class DeletedUser(models.Model):
     deleted_reason = models.TextField(blank=True, null=True)
     unique_deleted_id = models.CharField(max_length=50, unique=True, default=uuid.uuid4)
     role = models.CharField(max_length=50, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Recycle bin listing is newest first with keyset pagination on (deleted_at, id)
+            models.Index(fields=['-deleted_at', '-id'], name='deleteduser_deleted_at_id'),
+            models.Index(fields=['role', '-deleted_at', '-id'], name='deleteduser_role_deleted_at'),
+        ]
     
     def __str__(self):
         return f"{self.username} (deleted)"
 
+class DataVersion(models.Model):
+    """
+    Change counter per data set (users, profiles, jobs, ...). Bumped by signals
+    so caches, ETags and exports can tell cheaply whether anything changed.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
 # Signals
 @receiver(post_save, sender=User)
-def create_user_profiles(sender, instance, created, **kwargs):
+def create_user_profiles(sender, instance, created, raw=False, **kwargs):
     """
-    Ensure every newly created User has a corresponding profile.
-    This signal now creates the appropriate profile based on the user's group.
+    Fallback for users created outside accounts.provisioning (createsuperuser,
+    shell scripts): give them a profile. A new user cannot have groups yet,
+    so superusers get a Profile and everyone else a CustomerProfile.
     """
-    if created:
-        if instance.is_superuser or instance.groups.filter(name="Staff").exists() or instance.groups.filter(name="Admin").exists():
-            Profile.objects.get_or_create(user=instance)
-        else: # Default to CustomerProfile
-            last_profile = CustomerProfile.objects.order_by("-id").first()
-            
-            if last_profile and last_profile.customer_id:
-                try:
-                    last_number = int("".join(filter(str.isdigit, last_profile.customer_id)))
-                except ValueError:
-                    last_number = 0
-                new_number = last_number + 1
-            else:
-                new_number = 1
-
-            customer_id = f"AOP{new_number:04d}"
-            CustomerProfile.objects.get_or_create(user=instance, customer_id=customer_id)
\ No newline at end of file
+    if not created or raw:
+        return
+    if instance.is_superuser:
+        Profile.objects.get_or_create(user=instance)
+    else:
+        from .provisioning import last_customer_number
+        CustomerProfile.objects.get_or_create(
+            user=instance, defaults={"customer_id": f"AOP{last_customer_number() + 1:04d}"}
+        )
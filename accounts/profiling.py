@@ -0,0 +1,300 @@
+# accounts/profiling.py
+# Opt-in profiling of single requests for admins. Add ?_profile=1 to a URL
+# (or send the header "X-Profile: 1") and the request runs under cProfile
+# with its SQL queries logged. Each profile is kept on disk under
+# settings.PROFILE_ROOT, newest settings.PROFILE_KEEP only, and listed on
+# the admin profiles page; the response carries its id in X-Profile-Id.
+import cProfile
+import json
+import os
+import pstats
+import re
+import secrets
+import sys
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+PROFILE_PARAM = "_profile"
+PROFILE_HEADER = "X-Profile"
+TOP_FUNCTIONS = 40
+MAX_LOGGED_QUERIES = 500
+PROFILE_ID_RE = re.compile(r"\d{8}-\d{6}-\d{6}-[0-9a-f]{4}")
+
+
+def profile_requested(request):
+    return request.GET.get(PROFILE_PARAM) == "1" or request.headers.get(PROFILE_HEADER) == "1"
+
+
+def can_profile(user):
+    # Imported here: the views import this module
+    from .views import is_admin
+
+    return user.is_authenticated and is_admin(user)
+
+
+class QueryLog:
+    """Execute wrapper recording the queries run on this thread's connections"""
+
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.queries) < MAX_LOGGED_QUERIES:
+                # Parameters are left out, they can hold password hashes and personal data
+                self.queries.append({
+                    "db": context["connection"].alias,
+                    "sql": sql,
+                    "many": many,
+                    "ms": round(elapsed * 1000, 2),
+                })
+
+    def install(self):
+        for connection in connections.all():
+            connection.execute_wrappers.append(self)
+
+    def uninstall(self):
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+
+class ThreadProfile:
+    """A profiler and a query log, both active on the thread that starts them"""
+
+    def __init__(self, queries):
+        self.profiler = cProfile.Profile()
+        self.queries = queries
+
+    def start(self):
+        self.queries.install()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.queries.uninstall()
+
+    def __enter__(self):
+        self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class Recording:
+    """Profilers and query log of one request, saved once its response is done"""
+
+    def __init__(self, request, is_async=False):
+        self.request = request
+        self.is_async = is_async
+        self.started_at = timezone.now()
+        self.id = f"{self.started_at:%Y%m%d-%H%M%S-%f}-{secrets.token_hex(2)}"
+        self.start = time.perf_counter()
+        self.queries = QueryLog()
+        self.thread = ThreadProfile(self.queries)
+        # Under ASGI the event loop thread is profiled separately
+        self.loop = cProfile.Profile() if is_async else None
+        self.body_profiled = True
+
+    def save(self, response):
+        duration = time.perf_counter() - self.start
+        stats = pstats.Stats()
+        for profiler in filter(None, [self.thread.profiler, self.loop]):
+            profiler.create_stats()
+            if profiler.stats:
+                stats.add(profiler)
+
+        record = {
+            "id": self.id,
+            "started_at": self.started_at.isoformat(),
+            "method": self.request.method,
+            "path": self.request.get_full_path(),
+            "user": self.request.user.get_username(),
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 1),
+            "query_count": self.queries.count,
+            "query_ms": round(self.queries.seconds * 1000, 1),
+            "is_async": self.is_async,
+            "body_profiled": self.body_profiled,
+            "functions": top_functions(stats),
+            "queries": self.queries.queries,
+        }
+        store_profile(record, stats)
+
+
+def short_path(filename):
+    """File name relative to the project or to the sys.path entry it lives under"""
+    for prefix in sorted([str(settings.BASE_DIR), *sys.path], key=len, reverse=True):
+        if prefix and filename.startswith(prefix.rstrip(os.sep) + os.sep):
+            return filename[len(prefix.rstrip(os.sep)) + 1:]
+    return filename
+
+
+def top_functions(stats, limit=TOP_FUNCTIONS):
+    """Functions with the most cumulative time, as {"function", "calls", "own_ms", "cumulative_ms"} dicts"""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    functions = []
+    for (filename, line, name), (primitive_calls, calls, own, cumulative, _) in rows:
+        location = f"{short_path(filename)}:{line}" if line else filename
+        functions.append({
+            "function": f"{name} ({location})",
+            "calls": calls if calls == primitive_calls else f"{calls}/{primitive_calls}",
+            "own_ms": round(own * 1000, 1),
+            "cumulative_ms": round(cumulative * 1000, 1),
+        })
+    return functions
+
+
+def profile_root():
+    return Path(settings.PROFILE_ROOT)
+
+
+def store_profile(record, stats):
+    """Write the record and the raw cProfile data, then drop the oldest beyond PROFILE_KEEP"""
+    root = profile_root()
+    root.mkdir(parents=True, exist_ok=True)
+    stats.dump_stats(root / f"{record['id']}.prof")
+    path = root / f"{record['id']}.json"
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(record))
+    os.replace(tmp_path, path)
+
+    # Ids start with the time, so name order is age order
+    for old in sorted(root.glob("*.json"), reverse=True)[settings.PROFILE_KEEP:]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def recent_profiles():
+    """Stored profile records, newest first"""
+    records = []
+    for path in sorted(profile_root().glob("*.json"), reverse=True):
+        try:
+            records.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            # Pruned by another worker in the meantime
+            continue
+    return records
+
+
+def load_profile(profile_id):
+    """The stored record for profile_id, or None"""
+    if not PROFILE_ID_RE.fullmatch(profile_id):
+        return None
+    try:
+        return json.loads((profile_root() / f"{profile_id}.json").read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def profile_data_path(profile_id):
+    """The raw cProfile file (pstats format) of a stored profile, or None"""
+    path = profile_root() / f"{profile_id}.prof"
+    return path if PROFILE_ID_RE.fullmatch(profile_id) and path.exists() else None
+
+
+def profiled_chunks(chunks, recording, response):
+    """Iterate a streaming body with the request's profiler on, saving the profile at the end"""
+    try:
+        chunks = iter(chunks)
+        while True:
+            with recording.thread:
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        recording.save(response)
+
+
+async def aprofiled_chunks(chunks, recording, response):
+    """
+    Async counterpart of profiled_chunks; the sync thread's profiler stays
+    on until the body is done
+    """
+    try:
+        chunks = aiter(chunks)
+        while True:
+            recording.loop.enable()
+            try:
+                chunk = await anext(chunks)
+            except StopAsyncIteration:
+                break
+            finally:
+                recording.loop.disable()
+            yield chunk
+    finally:
+        await sync_to_async(recording.thread.stop)()
+        await sync_to_async(recording.save)(response)
+
+
+class ProfilerMiddleware:
+    """
+    Profile requests that ask for it, for admins only. Streaming bodies
+    are profiled as they are sent.
+
+    Under ASGI the event loop and the sync thread (where the ORM runs) are
+    both profiled, so work done for concurrent requests in that time is
+    included too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not profile_requested(request) or not can_profile(request.user):
+            return self.get_response(request)
+
+        recording = Recording(request)
+        with recording.thread:
+            response = self.get_response(request)
+        response["X-Profile-Id"] = recording.id
+        if response.streaming and not response.is_async:
+            response.streaming_content = profiled_chunks(response.streaming_content, recording, response)
+        else:
+            recording.body_profiled = not response.streaming
+            recording.save(response)
+        return response
+
+    async def __acall__(self, request):
+        if not profile_requested(request) or not await sync_to_async(can_profile)(await request.auser()):
+            return await self.get_response(request)
+
+        recording = Recording(request, is_async=True)
+        await sync_to_async(recording.thread.start)()
+        recording.loop.enable()
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            recording.loop.disable()
+            await sync_to_async(recording.thread.stop)()
+            raise
+        recording.loop.disable()
+        response["X-Profile-Id"] = recording.id
+        if response.streaming and response.is_async:
+            response.streaming_content = aprofiled_chunks(response.streaming_content, recording, response)
+        else:
+            # Django reads a sync streaming body in another thread under ASGI
+            recording.body_profiled = not response.streaming
+            await sync_to_async(recording.thread.stop)()
+            await sync_to_async(recording.save)(response)
+        return response
@@ -0,0 +1,269 @@
+# accounts/provisioning.py
+# Creating users: the User row, its group and the profile type that matches
+# its role, in one transaction. The number of queries is the same for one
+# user or a thousand.
+import os
+import secrets
+import string
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from . import versioning
+from .models import CUSTOMER_TYPES, STAFF_TYPES, CustomerProfile, Profile, User
+
+ROLES = ("Admin", "Staff", "Customer")
+USERNAME_PREFIXES = {"Admin": "ADMIN", "Staff": "STAFF", "Customer": "AOP"}
+
+# Fields a batch record may carry, with their length limits
+SPEC_FIELDS = {
+    "first_name": 30,
+    "last_name": 30,
+    "email": User._meta.get_field("email").max_length,
+    "whatsapp_number": CustomerProfile._meta.get_field("whatsapp_number").max_length,
+    "press_name": Profile._meta.get_field("press_name").max_length,
+    "role": None,
+    "customer_type": None,
+    "staff_type": None,
+}
+
+
+def generate_password(length=12):
+    """Generate a random password with mixed characters"""
+    chars = string.ascii_letters + string.digits + "!@#$%^&*"
+    return ''.join(secrets.choice(chars) for _ in range(length))
+
+
+def last_number(value):
+    """Trailing number of a username or customer id ("AOP0042" -> 42), 0 if none"""
+    digits = "".join(filter(str.isdigit, value or ""))
+    return int(digits) if digits else 0
+
+
+def last_username_number(prefix):
+    """Number of the newest username with this prefix"""
+    username = (
+        User.objects.filter(username__startswith=prefix)
+        .order_by("-id").values_list("username", flat=True).first()
+    )
+    return last_number(username)
+
+
+def last_customer_number():
+    """Number of the newest AOP customer id"""
+    return last_number(
+        CustomerProfile.objects.exclude(customer_id__isnull=True)
+        .order_by("-id").values_list("customer_id", flat=True).first()
+    )
+
+
+def init_hash_worker():
+    # Needed when workers are spawned rather than forked
+    django.setup()
+
+
+def hash_passwords(raw_passwords, hash_password=make_password, workers=None):
+    """
+    Hash passwords at the hasher's full strength. Each hash takes a few
+    hundred milliseconds of CPU, so more than one is spread over a process
+    pool of up to `workers` (default: one per CPU) processes.
+    """
+    raw_passwords = list(raw_passwords)
+    workers = min(workers or os.cpu_count() or 1, len(raw_passwords))
+    if workers <= 1:
+        return [hash_password(raw) for raw in raw_passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_hash_worker) as pool:
+        return list(pool.map(hash_password, raw_passwords, chunksize=max(1, len(raw_passwords) // (workers * 4))))
+
+
+def format_username(role, number):
+    return f"{USERNAME_PREFIXES[role]}{number:0{4 if role == 'Customer' else 3}d}"
+
+
+def role_groups(roles):
+    """Group for each non-admin role, created if missing"""
+    names = {role for role in roles if role != "Admin"}
+    if not names:
+        return {}
+    groups = {group.name: group for group in Group.objects.filter(name__in=names)}
+    if names - groups.keys():
+        Group.objects.bulk_create([Group(name=name) for name in names - groups.keys()], ignore_conflicts=True)
+        versioning.bump(versioning.GROUPS)
+        groups = {group.name: group for group in Group.objects.filter(name__in=names)}
+    return groups
+
+
+def validate_specs(records):
+    """
+    Check a batch of user records (dicts with SPEC_FIELDS) the way
+    UserCreateForm checks one: required names and email, a known role and
+    type, and emails / WhatsApp numbers used neither twice in the batch nor
+    by an existing user. Existing values are fetched with one query each.
+
+    Returns (specs, errors); errors are {"index", "field", "message"} dicts
+    and specs is only usable when errors is empty.
+    """
+    specs, errors = [], []
+
+    def error(index, field, message):
+        errors.append({"index": index, "field": field, "message": message})
+
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            error(index, None, "Expected an object")
+            specs.append({})
+            continue
+        unknown = set(record) - SPEC_FIELDS.keys()
+        if unknown:
+            error(index, None, f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        spec = {field: str(record[field]).strip() for field in SPEC_FIELDS if record.get(field) not in (None, "")}
+        spec.setdefault("role", "Customer")
+        for field, max_length in SPEC_FIELDS.items():
+            if max_length and len(spec.get(field, "")) > max_length:
+                error(index, field, f"Ensure this value has at most {max_length} characters.")
+        for field in ("first_name", "last_name", "email"):
+            if not spec.get(field):
+                error(index, field, "This field is required.")
+        if spec.get("email"):
+            try:
+                validate_email(spec["email"])
+            except ValidationError:
+                error(index, "email", "Enter a valid email address.")
+
+        role = spec["role"]
+        if role not in ROLES:
+            error(index, "role", f"Unknown role: {role}")
+        if spec.get("customer_type") and spec["customer_type"] not in dict(CUSTOMER_TYPES):
+            error(index, "customer_type", f"Unknown customer type: {spec['customer_type']}")
+        if spec.get("staff_type") and spec["staff_type"] not in dict(STAFF_TYPES):
+            error(index, "staff_type", f"Unknown staff type: {spec['staff_type']}")
+        # Only the role's own profile type is stored
+        spec.pop("staff_type" if role == "Customer" else "customer_type", None)
+        specs.append(spec)
+
+    emails = {spec["email"].lower() for spec in specs if spec.get("email")}
+    whatsapp_numbers = {spec["whatsapp_number"] for spec in specs if spec.get("whatsapp_number")}
+    taken_emails = set(
+        User.objects.annotate(email_lower=Lower("email"))
+        .filter(email_lower__in=emails).values_list("email_lower", flat=True)
+    ) if emails else set()
+    taken_whatsapp = set(
+        Profile.objects.filter(whatsapp_number__in=whatsapp_numbers).values_list("whatsapp_number", flat=True)
+        .union(CustomerProfile.objects.filter(whatsapp_number__in=whatsapp_numbers).values_list("whatsapp_number", flat=True))
+    ) if whatsapp_numbers else set()
+
+    seen_emails, seen_whatsapp = {}, {}
+    for index, spec in enumerate(specs):
+        email, whatsapp = spec.get("email", "").lower(), spec.get("whatsapp_number")
+        if email in taken_emails:
+            error(index, "email", "This email is already registered.")
+        elif email and email in seen_emails:
+            error(index, "email", f"Same email as record {seen_emails[email]}.")
+        if whatsapp in taken_whatsapp:
+            error(index, "whatsapp_number", "This WhatsApp number is already registered.")
+        elif whatsapp and whatsapp in seen_whatsapp:
+            error(index, "whatsapp_number", f"Same WhatsApp number as record {seen_whatsapp[whatsapp]}.")
+        if email:
+            seen_emails.setdefault(email, index)
+        if whatsapp:
+            seen_whatsapp.setdefault(whatsapp, index)
+
+    errors.sort(key=lambda entry: entry["index"])
+    return specs, errors
+
+
+def provision_users(specs, hash_password=make_password):
+    """
+    Create users from dicts with a role ("Admin", "Staff" or "Customer") and
+    any of: username, email, first_name, last_name, password (raw),
+    password_hash, whatsapp_number, press_name, customer_type, staff_type.
+
+    Missing usernames follow the ADMIN001 / STAFF001 / AOP0001 scheme and
+    missing passwords are generated. Admins become superusers; staff and
+    customers join their group. Admins and staff get a Profile, customers a
+    CustomerProfile with the next AOP customer id.
+
+    Returns [(user, raw_password)] in input order, with the user's profile
+    already attached. Raises ValueError for an unknown role.
+    """
+    specs = list(specs)
+    for spec in specs:
+        if spec.get("role") not in ROLES:
+            raise ValueError(f"Unknown role: {spec.get('role')}")
+    if not specs:
+        return []
+
+    # Hash before opening the transaction; it is by far the slowest part
+    passwords = [spec.get("password") or generate_password() for spec in specs]
+    hashed = iter(hash_passwords(
+        [raw for spec, raw in zip(specs, passwords) if not spec.get("password_hash")], hash_password,
+    ))
+    hashes = [spec.get("password_hash") or next(hashed) for spec in specs]
+
+    with transaction.atomic():
+        roles = {spec["role"] for spec in specs}
+        groups = role_groups(roles)
+        numbers = {
+            role: last_username_number(USERNAME_PREFIXES[role])
+            for role in {spec["role"] for spec in specs if not spec.get("username")}
+        }
+        customer_number = last_customer_number() if "Customer" in roles else 0
+
+        users = []
+        for spec, hashed in zip(specs, hashes):
+            role = spec["role"]
+            username = spec.get("username")
+            if not username:
+                numbers[role] += 1
+                username = format_username(role, numbers[role])
+            users.append(User(
+                username=username,
+                email=spec.get("email") or "",
+                first_name=spec.get("first_name") or "",
+                last_name=spec.get("last_name") or "",
+                password=hashed,
+                is_superuser=role == "Admin",
+                is_staff=role == "Admin",
+            ))
+        # bulk_create sends no post_save, so the create_user_profiles fallback stays out of the way
+        User.objects.bulk_create(users)
+
+        User.groups.through.objects.bulk_create([
+            User.groups.through(user_id=user.pk, group_id=groups[spec["role"]].pk)
+            for user, spec in zip(users, specs) if spec["role"] != "Admin"
+        ])
+
+        profiles, customer_profiles = [], []
+        for user, spec, raw_password in zip(users, specs, passwords):
+            contact = {
+                "whatsapp_number": spec.get("whatsapp_number") or None,
+                "press_name": spec.get("press_name") or None,
+                "raw_password": raw_password,
+            }
+            # Passing user= also caches the profile on the user
+            if spec["role"] == "Customer":
+                customer_number += 1
+                customer_profiles.append(CustomerProfile(
+                    user=user, customer_id=f"AOP{customer_number:04d}",
+                    customer_type=spec.get("customer_type") or None, **contact,
+                ))
+            else:
+                profiles.append(Profile(user=user, staff_type=spec.get("staff_type") or None, **contact))
+        Profile.objects.bulk_create(profiles)
+        CustomerProfile.objects.bulk_create(customer_profiles)
+
+        versioning.bump(versioning.USERS, versioning.PROFILES, versioning.CUSTOMER_PROFILES)
+
+    return list(zip(users, passwords))
+
+
+def provision_user(role, **fields):
+    """Create one user; see provision_users. Returns (user, raw_password)."""
+    return provision_users([dict(fields, role=role)])[0]
@@ -0,0 +1,193 @@
+# accounts/recycle_bin.py
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import versioning
+from .models import User, DeletedUser
+
+RECYCLE_BIN_ROLES = ["Admin", "Staff", "Customer"]
+RECYCLE_BIN_PAGE_SIZE = 50
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+
+def user_role(user):
+    """Role stored on the recycle bin entry; expects groups to be prefetched"""
+    if user.is_superuser:
+        return "Admin"
+    groups = list(user.groups.all())
+    if groups:
+        return min(groups, key=lambda group: group.pk).name
+    return "Customer"
+
+
+def user_whatsapp_number(user):
+    if hasattr(user, 'account_profile'):
+        return user.account_profile.whatsapp_number
+    elif hasattr(user, 'customer_profile'):
+        return user.customer_profile.whatsapp_number
+    return None
+
+
+def soft_delete_users(user_ids):
+    """
+    Move users to the recycle bin: one DeletedUser row per user via
+    bulk_create and a single UPDATE of is_deleted/deleted_at.
+    Users already in the recycle bin are skipped. Returns the number moved.
+    """
+    with transaction.atomic():
+        users = list(
+            User.objects.live().filter(id__in=user_ids)
+            .select_related('account_profile', 'customer_profile')
+            .prefetch_related('groups')
+            .select_for_update(of=('self',))
+        )
+        if not users:
+            return 0
+
+        DeletedUser.objects.bulk_create([
+            DeletedUser(
+                original_id=user.id,  # Save the original ID for restoration
+                first_name=user.first_name,
+                last_name=user.last_name,
+                username=user.username,
+                email=user.email,
+                whatsapp_number=user_whatsapp_number(user),
+                role=user_role(user),
+            )
+            for user in users
+        ])
+        User.objects.filter(id__in=[user.id for user in users]).soft_delete()
+        # bulk_create and queryset updates bypass post_save
+        versioning.bump(versioning.USERS, versioning.DELETED_USERS)
+    return len(users)
+
+
+def restore_users(deleted_ids):
+    """
+    Restore recycle bin entries with one UPDATE on users and one DELETE on
+    the entries. Returns (restored, missing) where missing lists the
+    usernames whose original user record no longer exists.
+    """
+    with transaction.atomic():
+        entries = list(DeletedUser.objects.filter(id__in=deleted_ids).values_list('id', 'original_id', 'username'))
+        original_ids = {original_id for _, original_id, _ in entries}
+        existing = set(User.objects.filter(id__in=original_ids).values_list('id', flat=True))
+
+        restored = User.objects.filter(id__in=existing).restore()
+        versioning.bump(versioning.USERS)
+        DeletedUser.objects.filter(id__in=[entry_id for entry_id, _, _ in entries]).delete()
+
+    missing = [username for _, original_id, username in entries if original_id not in existing]
+    return restored, missing
+
+
+def purge_deleted_users(deleted_ids):
+    """
+    Permanently delete recycle bin entries and their original users.
+    Returns the number of entries removed.
+    """
+    with transaction.atomic():
+        entries = DeletedUser.objects.filter(id__in=deleted_ids)
+        original_ids = [original_id for original_id in entries.values_list('original_id', flat=True) if original_id]
+        if original_ids:
+            # QuerySet.delete() bypasses User.delete(), so this is a real delete. A user
+            # restored outside the recycle bin (is_deleted unticked in the admin) is
+            # live again and is left alone; only its stale entry goes.
+            User.objects.filter(id__in=original_ids, is_deleted=True).delete()
+        purged, _ = entries.delete()
+    return purged
+
+
+def encode_cursor(entry):
+    """Opaque keyset cursor for the entry a page ended on"""
+    micros = (entry.deleted_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}.{entry.id}"
+
+
+def decode_cursor(cursor):
+    """Return (deleted_at, id) from a cursor; raises ValueError if it is malformed"""
+    micros, entry_id = cursor.split(".")
+    try:
+        return _EPOCH + timedelta(microseconds=int(micros)), int(entry_id)
+    except OverflowError:
+        raise ValueError(f"Cursor out of range: {cursor}")
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_recycle_bin(params):
+    """
+    Recycle bin entries newest first, filtered in SQL by role and the
+    date_from/date_to deletion dates. Raises ValueError for bad dates.
+    """
+    entries = DeletedUser.objects.all()
+
+    role = params.get("role")
+    if role:
+        entries = entries.filter(role=role)
+
+    for param in ("date_from", "date_to"):
+        value = params.get(param)
+        if not value:
+            continue
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid {param}: {value}")
+        if param == "date_from":
+            entries = entries.filter(deleted_at__gte=_day_start(day))
+        else:
+            entries = entries.filter(deleted_at__lt=_day_start(day + timedelta(days=1)))
+
+    return entries.order_by('-deleted_at', '-id')
+
+
+def recycle_bin_query(entries, cursor=None, page_size=RECYCLE_BIN_PAGE_SIZE):
+    """The entries to fetch for one keyset page: page_size + 1 after the cursor"""
+    if cursor:
+        deleted_at, entry_id = decode_cursor(cursor)
+        entries = entries.filter(
+            Q(deleted_at__lt=deleted_at) | Q(deleted_at=deleted_at, id__lt=entry_id)
+        )
+    return entries[:page_size + 1]
+
+
+def split_page(page, page_size=RECYCLE_BIN_PAGE_SIZE):
+    if len(page) > page_size:
+        page = page[:page_size]
+        return page, encode_cursor(page[-1])
+    return page, None
+
+
+def recycle_bin_page(entries, cursor=None, page_size=RECYCLE_BIN_PAGE_SIZE):
+    """
+    One keyset page of an ordered recycle bin queryset, starting after the
+    cursor. Returns (entries, next_cursor); next_cursor is None on the last page.
+    """
+    return split_page(list(recycle_bin_query(entries, cursor, page_size)), page_size)
+
+
+async def arecycle_bin_page(entries, cursor=None, page_size=RECYCLE_BIN_PAGE_SIZE):
+    """recycle_bin_page for async views"""
+    return split_page([entry async for entry in recycle_bin_query(entries, cursor, page_size)], page_size)
+
+
+def entry_json(entry):
+    """A recycle bin entry as the JSON listing returns it"""
+    return {
+        "id": entry.id,
+        "original_id": entry.original_id,
+        "username": entry.username,
+        "first_name": entry.first_name,
+        "last_name": entry.last_name,
+        "email": entry.email,
+        "whatsapp_number": entry.whatsapp_number,
+        "role": entry.role,
+        "deleted_at": entry.deleted_at.isoformat(),
+    }
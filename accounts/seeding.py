@@ -0,0 +1,141 @@
+# accounts/seeding.py
+# Synthetic users for load testing and benchmarks (see manage.py seed_data)
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import versioning
+from .models import CUSTOMER_TYPES, STAFF_TYPES, CustomerProfile, DeletedUser, Profile, User
+from .provisioning import USERNAME_PREFIXES, format_username, last_customer_number, last_username_number
+
+# Share of each role among seeded users
+ROLE_WEIGHTS = {"Admin": 1, "Staff": 9, "Customer": 90}
+
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Arjun", "Rohan", "Karan", "Rahul", "Amit", "Suresh", "Vijay",
+    "Priya", "Ananya", "Diya", "Kavya", "Neha", "Pooja", "Sneha", "Meera", "Lakshmi", "Asha",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Patel", "Shah", "Reddy", "Nair", "Iyer", "Gupta", "Joshi", "Kulkarni",
+    "Desai", "Mehta", "Rao", "Pillai", "Singh", "Das", "Bose", "Jain", "Agarwal", "Chopra",
+]
+PRESS_SUFFIXES = ["Press", "Printers", "Offset", "Graphics", "Prints"]
+
+
+def build_user(rng, role, number, now, password_hash, deleted):
+    first_name = rng.choice(FIRST_NAMES)
+    last_name = rng.choice(LAST_NAMES)
+    username = format_username(role, number)
+    deleted_at = now - timedelta(minutes=rng.randrange(90 * 24 * 60)) if deleted else None
+    return User(
+        username=username,
+        password=password_hash,
+        email=f"{username.lower()}@example.com",
+        first_name=first_name,
+        last_name=last_name,
+        is_superuser=role == "Admin",
+        is_staff=role == "Admin",
+        date_joined=now - timedelta(minutes=rng.randrange(3 * 365 * 24 * 60)),
+        is_deleted=deleted,
+        deleted_at=deleted_at,
+    )
+
+
+def seed_users(count, deleted=0, password="password", batch_size=5000, rng=None, progress=None):
+    """
+    bulk_create `count` users with roles drawn from ROLE_WEIGHTS, their group
+    memberships and the matching Profile / CustomerProfile. `deleted` of them
+    are soft deleted and get a recycle bin entry. The password is hashed once
+    and shared, which is what makes large seeds fast.
+
+    progress, if given, is called with the number created so far after each batch.
+    """
+    if deleted > count:
+        raise ValueError("Cannot soft delete more users than are created")
+
+    rng = rng or random.Random()
+    roles = list(ROLE_WEIGHTS)
+    weights = list(ROLE_WEIGHTS.values())
+    password_hash = make_password(password)
+    groups = {name: Group.objects.get_or_create(name=name)[0] for name in ("Staff", "Customer")}
+    numbers = {role: last_username_number(prefix) for role, prefix in USERNAME_PREFIXES.items()}
+    customer_number = last_customer_number()
+    whatsapp_base = User.objects.aggregate(last=Max("id"))["last"] or 0
+    deleted_positions = set(rng.sample(range(count), deleted))
+    now = timezone.now()
+    Membership = User.groups.through
+
+    created = 0
+    while created < count:
+        batch = []
+        for position in range(created, min(created + batch_size, count)):
+            role = rng.choices(roles, weights=weights)[0]
+            numbers[role] += 1
+            user = build_user(rng, role, numbers[role], now, password_hash, position in deleted_positions)
+            whatsapp = f"9{(whatsapp_base + position + 1) % 10**9:09d}"
+            batch.append((user, role, whatsapp))
+
+        with transaction.atomic():
+            users = User.objects.bulk_create([user for user, _, _ in batch])
+            if users and users[0].pk is None:
+                # Backends that cannot return ids from a bulk insert
+                ids = dict(User.objects.filter(username__in=[user.username for user in users])
+                           .values_list("username", "id"))
+                for user in users:
+                    user.pk = ids[user.username]
+
+            memberships, profiles, customer_profiles, entries = [], [], [], []
+            for user, role, whatsapp in batch:
+                press_name = f"{user.last_name} {rng.choice(PRESS_SUFFIXES)}"
+                if role != "Admin":
+                    memberships.append(Membership(user_id=user.pk, group_id=groups[role].pk))
+                if role == "Customer":
+                    customer_number += 1
+                    customer_profiles.append(CustomerProfile(
+                        user_id=user.pk,
+                        customer_id=f"AOP{customer_number:04d}",
+                        whatsapp_number=whatsapp,
+                        press_name=press_name,
+                        raw_password=password,
+                        customer_type=rng.choice(CUSTOMER_TYPES)[0],
+                    ))
+                else:
+                    profiles.append(Profile(
+                        user_id=user.pk,
+                        whatsapp_number=whatsapp,
+                        press_name=press_name,
+                        raw_password=password,
+                        staff_type=rng.choice(STAFF_TYPES)[0] if role == "Staff" else None,
+                    ))
+                if user.is_deleted:
+                    entries.append(DeletedUser(
+                        original_id=user.pk,
+                        username=user.username,
+                        email=user.email,
+                        first_name=user.first_name,
+                        last_name=user.last_name,
+                        whatsapp_number=whatsapp,
+                        date_joined=user.date_joined,
+                        role=role,
+                    ))
+
+            Membership.objects.bulk_create(memberships)
+            Profile.objects.bulk_create(profiles)
+            CustomerProfile.objects.bulk_create(customer_profiles)
+            DeletedUser.objects.bulk_create(entries)
+
+        created += len(batch)
+        if progress:
+            progress(created)
+
+    if created:
+        # bulk_create does not send post_save or m2m_changed
+        versioning.bump(
+            versioning.USERS, versioning.PROFILES, versioning.CUSTOMER_PROFILES, versioning.DELETED_USERS,
+        )
+    return created
@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.db import transaction
-from .models import CustomerProfile
+from . import versioning
+from .models import User, Profile, CustomerProfile, DeletedUser
 
 @receiver(post_save, sender=CustomerProfile)
 def generate_customer_id(sender, instance, created, **kwargs):
@@ -16,3 +18,26 @@ def generate_customer_id(sender, instance, created, **kwargs):
             instance.customer_id = f"AOP{new_number:04d}"
             instance.save(update_fields=["customer_id"])
         transaction.on_commit(set_customer_id)
+
+VERSIONED_MODELS = {
+    User: versioning.USERS,
+    Profile: versioning.PROFILES,
+    CustomerProfile: versioning.CUSTOMER_PROFILES,
+    Group: versioning.GROUPS,
+    DeletedUser: versioning.DELETED_USERS,
+}
+
+def bump_data_version(sender, update_fields=None, **kwargs):
+    # Logins only touch last_login, which nothing cached depends on
+    if update_fields and set(update_fields) == {"last_login"}:
+        return
+    versioning.bump(VERSIONED_MODELS[sender])
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_data_version, sender=model, dispatch_uid=f"data_version_save_{model.__name__}")
+    post_delete.connect(bump_data_version, sender=model, dispatch_uid=f"data_version_delete_{model.__name__}")
+
+@receiver(m2m_changed, sender=User.groups.through)
+def bump_data_version_on_group_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        versioning.bump(versioning.USERS)
@@ -1,3 +1,436 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import tempfile
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import identify_hasher
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import path, reverse
+from django.utils import timezone
+
+from core import urls as core_urls
+
+from . import async_views, versioning
+from .imports import apply_updates, read_user_sheet, validate_user_sheet
+from .models import CustomerProfile, DeletedUser, Profile, User
+from .profiling import load_profile, recent_profiles
+from .provisioning import hash_passwords, provision_user, provision_users, validate_specs
+from .recycle_bin import purge_deleted_users, restore_users, soft_delete_users
+from .views import API_BATCH_LIMIT
+
+
+# The project's URLs plus the async variants, which are only routed under ASGI
+urlpatterns = [
+    path("async/all-users/", async_views.all_users, name="async_all_users"),
+    *core_urls.urlpatterns,
+]
+
+
+def fast_hash(raw_password):
+    # Hashing dominates these tests otherwise
+    return f"plain${raw_password}"
+
+
+def sheet(*rows, header="First Name,Last Name,Email,WhatsApp"):
+    content = "\n".join([header, *rows]) + "\n"
+    return read_user_sheet(SimpleUploadedFile("users.csv", content.encode()))
+
+
+class ProvisionUsersTests(TestCase):
+    def test_creates_users_groups_and_profiles(self):
+        created = provision_users([
+            {"role": "Customer", "email": "c@example.com", "first_name": "C", "whatsapp_number": "9000000001"},
+            {"role": "Staff", "email": "s@example.com", "first_name": "S", "staff_type": "Manager"},
+            {"role": "Admin", "email": "a@example.com", "first_name": "A"},
+        ], hash_password=fast_hash)
+
+        (customer, customer_password), (staff, _), (admin, _) = created
+        self.assertEqual([user.username for user, _ in created], ["AOP0001", "STAFF001", "ADMIN001"])
+        self.assertEqual(customer.password, f"plain${customer_password}")
+
+        customer_profile = CustomerProfile.objects.get(user=customer)
+        self.assertEqual(customer_profile.customer_id, "AOP0001")
+        self.assertEqual(customer_profile.whatsapp_number, "9000000001")
+        self.assertEqual(list(customer.groups.values_list("name", flat=True)), ["Customer"])
+
+        self.assertEqual(Profile.objects.get(user=staff).staff_type, "Manager")
+        self.assertEqual(list(staff.groups.values_list("name", flat=True)), ["Staff"])
+
+        admin.refresh_from_db()
+        self.assertTrue(admin.is_superuser and admin.is_staff)
+        self.assertFalse(admin.groups.exists())
+        self.assertTrue(Profile.objects.filter(user=admin).exists())
+
+    def test_numbers_continue_after_existing_users(self):
+        provision_user("Customer", username="AOP0007", email="old@example.com", password="x")
+        user, _ = provision_user("Customer", email="new@example.com", password="x")
+
+        self.assertEqual(user.username, "AOP0008")
+        self.assertEqual(CustomerProfile.objects.get(user=user).customer_id, "AOP0002")
+
+    def test_unknown_role_creates_nothing(self):
+        with self.assertRaises(ValueError):
+            provision_users([{"role": "Customer", "email": "c@example.com"}, {"role": "Owner"}])
+        self.assertFalse(User.objects.exists())
+
+    def test_passwords_are_hashed_at_full_strength(self):
+        user, raw_password = provision_user("Customer", email="c@example.com")
+
+        self.assertTrue(user.check_password(raw_password))
+        self.assertFalse(identify_hasher(user.password).must_update(user.password))
+
+    def test_hash_passwords_in_a_process_pool(self):
+        self.assertEqual(hash_passwords(["a", "b", "c"], fast_hash, workers=2), ["plain$a", "plain$b", "plain$c"])
+
+    def test_validate_specs_reports_duplicate_emails(self):
+        provision_user("Customer", email="taken@example.com", password="x")
+
+        _, errors = validate_specs([
+            {"first_name": "A", "last_name": "A", "email": "TAKEN@example.com"},
+            {"first_name": "B", "last_name": "B", "email": "b@example.com"},
+            {"first_name": "C", "last_name": "C", "email": "B@example.com"},
+            {"first_name": "D", "email": "d@example.com", "role": "Owner"},
+        ])
+
+        self.assertEqual(
+            [(error["index"], error["field"]) for error in errors],
+            [(0, "email"), (2, "email"), (3, "last_name"), (3, "role")],
+        )
+
+
+class ProvisionUsersApiTests(TestCase):
+    def setUp(self):
+        provision_user("Admin", username="api", email="api@example.com", password="secret")
+
+    def post(self, users, credentials="api:secret"):
+        return self.client.post(
+            reverse("accounts:provision_users_api"), json.dumps({"users": users}), content_type="application/json",
+            HTTP_AUTHORIZATION="Basic " + base64.b64encode(credentials.encode()).decode(),
+        )
+
+    def test_creates_users_with_full_strength_hashes(self):
+        response = self.post([{"first_name": "C", "last_name": "C", "email": "c@example.com"}])
+
+        self.assertEqual(response.status_code, 201)
+        created = response.json()["users"][0]
+        user = User.objects.get(username=created["username"])
+        self.assertTrue(user.check_password(created["password"]))
+        self.assertFalse(identify_hasher(user.password).must_update(user.password))
+
+    def test_rejects_non_admins_and_oversized_batches(self):
+        self.assertEqual(self.post([], credentials="api:wrong").status_code, 401)
+        too_many = [{"first_name": "C", "last_name": "C", "email": f"c{i}@example.com"} for i in range(API_BATCH_LIMIT + 1)]
+        self.assertEqual(self.post(too_many).status_code, 400)
+        self.assertFalse(User.objects.filter(email="c0@example.com").exists())
+
+
+class UserSheetTests(TestCase):
+    def setUp(self):
+        self.user, _ = provision_user(
+            "Customer", email="cust1@example.com", first_name="Old", last_name="Name",
+            whatsapp_number="9000000001", password="x",
+        )
+
+    def test_new_rows_are_checked(self):
+        frame = validate_user_sheet(sheet(
+            "New,User,new@example.com,9000000002",
+            "No,Email,,",
+            "Bad,Email,not-an-email,",
+            "Dup,Email,cust1@example.com,",
+            "Dup,Number,other@example.com,9000000001",
+        ))
+
+        self.assertEqual(list(frame["status"]), ["ok", "skipped", "error", "error", "error"])
+        self.assertEqual(frame.loc[2, "username"], "new")
+        self.assertEqual(frame.loc[5, "errors"], ["Email already registered"])
+        self.assertEqual(frame.loc[6, "errors"], ["WhatsApp number already registered"])
+
+    def test_upsert_updates_matched_users(self):
+        frame = validate_user_sheet(sheet(
+            "New,Name,cust1@example.com,9000000003",
+        ), upsert=True)
+
+        self.assertEqual(frame.loc[2, "status"], "update")
+        self.assertEqual(frame.loc[2, "changes"], ["first_name", "whatsapp_number"])
+        self.assertEqual(apply_updates(frame), 1)
+
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.first_name, self.user.last_name), ("New", "Name"))
+        self.assertEqual(CustomerProfile.objects.get(user=self.user).whatsapp_number, "9000000003")
+
+    def test_upsert_ignores_case_only_email_differences(self):
+        frame = validate_user_sheet(sheet(
+            "Old,Name,CUST1@Example.com,9000000001",
+        ), upsert=True)
+
+        self.assertEqual(frame.loc[2, "status"], "unchanged")
+        self.assertEqual(apply_updates(frame), 0)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, "cust1@example.com")
+
+    def test_upsert_by_customer_id_with_empty_cells_is_unchanged(self):
+        frame = validate_user_sheet(sheet(
+            ",,,,AOP0001",
+            header="First Name,Last Name,Email,WhatsApp,Customer ID",
+        ), upsert=True)
+
+        self.assertEqual(frame.loc[2, "status"], "unchanged")
+        self.assertEqual(frame.loc[2, "username"], self.user.username)
+        self.assertEqual(apply_updates(frame), 0)
+
+    def test_upsert_does_not_match_users_in_the_recycle_bin(self):
+        soft_delete_users([self.user.id])
+
+        frame = validate_user_sheet(sheet(
+            "New,Name,cust1@example.com,,",
+            "New,Name,,,AOP0001",
+            header="First Name,Last Name,Email,WhatsApp,Customer ID",
+        ), upsert=True)
+
+        self.assertEqual(list(frame["status"]), ["error", "error"])
+        self.assertIn("User is in the recycle bin", frame.loc[2, "errors"])
+        self.assertEqual(frame.loc[3, "errors"], ["User is in the recycle bin"])
+        self.assertEqual(apply_updates(frame), 0)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, "Old")
+
+
+class RecycleBinTests(TestCase):
+    def setUp(self):
+        self.user, _ = provision_user(
+            "Staff", email="staff@example.com", first_name="S", whatsapp_number="9000000001", password="x",
+        )
+
+    def entry(self):
+        return DeletedUser.objects.get(original_id=self.user.id)
+
+    def test_soft_delete_moves_user_to_recycle_bin(self):
+        self.assertEqual(soft_delete_users([self.user.id]), 1)
+        self.assertEqual(soft_delete_users([self.user.id]), 0)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_deleted)
+        self.assertIsNotNone(self.user.deleted_at)
+        entry = self.entry()
+        self.assertEqual((entry.username, entry.role, entry.whatsapp_number), (self.user.username, "Staff", "9000000001"))
+
+    def test_restore_brings_user_back(self):
+        soft_delete_users([self.user.id])
+        entry = self.entry()
+        User.objects.filter(id=self.user.id).delete()
+        other, _ = provision_user("Customer", email="c@example.com", password="x")
+        soft_delete_users([other.id])
+
+        restored, missing = restore_users([entry.id, DeletedUser.objects.get(original_id=other.id).id])
+
+        self.assertEqual((restored, missing), (1, [entry.username]))
+        self.assertTrue(User.objects.live().filter(id=other.id).exists())
+        self.assertFalse(DeletedUser.objects.exists())
+
+    def test_purge_deletes_user_and_entry(self):
+        soft_delete_users([self.user.id])
+
+        self.assertEqual(purge_deleted_users([self.entry().id]), 1)
+        self.assertFalse(User.objects.filter(id=self.user.id).exists())
+        self.assertFalse(DeletedUser.objects.exists())
+
+    def test_purge_keeps_users_restored_outside_the_recycle_bin(self):
+        soft_delete_users([self.user.id])
+        entry = self.entry()
+        # Unticking is_deleted in the admin leaves the entry behind
+        User.objects.filter(id=self.user.id).restore()
+
+        self.assertEqual(purge_deleted_users([entry.id]), 1)
+        self.assertTrue(User.objects.live().filter(id=self.user.id).exists())
+
+
+class RecycleBinViewTests(TestCase):
+    def setUp(self):
+        self.admin, _ = provision_user("Admin", email="admin@example.com", password="x")
+        self.customer, _ = provision_user("Customer", email="cust@example.com", password="x")
+        soft_delete_users([provision_user("Staff", email="gone@example.com", password="x")[0].id])
+
+    def test_recycle_bin_is_admin_only(self):
+        self.client.force_login(self.customer)
+        for name in ("accounts:recycle_bin", "accounts:recycle_bin_json"):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 302, name)
+
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse("accounts:recycle_bin")).status_code, 200)
+        results = self.client.get(reverse("accounts:recycle_bin_json")).json()["results"]
+        self.assertEqual([entry["email"] for entry in results], ["gone@example.com"])
+
+    async def test_async_recycle_bin_json_is_admin_only(self):
+        for user, status in ((self.customer, 302), (self.admin, 200)):
+            request = AsyncRequestFactory().get("/accounts/recycle-bin/json/")
+
+            async def auser(user=user):
+                return user
+
+            request.auser = auser
+            response = await async_views.recycle_bin_json(request)
+            self.assertEqual(response.status_code, status)
+
+
+class WhatsappWelcomeTests(TestCase):
+    def setUp(self):
+        self.admin, _ = provision_user("Admin", email="admin@example.com", password="x")
+        self.new, _ = provision_user("Customer", email="new@example.com", whatsapp_number="9000000001", password="x")
+        self.active, _ = provision_user("Customer", email="active@example.com", whatsapp_number="9000000002", password="x")
+        User.objects.filter(id=self.active.id).update(last_login=timezone.now())
+        self.client.force_login(self.admin)
+
+    def csv_usernames(self, **params):
+        response = self.client.get(reverse("accounts:bulk_whatsapp_welcome"), {"format": "csv", **params})
+        return [row[0] for row in list(csv.reader(io.StringIO(response.content.decode())))[1:]]
+
+    def test_defaults_to_users_who_never_logged_in(self):
+        self.assertEqual(self.csv_usernames(), [self.new.username])
+
+    def test_selected_users_and_explicit_scope_all(self):
+        self.assertEqual(self.csv_usernames(ids=[self.active.id]), [self.active.username])
+        self.assertEqual(self.csv_usernames(scope="all"), [self.new.username, self.active.username])
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class ConditionalPageTests(TestCase):
+    def setUp(self):
+        self.admin, _ = provision_user("Admin", email="admin@example.com", first_name="Ada", password_hash="!")
+
+    def test_unchanged_page_is_a_304_until_data_changes(self):
+        self.client.force_login(self.admin)
+        url = reverse("accounts:all_users")
+        # The first response sets the CSRF cookie, which is part of the ETag
+        self.client.get(url)
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Version bumps are written when the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            provision_user("Customer", email="c@example.com", password_hash="!")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_pending_messages_are_rendered_instead_of_a_304(self):
+        self.client.force_login(self.admin)
+        url = reverse("accounts:all_users")
+        self.client.get(url)
+        etag = self.client.get(url)["ETag"]
+
+        # Queues an error message for the next page, without changing any data
+        self.client.get(reverse("accounts:send_whatsapp_welcome", args=[self.admin.id]))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "doesn&#x27;t have a WhatsApp number")
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    async def test_async_view(self):
+        await self.async_client.aforce_login(self.admin)
+        url = reverse("async_all_users")
+        await self.async_client.get(url)
+        response = await self.async_client.get(url)
+        etag = response["ETag"]
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Ada")
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        response = await self.async_client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        await self.async_client.get(reverse("accounts:send_whatsapp_welcome", args=[self.admin.id]))
+        response = await self.async_client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(self.settings(PROFILE_ROOT=self.root, PROFILE_KEEP=2))
+        self.admin, _ = provision_user("Admin", email="admin@example.com", password_hash="!")
+        self.url = reverse("accounts:all_users")
+
+    def test_only_admins_are_profiled(self):
+        customer, _ = provision_user("Customer", email="c@example.com", password_hash="!")
+        self.client.force_login(customer)
+        self.assertNotIn("X-Profile-Id", self.client.get(self.url, {"_profile": "1"}))
+
+        self.client.force_login(self.admin)
+        self.assertNotIn("X-Profile-Id", self.client.get(self.url))
+        self.assertFalse(list(self.root.iterdir()))
+
+        response = self.client.get(self.url, headers={"X-Profile": "1"})
+        record = load_profile(response["X-Profile-Id"])
+        self.assertEqual((record["path"], record["status"], record["user"]), (self.url, 200, self.admin.username))
+        self.assertGreater(record["query_count"], 0)
+        self.assertTrue(record["functions"])
+        self.assertTrue((self.root / f"{record['id']}.prof").exists())
+
+        page = self.client.get(reverse("accounts:request_profile", args=[record["id"]]))
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(self.client.get(reverse("accounts:request_profile", args=["not-an-id"])).status_code, 404)
+
+    def test_store_keeps_the_newest_profiles(self):
+        self.client.force_login(self.admin)
+        ids = [self.client.get(self.url, {"_profile": "1"})["X-Profile-Id"] for _ in range(3)]
+
+        self.assertEqual([record["id"] for record in recent_profiles()], ids[:0:-1])
+        self.assertIsNone(load_profile(ids[0]))
+        self.assertEqual(sorted(path.name for path in self.root.iterdir()), sorted(
+            f"{profile_id}.{suffix}" for profile_id in ids[1:] for suffix in ("json", "prof")
+        ))
+
+    def test_streaming_body_is_profiled_until_it_is_sent(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse("export_jobs"), {"_profile": "1"})
+        profile_id = response["X-Profile-Id"]
+        self.assertIsNone(load_profile(profile_id))
+
+        b"".join(response.streaming_content)
+        self.assertTrue(load_profile(profile_id)["body_profiled"])
+
+    async def test_async_requests(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(self.url, {"_profile": "1"})
+
+        record = await sync_to_async(load_profile)(response["X-Profile-Id"])
+        self.assertTrue(record["is_async"])
+        self.assertEqual(record["status"], 200)
+
+
+class VersioningTests(TestCase):
+    def test_bumps_in_a_transaction_are_written_once_on_commit(self):
+        before = versioning.versions(versioning.USERS, versioning.JOBS)
+        with self.captureOnCommitCallbacks(execute=True):
+            versioning.bump(versioning.USERS)
+            versioning.bump(versioning.USERS, versioning.JOBS)
+            self.assertEqual(versioning.versions(versioning.USERS, versioning.JOBS), before)
+
+        after = versioning.versions(versioning.USERS, versioning.JOBS)
+        self.assertEqual(after, {name: version + 1 for name, version in before.items()})
+
+    def test_bump_after_a_rolled_back_savepoint_is_written(self):
+        before = versioning.versions(versioning.JOBS)[versioning.JOBS]
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    versioning.bump(versioning.USERS)
+                    raise ValueError
+            except ValueError:
+                pass
+            versioning.bump(versioning.JOBS)
+
+        self.assertEqual(versioning.versions(versioning.JOBS)[versioning.JOBS], before + 1)
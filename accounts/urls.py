@@ -1,33 +1,47 @@
 # accounts/urls.py
 
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the exports, listing and JSON endpoints run as coroutines
+io_views = async_views if settings.ASYNC_VIEWS else views
 
 app_name = "accounts"
 
 urlpatterns = [
     path("dashboard/", views.dashboard_home, name="dashboard"),
     path("dashboard-home/", views.dashboard_home, name="dashboard_home"),
-    path("all-users/", views.all_users, name="all_users"),
+    path("all-users/", io_views.all_users, name="all_users"),
 
     # User management
     path("add-user/", views.add_user, name="add_user"),
+    path("api/users/", views.provision_users_api, name="provision_users_api"),
     path("edit/<int:user_id>/", views.edit_user, name="edit_user"),
     path("delete/<int:user_id>/", views.delete_user, name="delete_user"),
     path("restore/<int:deleted_id>/", views.restore_user, name="restore_user"),
+    path("delete/bulk/", views.bulk_delete_users, name="bulk_delete_users"),
+    path("restore/bulk/", views.bulk_restore_users, name="bulk_restore_users"),
 
     # Recycle bin
     path("recycle-bin/", views.recycle_bin, name="recycle_bin"),
+    path("recycle-bin/json/", io_views.recycle_bin_json, name="recycle_bin_json"),
     path('user/<int:deleted_user_id>/permanent-delete/', views.permanent_delete_user, name='permanent_delete_user'),
+    path('user/permanent-delete/bulk/', views.bulk_permanent_delete_users, name='bulk_permanent_delete_users'),
 
     # Import/export
     path("upload-users/", views.upload_users, name="upload_users"),
-    path("download-excel/", views.download_excel, name="download_excel"),
-    path("download-pdf/", views.download_pdf, name="download_pdf"),
+    path("download-excel/", io_views.download_excel, name="download_excel"),
+    path("download-pdf/", io_views.download_pdf, name="download_pdf"),
 
     # Authentication
     path("login/", views.custom_login, name="login"),
     path("logout/", views.custom_logout, name="custom_logout"),
 
     path('send-whatsapp/<int:user_id>/', views.send_whatsapp_welcome, name='send_whatsapp_welcome'),
+    path('send-whatsapp/bulk/', views.bulk_whatsapp_welcome, name='bulk_whatsapp_welcome'),
+
+    # Request profiles (admins, ?_profile=1 on any page)
+    path("profiles/", views.request_profiles, name="request_profiles"),
+    path("profiles/<str:profile_id>/", views.request_profile, name="request_profile"),
 ]
\ No newline at end of file
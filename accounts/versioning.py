@@ -0,0 +1,102 @@
+# accounts/versioning.py
+# Change counters per data set (users, profiles, jobs, ...). Signals bump them,
+# and readers compare counters instead of re-querying the data. Bumps made in
+# a transaction are written once, in a single UPDATE, when it commits.
+import hashlib
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataVersion
+
+USERS = "users"
+PROFILES = "profiles"
+CUSTOMER_PROFILES = "customer_profiles"
+GROUPS = "groups"
+DELETED_USERS = "deleted_users"
+JOBS = "jobs"
+
+CACHE_PREFIX = "data_version:"
+
+
+# Names bumped but not yet written, per database, for this thread (Django
+# connections are per thread too)
+_pending = threading.local()
+
+
+def _pending_names(using):
+    if not hasattr(_pending, "names"):
+        _pending.names = {}
+    return _pending.names.setdefault(using, set())
+
+
+def _write_pending(using):
+    """Write every name bumped on this database so far, then forget them"""
+    names = _pending_names(using)
+    if names:
+        _write(names, using)
+        names.clear()
+
+
+def _write(names, using):
+    names = set(names)
+    if not names:
+        return
+    versions = DataVersion.objects.using(using)
+    updated = versions.filter(name__in=names).update(version=F("version") + 1, updated_at=timezone.now())
+    if updated < len(names):
+        # First bump for a data set: create its row (existing rows are left alone)
+        versions.bulk_create([DataVersion(name=name, version=1) for name in names], ignore_conflicts=True)
+    cache.delete_many([CACHE_PREFIX + name for name in names])
+
+
+def bump(*names):
+    """Mark data sets as changed, once per transaction"""
+    using = router.db_for_write(DataVersion)
+    _pending_names(using).update(names)
+    if not connections[using].in_atomic_block:
+        _write_pending(using)
+        return
+
+    # Each bump registers its own callback, so one survives whichever
+    # savepoints roll back. The first to run after the commit writes all
+    # the names in one UPDATE; the others find nothing left to do. Names
+    # from a rolled-back transaction are written with the next bump: an
+    # extra version change, never a missed one.
+    transaction.on_commit(partial(_write_pending, using), using=using)
+
+
+def versions(*names, cached=False):
+    """
+    Current counter for each name (0 if never bumped). With cached=True the
+    values may come from the cache, for up to DATA_VERSION_CACHE_TIMEOUT
+    seconds; only use that where a briefly stale answer is acceptable.
+    """
+    result = {}
+    if cached:
+        hits = cache.get_many([CACHE_PREFIX + name for name in names])
+        result = {key[len(CACHE_PREFIX):]: value for key, value in hits.items()}
+
+    missing = [name for name in names if name not in result]
+    if missing:
+        found = dict(DataVersion.objects.filter(name__in=missing).values_list("name", "version"))
+        fetched = {name: found.get(name, 0) for name in missing}
+        result.update(fetched)
+        if cached:
+            cache.set_many(
+                {CACHE_PREFIX + name: value for name, value in fetched.items()},
+                settings.DATA_VERSION_CACHE_TIMEOUT,
+            )
+    return result
+
+
+def version_stamp(*names, cached=False):
+    """Short string that changes whenever any of the named data sets changes"""
+    current = versions(*names, cached=cached)
+    raw = ";".join(f"{name}={current[name]}" for name in sorted(names))
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
@@ -1,22 +1,38 @@
 # accounts/views.py
+import base64
+import binascii
+import csv
+import json
 import random
 import string
 import secrets
-import openpyxl
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import HttpResponse, JsonResponse
-from django.utils import timezone
-from django.contrib.sites.models import Site
-from urllib.parse import quote
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.core.paginator import Paginator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.db import IntegrityError
+from core.replica import use_replica
 from .forms import UserCreateForm, CustomUserCreationForm, UserEditForm
 from .models import User, DeletedUser, Profile, CustomerProfile
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
+from .exports import export_response
+from .imports import apply_updates, read_user_sheet, sheet_report, validate_user_sheet
+from .profiling import load_profile, profile_data_path, recent_profiles
+from .provisioning import provision_users, validate_specs
+from .conditional import (
+    all_users_etag, all_users_last_modified, conditional_page, export_etag,
+    recycle_bin_etag, recycle_bin_last_modified,
+)
+from .recycle_bin import (
+    RECYCLE_BIN_ROLES, entry_json, filter_recycle_bin, purge_deleted_users, recycle_bin_page, restore_users,
+    soft_delete_users,
+)
+from .whatsapp import (
+    WELCOME_CSV_HEADERS, login_link, welcome_csv_row, welcome_entry, welcome_links, welcome_queryset,
+)
 from django.contrib.auth import get_user_model
 from django.shortcuts import render
 from django.shortcuts import redirect
@@ -28,6 +44,22 @@ def is_admin(user):
     """Check if user is admin or superuser"""
     return user.is_superuser or user.groups.filter(name="Admin").exists()
 
+def basic_auth_user(request):
+    """User from an HTTP Basic Authorization header, or None"""
+    scheme, _, credentials = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+    if scheme.lower() != "basic":
+        return None
+    try:
+        username, _, password = base64.b64decode(credentials).decode().partition(":")
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    return authenticate(request, username=username, password=password)
+
+# Users per provision_users_api call. Every password is hashed at full
+# strength (about 0.35s of CPU each), so a batch must finish well inside
+# the worker timeout even on a single CPU.
+API_BATCH_LIMIT = 200
+
 # Authentication Views
 def custom_login(request):
     """Handle custom login with role-based authentication"""
@@ -86,10 +118,11 @@ def csrf_failure(request, reason=""):
 
 # User Management Views
 @login_required
+@conditional_page(all_users_etag, all_users_last_modified)
 def all_users(request):
     """Display list of all users"""
     # Use select_related to efficiently fetch related profiles
-    users = User.objects.filter(is_deleted=False).select_related('account_profile', 'customer_profile')
+    users = User.objects.live().select_related('account_profile', 'customer_profile')
     
     context = {
         "all_users": users,
@@ -139,39 +172,99 @@ def add_user(request):
 @user_passes_test(is_admin)
 def send_whatsapp_welcome(request, user_id):
     """Send welcome message via WhatsApp"""
-    user = get_object_or_404(User, id=user_id)
+    user = get_object_or_404(User.objects.select_related('account_profile', 'customer_profile'), id=user_id)
 
-    # Get user profile data using the same logic as the template filter
-    whatsapp_number = None
-    raw_password = None
-    if hasattr(user, 'account_profile') and user.account_profile:
-        whatsapp_number = user.account_profile.whatsapp_number
-        raw_password = user.account_profile.raw_password
-    elif hasattr(user, 'customer_profile') and user.customer_profile:
-        whatsapp_number = user.customer_profile.whatsapp_number
-        raw_password = user.customer_profile.raw_password
-
-    if not whatsapp_number:
+    entry = welcome_entry(user, login_link())
+    if not entry:
         messages.error(request, "User doesn't have a WhatsApp number")
         return redirect("accounts:all_users")
 
-    current_site = Site.objects.get_current()
-    login_link = f"http://{current_site.domain}/accounts/login/"
+    return redirect(entry["url"])
 
-    message = f"Hello {user.first_name or user.username}, Welcome to Akshardeep Offset Printers ERP\n\n"
-    message += f"Here is Your Login ID: {user.username}\n"
-    message += f"Password: {raw_password or 'Please contact admin for password'}\n"
-    message += f"Click on this link to Login: {login_link}"
-
-    whatsapp_number = str(whatsapp_number).strip()
-    whatsapp_number = ''.join(c for c in whatsapp_number if c.isdigit() or c == '+')
+@login_required
+@user_passes_test(is_admin)
+def bulk_whatsapp_welcome(request):
+    """
+    Welcome links, with passwords, as a paged list or CSV: for the selected
+    users, else for users who never logged in; every user needs scope=all
+    """
+    users = User.objects.live()
+    ids = [i for i in request.GET.getlist("ids") if i.isdigit()]
+    if ids:
+        users = users.filter(id__in=ids)
+    elif request.GET.get("scope") != "all":
+        users = users.filter(last_login__isnull=True)
+
+    if request.GET.get("format") == "csv":
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="whatsapp_welcome_links.csv"'
+        writer = csv.writer(response)
+        writer.writerow(WELCOME_CSV_HEADERS)
+        for entry in welcome_links(users):
+            writer.writerow(welcome_csv_row(entry))
+        return response
+
+    link = login_link()
+    page = Paginator(welcome_queryset(users), 50).get_page(request.GET.get("page"))
+    query = request.GET.copy()
+    query.pop("page", None)
 
-    if not whatsapp_number.startswith('+'):
-        whatsapp_number = '+91' + whatsapp_number
+    context = {
+        "page": page,
+        "entries": [entry for entry in (welcome_entry(u, link) for u in page.object_list) if entry],
+        "query": query.urlencode(),
+        "first_name": request.user.first_name,
+    }
+    return render(request, "accounts/whatsapp_links.html", context)
+
+@csrf_exempt
+@require_POST
+def provision_users_api(request):
+    """
+    Create a batch of users from JSON {"users": [{first_name, last_name, email,
+    whatsapp_number, press_name, role, customer_type, staff_type}, ...]}.
+    For integrations: authenticates an admin with HTTP Basic on every call
+    (no session, hence no CSRF). Nothing is created unless every record is valid.
+    """
+    api_user = basic_auth_user(request)
+    if api_user is None or not is_admin(api_user):
+        response = JsonResponse({"success": False, "message": "Admin credentials required"}, status=401)
+        response["WWW-Authenticate"] = 'Basic realm="provisioning"'
+        return response
 
-    whatsapp_url = f"https://wa.me/{whatsapp_number}?text={quote(message)}"
+    try:
+        records = json.loads(request.body)["users"]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"success": False, "message": 'Expected a JSON object with a "users" list'}, status=400)
+    if not isinstance(records, list) or not records:
+        return JsonResponse({"success": False, "message": '"users" must be a non-empty list'}, status=400)
+    if len(records) > API_BATCH_LIMIT:
+        return JsonResponse({"success": False, "message": f"At most {API_BATCH_LIMIT} users per call"}, status=400)
+
+    specs, errors = validate_specs(records)
+    if errors:
+        return JsonResponse({"success": False, "message": f"{len(errors)} errors, nothing created", "errors": errors}, status=400)
 
-    return redirect(whatsapp_url)
+    try:
+        created = provision_users(specs)
+    except IntegrityError:
+        # Another batch took the same usernames or customer ids first
+        return JsonResponse({"success": False, "message": "Conflicting concurrent batch, retry"}, status=409)
+
+    return JsonResponse({
+        "success": True,
+        "message": f"Created {len(created)} users",
+        "users": [
+            {
+                "username": user.username,
+                "email": user.email,
+                "role": spec["role"],
+                "customer_id": user.customer_profile.customer_id if spec["role"] == "Customer" else None,
+                "password": raw_password,
+            }
+            for spec, (user, raw_password) in zip(specs, created)
+        ],
+    }, status=201)
 
 @login_required
 @user_passes_test(is_admin)
@@ -204,29 +297,7 @@ def delete_user(request, user_id):
     user = get_object_or_404(User, id=user_id)
 
     if request.method == 'POST':
-        role = "Admin" if user.is_superuser else \
-            user.groups.first().name if user.groups.exists() else "Customer"
-
-        whatsapp_number = None
-        if hasattr(user, 'account_profile'):
-            whatsapp_number = user.account_profile.whatsapp_number
-        elif hasattr(user, 'customer_profile'):
-            whatsapp_number = user.customer_profile.whatsapp_number
-
-        DeletedUser.objects.create(
-            original_id=user.id, # Save the original ID for restoration
-            first_name=user.first_name,
-            last_name=user.last_name,
-            username=user.username,
-            email=user.email,
-            whatsapp_number=whatsapp_number,
-            role=role
-        )
-
-        user.is_deleted = True
-        user.deleted_at = timezone.now()
-        user.save()
-
+        soft_delete_users([user.id])
         messages.success(request, f"User {user.username} moved to recycle bin")
         return redirect('accounts:all_users')
 
@@ -269,183 +340,178 @@ def restore_user(request, deleted_id):
     deleted_user = get_object_or_404(DeletedUser, id=deleted_id)
 
     if request.method == 'POST':
-        # Find the original user record
-        try:
-            user = User.objects.get(id=deleted_user.original_id)
-            user.is_deleted = False
-            user.deleted_at = None
-            user.save()
-            messages.success(request, f"User {user.username} restored successfully")
-
-        except User.DoesNotExist:
+        restored, missing = restore_users([deleted_user.id])
+        if not missing:
+            messages.success(request, f"User {deleted_user.username} restored successfully")
+        else:
             messages.error(request, f"Original user record not found for {deleted_user.username}. Cannot restore.")
-
-        deleted_user.delete()
         return redirect('accounts:all_users')
 
     return render(request, "accounts/confirm_restore.html", {"user": deleted_user})
 
+def selected_ids(request):
+    """Integer ids ticked in a bulk action form"""
+    return [int(i) for i in request.POST.getlist("ids") if i.isdigit()]
+
 @login_required
+@user_passes_test(is_admin)
+@require_POST
+def bulk_delete_users(request):
+    """Soft delete many users in one transaction"""
+    # Never move the signed-in admin to the recycle bin with a "select all"
+    ids = [i for i in selected_ids(request) if i != request.user.id]
+    moved = soft_delete_users(ids)
+    messages.success(request, f"{moved} users moved to recycle bin")
+    return redirect('accounts:all_users')
+
+@login_required
+@user_passes_test(is_admin)
+@require_POST
+def bulk_restore_users(request):
+    """Restore many recycle bin entries in one transaction"""
+    restored, missing = restore_users(selected_ids(request))
+    messages.success(request, f"{restored} users restored successfully")
+    if missing:
+        messages.error(request, f"Original user record not found for {', '.join(missing)}. Cannot restore.")
+    return redirect('accounts:recycle_bin')
+
+@login_required
+@user_passes_test(is_admin)
+@require_POST
+def bulk_permanent_delete_users(request):
+    """Permanently delete many recycle bin entries and their users"""
+    purged = purge_deleted_users(selected_ids(request))
+    messages.success(request, f"{purged} users permanently deleted.")
+    return redirect('accounts:recycle_bin')
+
+@login_required
+@user_passes_test(is_admin)
+@conditional_page(recycle_bin_etag, recycle_bin_last_modified)
 def recycle_bin(request):
-    """Show deleted users"""
-    deleted_users = DeletedUser.objects.all().order_by('-deleted_at')
-    return render(request, "accounts/recycle_bin.html", {"deleted_users": deleted_users})
+    """Show deleted users, newest first, one keyset page at a time"""
+    try:
+        entries = filter_recycle_bin(request.GET)
+    except ValueError as e:
+        messages.error(request, str(e))
+        entries = filter_recycle_bin({})
+
+    try:
+        deleted_users, next_cursor = recycle_bin_page(entries, request.GET.get("after"))
+    except ValueError:
+        deleted_users, next_cursor = recycle_bin_page(entries)
+
+    query = request.GET.copy()
+    query.pop("after", None)
+
+    context = {
+        "deleted_users": deleted_users,
+        "next_cursor": next_cursor,
+        "is_first_page": not request.GET.get("after"),
+        "query": query.urlencode(),
+        "filters": request.GET,
+        "roles": RECYCLE_BIN_ROLES,
+        "first_name": request.user.first_name,
+    }
+    return render(request, "accounts/recycle_bin.html", context)
+
+@login_required
+@user_passes_test(is_admin)
+def recycle_bin_json(request):
+    """JSON listing of the recycle bin with the same filters and cursor as the page"""
+    try:
+        entries = filter_recycle_bin(request.GET)
+        deleted_users, next_cursor = recycle_bin_page(entries, request.GET.get("after"))
+    except ValueError as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    return JsonResponse({
+        "success": True,
+        "results": [entry_json(entry) for entry in deleted_users],
+        "next": next_cursor,
+    })
 
 # Import/Export Views
 @login_required
 @user_passes_test(is_admin)
+@use_replica
+@conditional_page(export_etag, all_users_last_modified)
 def download_excel(request):
     """Export users to Excel"""
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Users"
-
-    headers = ["First Name", "Last Name", "Username", "Email", "Password", "Role", "WhatsApp", "Press Name", "Status"]
-    ws.append(headers)
-
-    users = User.objects.all().select_related('account_profile', 'customer_profile')
-    for user in users:
-        role = "Admin" if user.is_superuser else \
-            user.groups.first().name if user.groups.exists() else "User"
-
-        whatsapp = None
-        password = None
-        press_name = None
-
-        if hasattr(user, 'account_profile'):
-            whatsapp = user.account_profile.whatsapp_number
-            password = user.account_profile.raw_password
-            press_name = user.account_profile.press_name
-        elif hasattr(user, 'customer_profile'):
-            whatsapp = user.customer_profile.whatsapp_number
-            password = user.customer_profile.raw_password
-            press_name = user.customer_profile.press_name
-
-
-        whatsapp = whatsapp or "-"
-        password = password or "-"
-        press_name = press_name or "-"
-
-        status = "Active" if not user.is_deleted else "Deleted"
-
-        ws.append([
-            user.first_name,
-            user.last_name,
-            user.username,
-            user.email,
-            password,
-            role,
-            whatsapp,
-            press_name,
-            status
-        ])
-
-    response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    response["Content-Disposition"] = 'attachment; filename="users.xlsx"'
-    wb.save(response)
-    return response
+    return export_response(request, "users_excel")
 
 @login_required
 @user_passes_test(is_admin)
+@use_replica
+@conditional_page(export_etag, all_users_last_modified)
 def download_pdf(request):
     """Export users to PDF"""
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="users.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    elements.append(Paragraph("User List", styles["Title"]))
-
-    data = [["First Name", "Last Name", "Username", "Email", "Password", "Role", "Status"]]
-
-    users = User.objects.all().select_related('account_profile', 'customer_profile')
-    for user in users:
-        role = "Admin" if user.is_superuser else \
-            user.groups.first().name if user.groups.exists() else "User"
-
-        password = None
-        if hasattr(user, 'account_profile'):
-            password = user.account_profile.raw_password
-        elif hasattr(user, 'customer_profile'):
-            password = user.customer_profile.raw_password
-
-        password = password or "-"
-
-        status = "Active" if not user.is_deleted else "Deleted"
-
-        data.append([
-            user.first_name,
-            user.last_name,
-            user.username,
-            user.email,
-            password,
-            role,
-            status
-        ])
-
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.grey),
-        ("TEXTCOLOR", (0,0), (-1,0), colors.whitesmoke),
-        ("ALIGN", (0,0), (-1,-1), "CENTER"),
-        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-        ("BOTTOMPADDING", (0,0), (-1,-0), 12),
-        ("BACKGROUND", (0,1), (-1,-1), colors.beige),
-        ("GRID", (0,0), (-1,-1), 1, colors.black),
-    ]))
-
-    elements.append(table)
-    doc.build(elements)
-    return response
+    return export_response(request, "users_pdf")
 
 @login_required
 @user_passes_test(is_admin)
 def upload_users(request):
-    """Handle user uploads via Excel file"""
+    """
+    Handle user uploads via Excel file. Every row is validated first; with
+    dry_run set nothing is written and the row-level report is returned,
+    otherwise the valid rows are written and the rest reported. With
+    mode=upsert, rows matching an existing user update it instead.
+    """
     if request.method == 'POST' and request.FILES.get('excel_file'):
         try:
-            excel_file = request.FILES['excel_file']
-            wb = openpyxl.load_workbook(excel_file)
-            sheet = wb.active
-            created_users = 0
-
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                if len(row) >= 4:
-                    first_name, last_name, email, whatsapp = row[:4]
-                    if not email:
-                        continue
-
-                    username = email.split("@")[0]
-                    password = generate_password()
-
-                    if not User.objects.filter(username=username).exists():
-                        user = User.objects.create_user(
-                            username=username,
-                            email=email,
-                            first_name=first_name,
-                            last_name=last_name,
-                            password=password
-                        )
-
-                        # Check for and update the correct profile type based on the
-                        # signal logic. Since the signal creates the profile,
-                        # we just need to update it.
-                        if hasattr(user, 'account_profile'):
-                            user.account_profile.raw_password = password
-                            user.account_profile.whatsapp_number = whatsapp
-                            user.account_profile.save()
-                        elif hasattr(user, 'customer_profile'):
-                            user.customer_profile.raw_password = password
-                            user.customer_profile.whatsapp_number = whatsapp
-                            user.customer_profile.save()
-
-                        created_users += 1
-
-            return JsonResponse({"success": True, "message": f"Successfully created {created_users} users"})
+            upsert = request.POST.get("mode") == "upsert"
+            frame = validate_user_sheet(read_user_sheet(request.FILES['excel_file']), upsert=upsert)
+            report = sheet_report(frame)
+            summary = report["summary"]
+            if request.POST.get("dry_run"):
+                return JsonResponse({
+                    "success": True,
+                    "dry_run": True,
+                    "message": f"{summary['valid']} users can be created, {summary['updates']} updated, "
+                               f"{summary['errors']} rows have errors, {summary['skipped']} rows have no email",
+                    **report,
+                })
+
+            valid = frame[frame["status"] == "ok"]
+            created_users = len(provision_users(
+                {"role": "Customer", **record}
+                for record in valid[["username", "email", "first_name", "last_name", "whatsapp_number", "press_name"]]
+                .to_dict("records")
+            ))
+            updated_users = apply_updates(frame) if upsert else 0
+
+            message = f"Successfully created {created_users} users"
+            if upsert:
+                message += f" and updated {updated_users}"
+            return JsonResponse({"success": True, "message": message, **report})
 
         except Exception as e:
             return JsonResponse({"success": False, "message": f"Error processing file: {str(e)}"})
 
-    return JsonResponse({"success": False, "message": "No file provided"})
\ No newline at end of file
+    return JsonResponse({"success": False, "message": "No file provided"})
+
+
+@login_required
+@user_passes_test(is_admin)
+def request_profiles(request):
+    """Recent profiled requests (?_profile=1), newest first"""
+    context = {
+        "profiles": recent_profiles(),
+        "first_name": request.user.first_name,
+    }
+    return render(request, "accounts/request_profiles.html", context)
+
+
+@login_required
+@user_passes_test(is_admin)
+def request_profile(request, profile_id):
+    """One profiled request: top functions and SQL log, or ?download=1 for the raw cProfile data"""
+    if request.GET.get("download"):
+        path = profile_data_path(profile_id)
+        if path is None:
+            raise Http404("Profile not found")
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=path.name)
+
+    record = load_profile(profile_id)
+    if record is None:
+        raise Http404("Profile not found")
+    return render(request, "accounts/request_profile.html", {"profile": record, "first_name": request.user.first_name})
@@ -0,0 +1,84 @@
+# accounts/whatsapp.py
+from urllib.parse import quote
+
+from django.contrib.sites.models import Site
+from django.db.models import Q
+
+WELCOME_CSV_HEADERS = ["Username", "Name", "WhatsApp", "Message", "WhatsApp Link"]
+
+
+def login_link():
+    """Login URL shared in welcome messages"""
+    current_site = Site.objects.get_current()
+    return f"http://{current_site.domain}/accounts/login/"
+
+
+def normalize_whatsapp_number(number):
+    """Keep digits and '+', defaulting to the Indian country code"""
+    number = str(number).strip()
+    number = ''.join(c for c in number if c.isdigit() or c == '+')
+    if not number.startswith('+'):
+        number = '+91' + number
+    return number
+
+
+def profile_contact(user):
+    """Return (whatsapp_number, raw_password) from whichever profile the user has"""
+    if hasattr(user, 'account_profile') and user.account_profile:
+        return user.account_profile.whatsapp_number, user.account_profile.raw_password
+    elif hasattr(user, 'customer_profile') and user.customer_profile:
+        return user.customer_profile.whatsapp_number, user.customer_profile.raw_password
+    return None, None
+
+
+def welcome_message(user, raw_password, link):
+    message = f"Hello {user.first_name or user.username}, Welcome to Akshardeep Offset Printers ERP\n\n"
+    message += f"Here is Your Login ID: {user.username}\n"
+    message += f"Password: {raw_password or 'Please contact admin for password'}\n"
+    message += f"Click on this link to Login: {link}"
+    return message
+
+
+def welcome_url(whatsapp_number, message):
+    return f"https://wa.me/{normalize_whatsapp_number(whatsapp_number)}?text={quote(message)}"
+
+
+def welcome_queryset(users):
+    """Users that have a WhatsApp number on either profile, with both profiles joined in"""
+    return (
+        users.filter(Q(account_profile__whatsapp_number__gt='') | Q(customer_profile__whatsapp_number__gt=''))
+        .select_related('account_profile', 'customer_profile')
+        .order_by('id')
+    )
+
+
+def welcome_entry(user, link):
+    """Welcome message and wa.me link for one user, or None without a WhatsApp number"""
+    whatsapp_number, raw_password = profile_contact(user)
+    if not whatsapp_number:
+        return None
+    message = welcome_message(user, raw_password, link)
+    return {
+        "user": user,
+        "name": user.get_full_name() or user.username,
+        "whatsapp_number": normalize_whatsapp_number(whatsapp_number),
+        "message": message,
+        "url": welcome_url(whatsapp_number, message),
+    }
+
+
+def welcome_links(users, link=None):
+    """
+    Yield welcome entries for every user in the queryset that has a WhatsApp
+    number. Profiles come from one joined query and the site is looked up
+    once for the whole batch.
+    """
+    link = link or login_link()
+    for user in welcome_queryset(users).iterator(chunk_size=500):
+        entry = welcome_entry(user, link)
+        if entry:
+            yield entry
+
+
+def welcome_csv_row(entry):
+    return [entry["user"].username, entry["name"], entry["whatsapp_number"], entry["message"], entry["url"]]
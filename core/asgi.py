@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Async views stream without holding a thread under ASGI (see settings.ASYNC_VIEWS)
+os.environ.setdefault('ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
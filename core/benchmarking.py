@@ -0,0 +1,131 @@
+# core/benchmarking.py
+# Helpers shared by the benchmark and load-test management commands: a
+# gunicorn server started for the run, a keep-alive HTTP client with its
+# own cookies, latency bookkeeping and the process's memory use.
+import http.client
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux), falling back to peak RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def start_server(kind, url, workers, timeout, stdout, extra_args=(), env=None):
+    """Start gunicorn serving core.wsgi ("wsgi") or core.asgi ("asgi", needs uvicorn) on url"""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    command = [
+        sys.executable, "-m", "gunicorn",
+        "core.asgi:application" if kind == 'asgi' else "core.wsgi:application",
+        "--bind", f"{host}:{port}", "--workers", str(workers),
+        "--timeout", str(int(timeout)), *extra_args,
+    ]
+    if kind == 'asgi':
+        command += ["--worker-class", "uvicorn.workers.UvicornWorker"]
+
+    stdout.write(f"Starting {' '.join(command[2:])}")
+    server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env or os.environ.copy())
+    for _ in range(300):
+        if server.poll() is not None:
+            raise CommandError(f"Server exited with status {server.returncode}")
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise CommandError(f"Server did not start listening on {host}:{port}")
+
+
+class Recorder:
+    """Latencies and errors per endpoint for one virtual user (merged at the end)"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def merge(self, other):
+        for name, values in other.latencies.items():
+            self.latencies[name].extend(values)
+        for name, count in other.errors.items():
+            self.errors[name] += count
+
+
+class Browser:
+    """One keep-alive connection with its own cookie jar, like a single admin's browser"""
+
+    def __init__(self, base_url, recorder, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.recorder = recorder
+        self.timeout = timeout
+        self.cookies = {}
+        self.conn = None
+
+    def request(self, name, method, path, form=None, expect=(200,)):
+        headers = {"Host": f"{self.host}:{self.port}", "Referer": self.origin + path}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{key}={value}" for key, value in self.cookies.items())
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        start = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            self.recorder.errors[name] += 1
+            return None
+        self.recorder.latencies[name].append((time.perf_counter() - start) * 1000)
+
+        for header in response.headers.get_all("Set-Cookie") or []:
+            for key, morsel in SimpleCookie(header).items():
+                if morsel["max-age"] == "0" or not morsel.value:
+                    self.cookies.pop(key, None)
+                else:
+                    self.cookies[key] = morsel.value
+
+        if response.status not in expect:
+            self.recorder.errors[name] += 1
+            return None
+        return content
+
+    def csrf_form(self, **fields):
+        return {"csrfmiddlewaretoken": self.cookies.get("csrftoken", ""), **fields}
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
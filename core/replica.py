@@ -0,0 +1,138 @@
+# core/replica.py
+# Optional read replica for heavy reads (exports, reports, aggregates).
+# Reads only go to the replica inside replica_reads() / @use_replica; all
+# writes and every other read stay on the primary. After a POST a session
+# is pinned to the primary for REPLICA_PIN_SECONDS so users see their own
+# changes even if the replica lags.
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import FileResponse
+
+REPLICA = "replica"
+PIN_SESSION_KEY = "_db_pinned_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def replica_reads():
+    """Send ORM reads made inside the block to the replica, if one is configured"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _stream_from_replica(content):
+    # Streaming bodies are produced after the view returns
+    with replica_reads():
+        yield from content
+
+
+async def _astream_from_replica(content):
+    with replica_reads():
+        async for part in content:
+            yield part
+
+
+def is_pinned(request):
+    """True while the session's own recent writes may not be on the replica yet"""
+    session = getattr(request, "session", None)
+    return bool(session) and session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+async def ais_pinned(request):
+    session = getattr(request, "session", None)
+    return session is not None and await session.aget(PIN_SESSION_KEY, 0) > time.time()
+
+
+def use_replica(view):
+    """
+    Run a read-only view against the replica. Put it below the auth
+    decorators (the session and user are then loaded from the primary)
+    and above conditional_page, so ETags match the data served.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not replica_configured() or await ais_pinned(request):
+                return await view(request, *args, **kwargs)
+            with replica_reads():
+                response = await view(request, *args, **kwargs)
+            if response.streaming and response.is_async:
+                response.streaming_content = _astream_from_replica(response.streaming_content)
+            elif response.streaming and not isinstance(response, FileResponse):
+                response.streaming_content = _stream_from_replica(response.streaming_content)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not replica_configured() or is_pinned(request):
+            return view(request, *args, **kwargs)
+        with replica_reads():
+            response = view(request, *args, **kwargs)
+        if response.streaming and not isinstance(response, FileResponse):
+            response.streaming_content = _stream_from_replica(response.streaming_content)
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    """Routes reads inside replica_reads() to the replica and every write to default"""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_configured():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so saving an object read from the replica still goes to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReplicaPinMiddleware:
+    """Pin the session to the primary for a few seconds after a write request"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.should_pin(request) and request.user.is_authenticated:
+            request.session[PIN_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.should_pin(request) and (await request.auser()).is_authenticated:
+            await request.session.aset(PIN_SESSION_KEY, time.time() + settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def should_pin(self, request):
+        return request.method not in SAFE_METHODS and replica_configured() and hasattr(request, "session")
@@ -57,6 +57,8 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "accounts.profiling.ProfilerMiddleware",
+    "core.replica.ReplicaPinMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -71,6 +73,21 @@ DATABASES = {
     'default': env.db(),
 }
 
+# Optional read replica for exports and reports (see core/replica.py).
+# Locally this can be a copy of the SQLite file or a second Postgres database.
+if env("REPLICA_DATABASE_URL", default=""):
+    DATABASES['replica'] = env.db("REPLICA_DATABASE_URL")
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ["core.replica.ReplicaRouter"]
+
+# Seconds a session keeps reading from the primary after it POSTs
+REPLICA_PIN_SECONDS = env.int("REPLICA_PIN_SECONDS", default=5)
+
+# Route exports, listings and JSON endpoints to their async variants
+# (accounts/async_views.py, jobs/async_views.py); core/asgi.py turns this on
+ASYNC_VIEWS = env.bool("ASYNC_VIEWS", default=False)
+
 
 # --- PASSWORDS ---
 AUTH_PASSWORD_VALIDATORS = [
@@ -104,6 +121,22 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Offline analysis snapshots written by `manage.py snapshot_jobs`
+SNAPSHOT_ROOT = Path(env("SNAPSHOT_ROOT", default=str(BASE_DIR / "snapshots")))
+
+# Cached per-party PDF statements (kept out of MEDIA_ROOT, they are not public)
+STATEMENT_ROOT = Path(env("STATEMENT_ROOT", default=str(BASE_DIR / "statements")))
+
+# Built user exports, reused until users, profiles or groups change
+EXPORT_CACHE_ROOT = Path(env("EXPORT_CACHE_ROOT", default=str(BASE_DIR / "export_cache")))
+
+# Request profiles taken by admins with ?_profile=1 (newest PROFILE_KEEP are kept)
+PROFILE_ROOT = Path(env("PROFILE_ROOT", default=str(BASE_DIR / "profiles")))
+PROFILE_KEEP = env.int("PROFILE_KEEP", default=50)
+
+# Seconds a data-version counter may be served from the cache by versions(cached=True)
+DATA_VERSION_CACHE_TIMEOUT = env.int("DATA_VERSION_CACHE_TIMEOUT", default=5)
+
 # --- TEMPLATES ---
 TEMPLATES = [
     {
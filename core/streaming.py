@@ -0,0 +1,73 @@
+# core/streaming.py
+import asyncio
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db import connections, transaction
+from django.http import FileResponse
+
+DEFAULT_CHUNK_SIZE = 2000
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def stream_queryset(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Iterate a queryset without holding the whole result in worker memory.
+
+    On PostgreSQL rows come from a named server-side cursor, fetched
+    chunk_size at a time. Outside a transaction Django declares that cursor
+    WITH HOLD, which makes PostgreSQL materialize the entire result before
+    the first row arrives, so the iteration is wrapped in one here. Other
+    backends (SQLite) use chunked fetchmany() on a regular cursor.
+
+    prefetch_related() still works: it runs once per chunk.
+    """
+    connection = connections[queryset.db]
+    server_side = (
+        connection.vendor == "postgresql"
+        and not connection.settings_dict.get("DISABLE_SERVER_SIDE_CURSORS")
+    )
+    if server_side and not connection.in_atomic_block:
+        with transaction.atomic(using=queryset.db):
+            yield from queryset.iterator(chunk_size=chunk_size)
+    else:
+        yield from queryset.iterator(chunk_size=chunk_size)
+
+
+async def astream_queryset(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Async counterpart of stream_queryset for async views: rows are fetched
+    chunk_size at a time in the sync thread and no thread is held between
+    chunks. (QuerySet.aiterator() means to do the same, but it starts
+    values_list() queries on the event loop, where they fail.)
+
+    Other requests share the sync thread, so no transaction can stay open
+    across the awaits; on PostgreSQL the server-side cursor is then declared
+    WITH HOLD and the result is materialized by the database server up front.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+    fetch = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    try:
+        while chunk := await fetch():
+            for row in chunk:
+                yield row
+    finally:
+        # Closes the cursor in the thread that opened it
+        await sync_to_async(rows.close)()
+
+
+async def aiter_file(file, chunk_size=FILE_CHUNK_SIZE):
+    """Yield a binary file in chunks, reading each one in a worker thread"""
+    while chunk := await asyncio.to_thread(file.read, chunk_size):
+        yield chunk
+
+
+def stream_file_async(response):
+    """
+    Make a FileResponse read its file asynchronously. Served under ASGI
+    with its usual synchronous iterator, Django reads the whole file into
+    memory before sending the first byte. Other responses pass through.
+    """
+    if isinstance(response, FileResponse) and response.file_to_stream is not None:
+        response.streaming_content = aiter_file(response.file_to_stream, response.block_size)
+    return response
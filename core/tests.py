@@ -0,0 +1,84 @@
+import time
+from unittest import mock
+
+from django.contrib.sessions.backends.db import SessionStore
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+
+from accounts.provisioning import provision_user
+
+from .replica import PIN_SESSION_KEY, _replica_reads, use_replica
+
+
+def replica(configured=True):
+    # Tests run against one database; pretend a replica alias exists
+    return mock.patch("core.replica.replica_configured", return_value=configured)
+
+
+class AsyncReplicaTests(TestCase):
+    def request(self, pinned=False):
+        request = AsyncRequestFactory().get("/")
+        request.session = SessionStore()
+        if pinned:
+            request.session[PIN_SESSION_KEY] = time.time() + 60
+        return request
+
+    async def call(self, request):
+        seen = {}
+
+        async def body():
+            seen["body"] = _replica_reads.get()
+            yield b"rows"
+
+        @use_replica
+        async def view(request):
+            seen["view"] = _replica_reads.get()
+            return StreamingHttpResponse(body())
+
+        response = await view(request)
+        self.assertEqual([part async for part in response.streaming_content], [b"rows"])
+        self.assertFalse(_replica_reads.get())
+        return seen
+
+    async def test_view_and_async_body_read_from_the_replica(self):
+        with replica():
+            self.assertEqual(await self.call(self.request()), {"view": True, "body": True})
+
+    async def test_pinned_session_or_no_replica_reads_from_the_primary(self):
+        with replica():
+            self.assertEqual(await self.call(self.request(pinned=True)), {"view": False, "body": False})
+        self.assertEqual(await self.call(self.request()), {"view": False, "body": False})
+
+    async def test_plain_response_passes_through(self):
+        @use_replica
+        async def view(request):
+            return HttpResponse(str(_replica_reads.get()))
+
+        with replica():
+            response = await view(self.request())
+        self.assertEqual(response.content, b"True")
+
+
+class ReplicaPinMiddlewareTests(TestCase):
+    def setUp(self):
+        self.admin, _ = provision_user("Admin", email="admin@example.com", password_hash="!")
+
+    async def pinned_until(self):
+        return await (await self.async_client.asession()).aget(PIN_SESSION_KEY)
+
+    async def test_write_requests_pin_the_session(self):
+        await self.async_client.aforce_login(self.admin)
+        url = reverse("accounts:bulk_delete_users")
+
+        with replica():
+            await self.async_client.get(reverse("accounts:all_users"))
+            self.assertIsNone(await self.pinned_until())
+
+            await self.async_client.post(url)
+            self.assertGreater(await self.pinned_until(), time.time())
+
+    async def test_no_pin_without_a_replica(self):
+        await self.async_client.aforce_login(self.admin)
+        await self.async_client.post(reverse("accounts:bulk_delete_users"))
+        self.assertIsNone(await self.pinned_until())
@@ -0,0 +1,60 @@
+# core/uploads.py
+# Reading uploaded spreadsheets. CSV (optionally gzip-compressed) is
+# decoded incrementally straight from the upload, so memory does not grow
+# with the file; XLSX goes through openpyxl's read-only mode.
+import csv
+import gzip
+import io
+
+import openpyxl
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZIP_MAGIC = b"PK"
+
+
+def upload_format(upload):
+    """ "csv" or "xlsx", from the file name or, failing that, its first bytes"""
+    name = (getattr(upload, "name", "") or "").lower()
+    if name.endswith((".csv", ".csv.gz", ".gz")):
+        return "csv"
+    if name.endswith((".xlsx", ".xlsm")):
+        return "xlsx"
+    upload.seek(0)
+    head = upload.read(2)
+    upload.seek(0)
+    return "xlsx" if head == ZIP_MAGIC else "csv"
+
+
+def open_csv_bytes(upload):
+    """Binary stream of the CSV in an upload, decompressed on the fly if it is gzipped"""
+    upload.seek(0)
+    head = upload.read(2)
+    upload.seek(0)
+    return gzip.GzipFile(fileobj=upload, mode="rb") if head == GZIP_MAGIC else upload
+
+
+def csv_rows(upload, encoding="utf-8-sig"):
+    """Yield the rows of a CSV or gzip-CSV upload as lists of strings"""
+    text = io.TextIOWrapper(open_csv_bytes(upload), encoding=encoding, newline="")
+    try:
+        yield from csv.reader(text)
+    finally:
+        # Leave the upload itself open for the caller
+        text.detach()
+
+
+def xlsx_rows(upload):
+    """Yield the rows of the first sheet of an XLSX upload as tuples of cell values"""
+    upload.seek(0)
+    wb = openpyxl.load_workbook(upload, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def upload_rows(upload):
+    """Yield the rows of a CSV, gzip-CSV or XLSX upload, header first"""
+    if upload_format(upload) == "xlsx":
+        return xlsx_rows(upload)
+    return csv_rows(upload)
@@ -0,0 +1,69 @@
+# gunicorn.conf.py
+# Read by gunicorn from the working directory, so `gunicorn core.wsgi` picks
+# it up without extra flags; command-line options still take precedence.
+#
+# With preload_app the master imports Django and every view module (and with
+# them pandas, openpyxl and reportlab) once, then forks the workers, which
+# share those pages copy-on-write instead of each importing its own copy.
+# gc.freeze() before each fork moves the imported objects out of the
+# collector's reach, so garbage collection in the workers does not write to
+# (and so un-share) them.
+#
+# Every setting can be changed from the environment:
+#   WEB_CONCURRENCY          workers (default 2; size it to the instance's memory,
+#                            see manage.py measure_worker_memory)
+#   GUNICORN_THREADS         threads per worker; above 1 the gthread worker is used
+#   GUNICORN_WORKER_CLASS    e.g. uvicorn.workers.UvicornWorker with core.asgi
+#   GUNICORN_PRELOAD         load the app in the master before forking (default on)
+#   GUNICORN_MAX_REQUESTS    recycle a worker after this many requests (0 = never)
+#   GUNICORN_MAX_REQUESTS_JITTER  random extra requests, so workers do not all restart at once
+#   GUNICORN_TIMEOUT         seconds a worker may stay silent before it is restarted
+import gc
+import os
+
+
+def env_int(name, default):
+    value = os.environ.get(name, "")
+    return int(value) if value.strip() else default
+
+
+def env_bool(name, default):
+    value = os.environ.get(name, "").strip().lower()
+    return value in ("1", "true", "yes", "on") if value else default
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+# cpu_count() sees the host's CPUs, not the container's share, and every
+# worker holds pandas, openpyxl and reportlab, so scaling up is left to the env
+workers = env_int("WEB_CONCURRENCY", 2)
+threads = env_int("GUNICORN_THREADS", 1)
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread" if threads > 1 else "sync")
+preload_app = env_bool("GUNICORN_PRELOAD", True)
+max_requests = env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = env_int("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10)
+# Exports stream for a while on the sync worker, which cannot heartbeat mid-response
+timeout = env_int("GUNICORN_TIMEOUT", 120)
+graceful_timeout = env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+
+
+def when_ready(server):
+    """Runs in the master once the app is loaded, before the first fork"""
+    if not server.cfg.preload_app:
+        return
+    # get_wsgi_application() leaves the URLconf (and so every view module
+    # and its imports) to the first request; resolve it here instead
+    from django.db import connections
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    # Forked workers must not share a database socket
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+
+
+def pre_fork(server, worker):
+    # Also covers workers started later to replace recycled ones
+    if server.cfg.preload_app:
+        gc.freeze()
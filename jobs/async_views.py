@@ -0,0 +1,42 @@
+# jobs/async_views.py
+# Async variant of the job export, routed instead of views.export_jobs when
+# settings.ASYNC_VIEWS is on (see accounts/async_views.py).
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from accounts.views import is_admin
+from core.replica import use_replica
+from core.streaming import stream_file_async
+from .exports import aiter_jobs_csv, filter_jobs, write_jobs_xlsx
+
+
+@login_required
+@user_passes_test(is_admin)
+@use_replica
+async def export_jobs(request):
+    """Stream jobs as CSV or XLSX, filtered by date range, party and payment type"""
+    export_format = request.GET.get("format", "csv").lower()
+    if export_format not in ("csv", "xlsx"):
+        return JsonResponse({"success": False, "message": f"Unsupported format: {export_format}"}, status=400)
+
+    try:
+        jobs = filter_jobs(request.GET)
+    except ValueError as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    filename = f"jobs_{timezone.localdate():%Y%m%d}.{export_format}"
+
+    if export_format == "xlsx":
+        # openpyxl is synchronous; the finished temporary file is then streamed asynchronously
+        output = await sync_to_async(write_jobs_xlsx)(jobs)
+        return stream_file_async(FileResponse(
+            output,
+            as_attachment=True,
+            filename=filename,
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        ))
+
+    response = StreamingHttpResponse(aiter_jobs_csv(jobs), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,103 @@
+# jobs/exports.py
+import csv
+import tempfile
+
+import openpyxl
+from django.utils.dateparse import parse_date
+
+from core.streaming import astream_queryset, stream_queryset
+
+from .models import Job
+
+# Columns written to every job export, in order
+EXPORT_FIELDS = [
+    "date", "party_name", "job_size", "paper", "quantity", "total",
+    "payment_type", "job_details", "ctp", "paper_by", "narration",
+    "lami_size", "enve_size", "ctp_no", "cost", "paper_cost",
+    "lami_cost", "enve_cost", "recieved", "bal_amt",
+]
+
+EXPORT_HEADERS = [
+    "Date", "Party Name", "Job Size", "Paper", "Quantity", "Total",
+    "Payment Type", "Job Details", "CTP", "Paper By", "Narration",
+    "Lami Size", "Enve Size", "CTP No", "Cost", "Paper Cost",
+    "Lami Cost", "Enve Cost", "Received", "Balance",
+]
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object that hands back whatever csv.writer writes to it"""
+    def write(self, value):
+        return value
+
+
+def filter_jobs(params):
+    """
+    Build the Job queryset for an export from request parameters.
+    Supports date_from, date_to, party and payment_type.
+    Raises ValueError when a date can't be parsed.
+    """
+    jobs = Job.objects.all()
+
+    for param, lookup in (("date_from", "date__gte"), ("date_to", "date__lte")):
+        value = params.get(param)
+        if value:
+            try:
+                # None when malformed, ValueError for impossible dates like 2024-02-30
+                parsed = parse_date(value)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise ValueError(f"Invalid {param}: {value}")
+            jobs = jobs.filter(**{lookup: parsed})
+
+    party = params.get("party")
+    if party:
+        jobs = jobs.filter(party_name__iexact=party.strip())
+
+    payment_type = params.get("payment_type")
+    if payment_type:
+        jobs = jobs.filter(payment_type=payment_type)
+
+    return jobs.order_by("date", "id")
+
+
+def iter_job_rows(jobs, chunk_size=CHUNK_SIZE):
+    """Yield one tuple per job without loading the whole queryset"""
+    return stream_queryset(jobs.values_list(*EXPORT_FIELDS), chunk_size)
+
+
+def iter_jobs_csv(jobs, chunk_size=CHUNK_SIZE):
+    """Yield the export as CSV text, one line at a time"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_HEADERS)
+    for row in iter_job_rows(jobs, chunk_size):
+        yield writer.writerow(row)
+
+
+async def aiter_jobs_csv(jobs, chunk_size=CHUNK_SIZE):
+    """iter_jobs_csv for async views"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_HEADERS)
+    async for row in astream_queryset(jobs.values_list(*EXPORT_FIELDS), chunk_size):
+        yield writer.writerow(row)
+
+
+def write_jobs_xlsx(jobs, chunk_size=CHUNK_SIZE):
+    """
+    Write the export to a temporary XLSX file and return it rewound.
+    openpyxl's write-only mode flushes each row to disk, so memory stays
+    flat no matter how many jobs are exported.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title="Jobs")
+    ws.append(EXPORT_HEADERS)
+    for row in iter_job_rows(jobs, chunk_size):
+        ws.append(row)
+
+    output = tempfile.TemporaryFile(suffix=".xlsx")
+    wb.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,145 @@
+# jobs/imports.py
+# Bulk job ingestion from CSV, gzip-CSV or XLSX uploads. Rows are parsed
+# one at a time from the upload and inserted in batches, so memory stays
+# flat however long the file is. The column layout is the one the job
+# export writes, so an export can be loaded back as is.
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from accounts import versioning
+from core.uploads import upload_rows
+
+from .exports import CHUNK_SIZE, EXPORT_FIELDS, EXPORT_HEADERS
+from .models import Job
+
+# Header (export label or field name, any case) -> Job field
+IMPORT_COLUMNS = {
+    **{field: field for field in EXPORT_FIELDS},
+    **{header.lower().replace(" ", "_"): field for header, field in zip(EXPORT_HEADERS, EXPORT_FIELDS)},
+}
+REQUIRED_FIELDS = ["date", "party_name", "job_size", "paper", "quantity", "total", "payment_type", "job_details"]
+DECIMAL_FIELDS = ["total", "cost", "paper_cost", "lami_cost", "enve_cost", "recieved", "bal_amt"]
+DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y")
+MAX_ERRORS = 50
+
+
+def column_fields(header):
+    """Job field for each header cell (None for columns that are ignored)"""
+    fields = [IMPORT_COLUMNS.get(str(cell or "").strip().lower().replace(" ", "_")) for cell in header]
+    missing = [field for field in REQUIRED_FIELDS if field not in fields]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return fields
+
+
+def parse_job_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    parsed = parse_date(text)
+    if parsed:
+        return parsed
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date: {text}")
+
+
+def clean_value(field, value):
+    """
+    Run a parsed value through the model field's own checks (max_length,
+    max_digits/decimal_places, finite decimals, ctp_no >= 0), so a bad
+    cell is reported against its row rather than failing the insert
+    """
+    try:
+        return Job._meta.get_field(field).clean(value, None)
+    except ValidationError as e:
+        raise ValueError(f"Invalid {field}: {'; '.join(e.messages)}")
+
+
+def build_job(fields, row):
+    """Job from one data row; raises ValueError with the first problem found"""
+    values = {}
+    for field, value in zip(fields, row):
+        if field is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ""):
+            if field in REQUIRED_FIELDS:
+                raise ValueError(f"{field} is required")
+            continue
+
+        if field == "date":
+            value = parse_job_date(value)
+        elif field in DECIMAL_FIELDS:
+            try:
+                value = Decimal(str(value).replace(",", ""))
+            except InvalidOperation:
+                raise ValueError(f"Invalid {field}: {value}")
+        elif field == "ctp_no":
+            try:
+                value = int(float(value))
+            except (ValueError, OverflowError):
+                raise ValueError(f"Invalid ctp_no: {value}")
+        else:
+            value = str(value)
+        values[field] = clean_value(field, value)
+
+    missing = [field for field in REQUIRED_FIELDS if field not in values]
+    if missing:
+        raise ValueError(f"{', '.join(missing)} required")
+    return Job(**values)
+
+
+def import_jobs(upload, batch_size=CHUNK_SIZE):
+    """
+    Insert the jobs of a CSV, gzip-CSV or XLSX upload in one transaction,
+    bulk_create-ing every batch_size rows. If any row is invalid nothing
+    is kept and the errors (up to MAX_ERRORS) are returned.
+
+    Returns (created, errors); errors are {"row", "message"} dicts with
+    spreadsheet row numbers (the header is row 1).
+    """
+    rows = upload_rows(upload)
+    fields = column_fields(next(rows, []))
+
+    created, errors, batch = 0, [], []
+    with transaction.atomic():
+        for number, row in enumerate(rows, start=2):
+            if not any(cell not in (None, "") for cell in row):
+                continue
+            try:
+                job = build_job(fields, row)
+            except ValueError as e:
+                errors.append({"row": number, "message": str(e)})
+                if len(errors) >= MAX_ERRORS:
+                    break
+                continue
+            if errors:
+                # Keep validating, but nothing more will be written
+                continue
+            batch.append(job)
+            if len(batch) >= batch_size:
+                Job.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+
+        if errors:
+            transaction.set_rollback(True)
+            return 0, errors
+        Job.objects.bulk_create(batch)
+        created += len(batch)
+
+    if created:
+        # bulk_create does not send post_save
+        versioning.bump(versioning.JOBS)
+    return created, errors
@@ -0,0 +1,110 @@
+import csv
+import gzip
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+
+import openpyxl
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from accounts.imports import read_user_sheet, validate_user_sheet
+from jobs.exports import EXPORT_FIELDS, EXPORT_HEADERS
+from jobs.imports import import_jobs
+from jobs.seeding import build_job, party_names
+
+FORMATS = ["csv", "csv.gz", "xlsx"]
+USER_HEADERS = ["First Name", "Last Name", "Email", "WhatsApp"]
+
+
+def write_file(path, headers, rows):
+    """Write rows to path as CSV, gzip-CSV or XLSX, chosen by its suffix"""
+    if path.name.endswith(".xlsx"):
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(headers)
+        for row in rows:
+            ws.append(row)
+        wb.save(path)
+        return
+    opener = gzip.open if path.name.endswith(".gz") else open
+    with opener(path, "wt", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        writer.writerows(rows)
+
+
+def job_rows(count, seed):
+    rng = random.Random(seed)
+    parties = party_names()
+    weights = [1 / (rank + 1) for rank in range(len(parties))]
+    start_date = timezone.localdate() - timedelta(days=365)
+    for _ in range(count):
+        job = build_job(rng, parties, weights, start_date, 365)
+        yield [getattr(job, field) for field in EXPORT_FIELDS]
+
+
+def user_rows(count):
+    for i in range(count):
+        yield [f"First{i}", f"Last{i}", f"bench.import{i}@example.com", f"8{i:09d}"]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare CSV, gzip-CSV and XLSX uploads: throughput and peak Python memory of '
+        'the job import (inserted, then rolled back) and of the user sheet dry run'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='Rows per generated file')
+        parser.add_argument('--target', choices=['jobs', 'users', 'both'], default='both')
+        parser.add_argument('--format', action='append', choices=FORMATS, help='Only this format (repeatable)')
+        parser.add_argument('--no-memory', action='store_true', help='Skip the (slower) tracemalloc pass')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        formats = options['format'] or FORMATS
+        targets = ['jobs', 'users'] if options['target'] == 'both' else [options['target']]
+        rows = options['rows']
+
+        with tempfile.TemporaryDirectory() as directory:
+            for target in targets:
+                self.stdout.write(f"\n{target}: {rows} rows")
+                self.stdout.write(f"  {'format':<8}{'file MB':>9}{'seconds':>9}{'rows/s':>10}{'peak MB':>9}")
+                for file_format in formats:
+                    path = Path(directory) / f"{target}.{file_format}"
+                    if target == 'jobs':
+                        write_file(path, EXPORT_HEADERS, job_rows(rows, options['seed']))
+                    else:
+                        write_file(path, USER_HEADERS, user_rows(rows))
+
+                    elapsed = self.run(target, path)
+                    peak = None
+                    if not options['no_memory']:
+                        tracemalloc.start()
+                        self.run(target, path)
+                        peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                        tracemalloc.stop()
+
+                    self.stdout.write(
+                        f"  {file_format:<8}{path.stat().st_size / (1024 * 1024):>9.1f}{elapsed:>9.2f}"
+                        f"{rows / elapsed:>10,.0f}{'-' if peak is None else f'{peak:.1f}':>9}"
+                    )
+                    path.unlink()
+
+    def run(self, target, path):
+        """Seconds for one import of the file; jobs are rolled back afterwards"""
+        with open(path, "rb") as upload:
+            start = time.perf_counter()
+            if target == 'jobs':
+                with transaction.atomic():
+                    created, errors = import_jobs(upload)
+                    transaction.set_rollback(True)
+                if errors:
+                    raise ValueError(f"Generated file did not import: {errors[:3]}")
+            else:
+                validate_user_sheet(read_user_sheet(upload))
+            return time.perf_counter() - start
@@ -0,0 +1,57 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from core.benchmarking import current_rss_mb
+from jobs.exports import iter_jobs_csv, write_jobs_xlsx
+from jobs.models import Job
+from jobs.seeding import seed_jobs
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the streaming job export and report memory use while exporting'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of jobs to export')
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--seed', action='store_true', help='Create jobs first if fewer than --rows exist')
+        parser.add_argument('--sample-every', type=int, default=100_000, help='Report RSS every N rows')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+
+        if options['seed']:
+            seed_jobs(rows - Job.objects.count(), stdout=self.stdout)
+
+        jobs = Job.objects.order_by('id')[:rows]
+        start_rss = current_rss_mb()
+        start = time.perf_counter()
+
+        if options['format'] == 'csv':
+            exported = -1  # header line
+            peak_rss = start_rss
+            with open(os.devnull, 'w') as sink:
+                for line in iter_jobs_csv(jobs):
+                    sink.write(line)
+                    exported += 1
+                    if exported and exported % options['sample_every'] == 0:
+                        rss = current_rss_mb()
+                        peak_rss = max(peak_rss, rss)
+                        self.stdout.write(f"{exported:>10} rows  RSS {rss:8.1f} MB")
+        else:
+            output = write_jobs_xlsx(jobs)
+            output.seek(0, os.SEEK_END)
+            self.stdout.write(f"XLSX size {output.tell() / (1024 * 1024):.1f} MB")
+            output.close()
+            exported = jobs.count()
+            peak_rss = current_rss_mb()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {exported} rows as {options['format']} in {elapsed:.1f}s "
+                f"({exported / elapsed if elapsed else 0:,.0f} rows/s); "
+                f"RSS start {start_rss:.1f} MB, peak {peak_rss:.1f} MB, "
+                f"growth {peak_rss - start_rss:.1f} MB"
+            )
+        )
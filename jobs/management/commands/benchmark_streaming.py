@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from core.benchmarking import current_rss_mb
+from core.streaming import stream_queryset
+from jobs.exports import EXPORT_FIELDS
+from jobs.models import Job
+from jobs.seeding import seed_jobs
+
+
+class Command(BaseCommand):
+    help = 'Measure memory while reading jobs through stream_queryset and fail if RSS grows with the row count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of jobs to read')
+        parser.add_argument('--mode', choices=['values', 'models', 'list'], default='values',
+                            help="values/models stream tuples or Job instances; list materializes the queryset for comparison")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--seed', action='store_true', help='Create jobs first if fewer than --rows exist')
+        parser.add_argument('--sample-every', type=int, default=100_000, help='Report RSS every N rows')
+        parser.add_argument('--max-growth', type=float, default=50.0,
+                            help='Fail if RSS grows by more than this many MB (ignored for --mode list)')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        mode = options['mode']
+
+        if options['seed']:
+            seed_jobs(rows - Job.objects.count(), stdout=self.stdout)
+
+        jobs = Job.objects.order_by('id')[:rows]
+        if mode != 'models':
+            jobs = jobs.values_list(*EXPORT_FIELDS)
+
+        start_rss = current_rss_mb()
+        peak_rss = start_rss
+        start = time.perf_counter()
+
+        source = list(jobs) if mode == 'list' else stream_queryset(jobs, options['chunk_size'])
+        read = 0
+        for _ in source:
+            read += 1
+            if read % options['sample_every'] == 0:
+                rss = current_rss_mb()
+                peak_rss = max(peak_rss, rss)
+                self.stdout.write(f"{read:>10} rows  RSS {rss:8.1f} MB")
+        peak_rss = max(peak_rss, current_rss_mb())
+        del source
+
+        elapsed = time.perf_counter() - start
+        growth = peak_rss - start_rss
+        self.stdout.write(
+            f"Read {read} rows ({mode}, {connection.vendor}) in {elapsed:.1f}s "
+            f"({read / elapsed if elapsed else 0:,.0f} rows/s); "
+            f"RSS start {start_rss:.1f} MB, peak {peak_rss:.1f} MB, growth {growth:.1f} MB"
+        )
+
+        if mode != 'list' and growth > options['max_growth']:
+            raise CommandError(f"RSS grew by {growth:.1f} MB, more than --max-growth {options['max_growth']} MB")
+        self.stdout.write(self.style.SUCCESS("OK"))
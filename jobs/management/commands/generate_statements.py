@@ -0,0 +1,97 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models.functions import Lower
+from django.utils.dateparse import parse_date
+from core.replica import replica_reads
+from jobs.exports import filter_jobs
+from jobs.statements import (
+    iter_party_statements, period_dirname, period_label,
+    statement_hash, statement_path, write_statement,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate per-party PDF statements from jobs. Statements whose content '
+        'has not changed since the last run are reused from the cache.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='First job date (YYYY-MM-DD)')
+        parser.add_argument('--date-to', help='Last job date (YYYY-MM-DD)')
+        parser.add_argument('--party', action='append', help='Only this party (repeatable)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Rendering processes; 1 renders in this process')
+        parser.add_argument('--output', default=str(settings.STATEMENT_ROOT), help='Statement directory')
+
+    @replica_reads()
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        date_from = self.parse_date_option(options, 'date_from')
+        date_to = self.parse_date_option(options, 'date_to')
+
+        jobs = filter_jobs({"date_from": options['date_from'], "date_to": options['date_to']})
+        if options['party']:
+            # Case-insensitive, like the statement download and the party grouping
+            jobs = jobs.annotate(party_lower=Lower('party_name')).filter(
+                party_lower__in=[party.strip().lower() for party in options['party']]
+            )
+
+        period = period_label(date_from, date_to)
+        directory = Path(options['output']) / period_dirname(date_from, date_to)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        rendered = cached = 0
+        workers = max(1, options['workers'])
+
+        if workers == 1:
+            for statement in iter_party_statements(jobs):
+                path = statement_path(directory, statement, statement_hash(statement, period))
+                if path.exists():
+                    cached += 1
+                    continue
+                write_statement(statement, period, path)
+                rendered += 1
+        else:
+            # Workers only render; all database access stays in this process
+            max_pending = workers * 4
+            pending = set()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for statement in iter_party_statements(jobs):
+                    path = statement_path(directory, statement, statement_hash(statement, period))
+                    if path.exists():
+                        cached += 1
+                        continue
+                    pending.add(pool.submit(write_statement, statement, period, path))
+                    if len(pending) >= max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        rendered += self.collect(done)
+                done, _ = wait(pending)
+                rendered += self.collect(done)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{rendered} statements rendered, {cached} unchanged, in {elapsed:.1f}s ({directory})"
+            )
+        )
+
+    def parse_date_option(self, options, name):
+        value = options[name]
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f"Invalid --{name.replace('_', '-')}: {value}")
+        return parsed
+
+    def collect(self, futures):
+        for future in futures:
+            # Re-raise rendering errors here instead of losing them in the pool
+            future.result()
+        return len(futures)
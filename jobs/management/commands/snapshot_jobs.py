@@ -0,0 +1,159 @@
+import json
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncMonth
+from core.replica import replica_reads
+from core.streaming import stream_queryset
+from jobs.exports import EXPORT_FIELDS
+from jobs.models import Job
+
+MONEY_FIELDS = ["total", "cost", "paper_cost", "lami_cost", "enve_cost", "recieved", "bal_amt"]
+MANIFEST_NAME = "manifest.json"
+
+
+class Command(BaseCommand):
+    help = (
+        'Snapshot jobs into monthly Parquet/Feather partitions plus a party balance table. '
+        'Only months whose contents changed since the last run are rewritten.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(settings.SNAPSHOT_ROOT), help='Snapshot directory')
+        parser.add_argument('--format', choices=['parquet', 'feather'], default='parquet')
+        parser.add_argument('--full', action='store_true', help='Rewrite every partition')
+
+    @replica_reads()
+    def handle(self, *args, **options):
+        try:
+            import pyarrow  # noqa: F401 - pandas needs it for both formats
+        except ImportError:
+            raise CommandError("pyarrow is required for snapshots: pip install pyarrow")
+
+        start = time.perf_counter()
+        output = Path(options['output'])
+        file_format = options['format']
+        jobs_dir = output / "jobs"
+        jobs_dir.mkdir(parents=True, exist_ok=True)
+
+        manifest = self.load_manifest(output)
+        if options['full'] or manifest.get("format") != file_format:
+            self.remove_partitions(jobs_dir, manifest["partitions"].values())
+            if manifest.get("format"):
+                (output / f"party_balances.{manifest['format']}").unlink(missing_ok=True)
+            manifest = {"format": file_format, "partitions": {}}
+
+        # One aggregate query tells us which months changed since the last run:
+        # deletions move the count or id range, edits move the newest updated_at
+        months = (
+            Job.objects.annotate(month=TruncMonth('date'))
+            .values('month')
+            .annotate(
+                rows=Count('id'), min_id=Min('id'), max_id=Max('id'),
+                total=Sum('total'), recieved=Sum('recieved'), bal_amt=Sum('bal_amt'),
+                updated=Max('updated_at'),
+            )
+            .order_by('month')
+        )
+
+        partitions = {}
+        written = 0
+        for month in months:
+            key = month['month'].strftime("%Y-%m")
+            fingerprint = [
+                str(month[f]) for f in ('rows', 'min_id', 'max_id', 'total', 'recieved', 'bal_amt', 'updated')
+            ]
+            filename = f"month={key}/part-0.{file_format}"
+            partitions[key] = {"file": filename, "rows": month['rows'], "fingerprint": fingerprint}
+
+            previous = manifest["partitions"].get(key)
+            if previous and previous["fingerprint"] == fingerprint and (jobs_dir / filename).exists():
+                continue
+
+            (jobs_dir / filename).parent.mkdir(exist_ok=True)
+            self.write_frame(self.month_frame(month['month']), jobs_dir / filename, file_format)
+            written += 1
+            self.stdout.write(f"Wrote {key}: {month['rows']} jobs")
+
+        # Drop partitions for months that no longer have any jobs
+        removed = [info for key, info in manifest["partitions"].items() if key not in partitions]
+        self.remove_partitions(jobs_dir, removed)
+
+        self.write_frame(self.party_balances_frame(), output / f"party_balances.{file_format}", file_format)
+
+        manifest["partitions"] = partitions
+        self.save_manifest(output, manifest)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Snapshot complete: {written} of {len(partitions)} partitions rewritten "
+                f"in {time.perf_counter() - start:.1f}s ({output})"
+            )
+        )
+
+    def month_frame(self, month_start):
+        next_month = (month_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        rows = stream_queryset(
+            Job.objects.filter(date__gte=month_start, date__lt=next_month)
+            .order_by('id')
+            .values_list('id', *EXPORT_FIELDS),
+            chunk_size=5000,
+        )
+        frame = pd.DataFrame.from_records(list(rows), columns=['id', *EXPORT_FIELDS])
+        frame['date'] = pd.to_datetime(frame['date'])
+        frame['ctp_no'] = frame['ctp_no'].astype('Int64')
+        frame[MONEY_FIELDS] = frame[MONEY_FIELDS].astype('float64')
+        return frame
+
+    def party_balances_frame(self):
+        balances = (
+            Job.objects.values('party_name')
+            .annotate(
+                jobs=Count('id'), total=Sum('total'), recieved=Sum('recieved'),
+                bal_amt=Sum('bal_amt'), first_date=Min('date'), last_date=Max('date'),
+            )
+            .order_by('party_name')
+        )
+        columns = ['party_name', 'jobs', 'total', 'recieved', 'bal_amt', 'first_date', 'last_date']
+        frame = pd.DataFrame.from_records(list(balances), columns=columns)
+        frame[['total', 'recieved', 'bal_amt']] = frame[['total', 'recieved', 'bal_amt']].astype('float64')
+        frame[['first_date', 'last_date']] = frame[['first_date', 'last_date']].apply(pd.to_datetime)
+        return frame
+
+    def write_frame(self, frame, path, file_format):
+        # Write next to the target and swap it in so readers never see half a file
+        tmp_path = path.with_name(path.name + ".tmp")
+        if file_format == "parquet":
+            frame.to_parquet(tmp_path, index=False)
+        else:
+            frame.to_feather(tmp_path)
+        os.replace(tmp_path, path)
+
+    def remove_partitions(self, jobs_dir, partitions):
+        for info in partitions:
+            path = jobs_dir / info["file"]
+            path.unlink(missing_ok=True)
+            try:
+                path.parent.rmdir()
+            except OSError:
+                pass
+            self.stdout.write(f"Removed {info['file']}")
+
+    def load_manifest(self, output):
+        try:
+            with open(output / MANIFEST_NAME) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"partitions": {}}
+
+    def save_manifest(self, output, manifest):
+        tmp_path = output / (MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, output / MANIFEST_NAME)
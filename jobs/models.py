@@ -21,6 +21,8 @@ class Job(models.Model):
     enve_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     recieved = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     bal_amt = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Lets snapshot_jobs spot edits to any column of a month's jobs
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.date} - {self.party_name} - {self.job_details}"
@@ -0,0 +1,103 @@
+# jobs/seeding.py
+# Synthetic jobs for load testing and benchmarks (see manage.py seed_data)
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from accounts import versioning
+
+from .models import Job
+
+PARTY_COUNT = 400
+
+# Relative weights, roughly what a small offset press sees
+PAPERS = {
+    "Maplitho 70": 30, "Maplitho 80": 20, "Art Paper 130": 14, "Art Card 300": 10,
+    "Duplex 250": 8, "Bond 90": 7, "Sticker": 6, "NS Paper": 5,
+}
+JOB_SIZES = {
+    "A4": 34, "A5": 14, "A3": 10, "1/4 Demy": 10, "1/8 Demy": 8,
+    "Visiting Card": 12, "Letter Head": 7, "Bill Book": 5,
+}
+PAYMENT_TYPES = {"Cash": 40, "Credit": 35, "UPI": 20, "Cheque": 5}
+QUANTITIES = {100: 10, 250: 15, 500: 25, 1000: 25, 2000: 15, 5000: 10}
+JOB_DETAILS = [
+    "Visiting cards", "Letterheads", "Bill books", "Brochures", "Wedding cards",
+    "Posters", "Stickers", "Envelopes", "Pamphlets", "Calendars",
+]
+PARTY_WORDS = ["Shree", "Sai", "Balaji", "Ganesh", "Laxmi", "Om", "Krishna", "New", "Royal", "Star"]
+PARTY_SUFFIXES = ["Traders", "Enterprises", "Agencies", "Stores", "Industries", "Printers"]
+
+
+def party_names(count=PARTY_COUNT):
+    """Deterministic party names; earlier names get more jobs (Zipf-like)"""
+    names = []
+    for i in range(count):
+        word = PARTY_WORDS[i % len(PARTY_WORDS)]
+        suffix = PARTY_SUFFIXES[(i // len(PARTY_WORDS)) % len(PARTY_SUFFIXES)]
+        names.append(f"{word} {suffix} {i + 1:03d}")
+    return names
+
+
+def build_job(rng, parties, party_weights, start_date, days):
+    quantity = rng.choices(list(QUANTITIES), weights=list(QUANTITIES.values()))[0]
+    payment_type = rng.choices(list(PAYMENT_TYPES), weights=list(PAYMENT_TYPES.values()))[0]
+    total = Decimal(quantity * rng.randint(40, 400)) / 100
+    paper_cost = (total * Decimal(rng.randint(25, 45)) / 100).quantize(Decimal("0.01"))
+    if payment_type in ("Cash", "UPI"):
+        recieved = total
+    else:
+        recieved = (total * Decimal(rng.choice([0, 0, 25, 50, 100])) / 100).quantize(Decimal("0.01"))
+    return Job(
+        date=start_date + timedelta(days=rng.randrange(days)),
+        party_name=rng.choices(parties, weights=party_weights)[0],
+        job_size=rng.choices(list(JOB_SIZES), weights=list(JOB_SIZES.values()))[0],
+        paper=rng.choices(list(PAPERS), weights=list(PAPERS.values()))[0],
+        quantity=str(quantity),
+        total=total,
+        payment_type=payment_type,
+        job_details=rng.choice(JOB_DETAILS),
+        ctp_no=rng.randint(1, 4),
+        cost=paper_cost,
+        paper_cost=paper_cost,
+        recieved=recieved,
+        bal_amt=total - recieved,
+    )
+
+
+def create_jobs(count, batch_size=5000, days=3 * 365, rng=None, progress=None):
+    """
+    bulk_create `count` jobs spread over the last `days` days.
+    progress, if given, is called with the number created so far after each batch.
+    """
+    rng = rng or random.Random()
+    parties = party_names()
+    party_weights = [1 / (rank + 1) for rank in range(len(parties))]
+    start_date = timezone.localdate() - timedelta(days=days)
+
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        Job.objects.bulk_create(
+            [build_job(rng, parties, party_weights, start_date, days) for _ in range(size)],
+            batch_size=batch_size,
+        )
+        created += size
+        if progress:
+            progress(created)
+
+    if created:
+        # bulk_create does not send post_save
+        versioning.bump(versioning.JOBS)
+    return created
+
+
+def seed_jobs(missing, batch_size=5000, stdout=None):
+    """Bulk-create synthetic jobs until `missing` more exist"""
+    if missing <= 0:
+        return
+    if stdout:
+        stdout.write(f"Creating {missing} jobs...")
+    create_jobs(missing, batch_size=batch_size)
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from accounts import versioning
+from .models import Job
+
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+def bump_jobs_version(sender, **kwargs):
+    versioning.bump(versioning.JOBS)
@@ -0,0 +1,177 @@
+# jobs/statements.py
+import hashlib
+import io
+import json
+import re
+from decimal import Decimal
+from itertools import groupby
+from xml.sax.saxutils import escape
+
+from django.db.models.functions import Lower
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from core.streaming import stream_queryset
+
+# Bump when the layout changes so cached statements get rebuilt
+TEMPLATE_VERSION = 1
+
+COMPANY_NAME = "Akshardeep Offset Printers"
+HEADERS = ["Date", "Job Details", "Size", "Qty", "Total", "Received", "Balance"]
+COLUMN_WIDTHS = [22 * mm, 62 * mm, 20 * mm, 16 * mm, 22 * mm, 22 * mm, 22 * mm]
+
+# Styles are built once per process and shared by every statement rendered in it
+_base_styles = getSampleStyleSheet()
+STYLES = {
+    "title": _base_styles["Title"],
+    "heading": _base_styles["Heading2"],
+    "normal": _base_styles["Normal"],
+    "cell": ParagraphStyle("StatementCell", parent=_base_styles["Normal"], fontSize=8, leading=10),
+    "right": ParagraphStyle("StatementRight", parent=_base_styles["Normal"], alignment=TA_RIGHT),
+}
+TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("ALIGN", (3, 1), (-1, -1), "RIGHT"),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+    ("BACKGROUND", (0, -1), (-1, -1), colors.beige),
+    ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+])
+
+STATEMENT_FIELDS = ["date", "job_details", "job_size", "quantity", "total", "recieved", "bal_amt"]
+
+
+def iter_party_statements(jobs):
+    """
+    Group a Job queryset into one statement dict per party. Names that
+    differ only in case ("ACME", "Acme") are one party, as in filter_jobs;
+    the statement carries the spelling of its earliest job.
+    Runs a single ordered query and streams it, so all parties can be
+    prepared without loading every job at once.
+    """
+    rows = stream_queryset(
+        jobs.order_by(Lower("party_name"), "date", "id")
+        .values_list(Lower("party_name"), "party_name", *STATEMENT_FIELDS)
+    )
+    for _, party_rows in groupby(rows, key=lambda row: row[0]):
+        party_rows = list(party_rows)
+        lines = [row[2:] for row in party_rows]
+        yield {
+            "party": party_rows[0][1],
+            "lines": lines,
+            "total": sum((line[4] for line in lines), Decimal("0")),
+            "recieved": sum((line[5] for line in lines), Decimal("0")),
+            "bal_amt": sum((line[6] for line in lines), Decimal("0")),
+        }
+
+
+def statement_hash(statement, period):
+    """Content hash of everything that ends up on the page"""
+    payload = json.dumps(
+        {"version": TEMPLATE_VERSION, "period": period, "statement": statement},
+        default=str,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def period_label(date_from=None, date_to=None):
+    if date_from and date_to:
+        return f"{date_from:%d-%m-%Y} to {date_to:%d-%m-%Y}"
+    if date_from:
+        return f"From {date_from:%d-%m-%Y}"
+    if date_to:
+        return f"Up to {date_to:%d-%m-%Y}"
+    return "All dates"
+
+
+def period_dirname(date_from=None, date_to=None):
+    """Cache sub-directory for a period, so statements of different periods never collide"""
+    if not (date_from or date_to):
+        return "all"
+    return "-".join(f"{d:%Y%m%d}" if d else "open" for d in (date_from, date_to))
+
+
+def party_slug(party):
+    return re.sub(r"[^A-Za-z0-9]+", "-", party).strip("-").lower() or "party"
+
+
+def party_key(party):
+    """
+    File name prefix for a party's cached statements. Different names can
+    share a slug ("A&B", "A B"), so a hash of the exact name is added.
+    """
+    return f"{party_slug(party)}-{hashlib.sha1(party.encode()).hexdigest()[:8]}"
+
+
+def statement_path(directory, statement, digest):
+    """
+    Cached PDF location for a statement. Older versions of the same party's
+    statement in that directory are removed, so each party keeps one file.
+    """
+    key = party_key(statement["party"])
+    path = directory / f"{key}-{digest[:16]}.pdf"
+    for old in directory.glob(f"{key}-{'?' * 16}.pdf"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return path
+
+
+def render_statement(statement, period):
+    """Render one party statement and return the PDF bytes"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4,
+        leftMargin=12 * mm, rightMargin=12 * mm, topMargin=12 * mm, bottomMargin=12 * mm,
+        title=f"Statement - {statement['party']}",
+    )
+
+    elements = [
+        Paragraph(COMPANY_NAME, STYLES["title"]),
+        Paragraph(f"Statement of Account: {escape(statement['party'])}", STYLES["heading"]),
+        Paragraph(f"Period: {period}", STYLES["normal"]),
+        Spacer(1, 6 * mm),
+    ]
+
+    data = [HEADERS]
+    for date, details, size, quantity, total, recieved, bal_amt in statement["lines"]:
+        data.append([
+            date.strftime("%d-%m-%Y"),
+            Paragraph(escape(details or "-"), STYLES["cell"]),
+            size or "-",
+            quantity or "-",
+            f"{total:,.2f}",
+            f"{recieved:,.2f}",
+            f"{bal_amt:,.2f}",
+        ])
+    data.append([
+        "", "Total", "", "",
+        f"{statement['total']:,.2f}",
+        f"{statement['recieved']:,.2f}",
+        f"{statement['bal_amt']:,.2f}",
+    ])
+
+    table = Table(data, colWidths=COLUMN_WIDTHS, repeatRows=1)
+    table.setStyle(TABLE_STYLE)
+    elements.append(table)
+    elements.append(Spacer(1, 6 * mm))
+    elements.append(Paragraph(f"Outstanding balance: {statement['bal_amt']:,.2f}", STYLES["right"]))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def write_statement(statement, period, path):
+    """Render a statement straight to disk; used as the process pool task"""
+    pdf = render_statement(statement, period)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(pdf)
+    tmp_path.replace(path)
+    return str(path)
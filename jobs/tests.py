@@ -1,3 +1,287 @@
+import csv
+import gzip
+import io
+import json
+import tempfile
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts.provisioning import provision_user
+
+from .exports import EXPORT_HEADERS, aiter_jobs_csv, filter_jobs, iter_jobs_csv
+from .imports import import_jobs
+from .models import Job
+from .statements import iter_party_statements, statement_hash, statement_path
+
+
+def make_job(**fields):
+    values = {
+        "date": date(2024, 1, 10), "party_name": "Acme Press", "job_size": "A4", "paper": "Maplitho 70",
+        "quantity": "500", "total": Decimal("1200.00"), "payment_type": "Cash", "job_details": "Letterheads",
+        "recieved": Decimal("1000.00"), "bal_amt": Decimal("200.00"),
+    }
+    values.update(fields)
+    return Job.objects.create(**values)
+
+
+def admin_user():
+    # An unusable password skips hashing; the tests log in with force_login
+    return provision_user("Admin", email="admin@example.com", password_hash="!")[0]
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.january = make_job(date=date(2024, 1, 10))
+        self.february = make_job(date=date(2024, 2, 5), party_name="ACME PRESS", payment_type="Credit")
+        self.other = make_job(date=date(2024, 2, 20), party_name="Other Party", job_details='Cards, "gold" foil')
+
+    def test_filter_jobs(self):
+        self.assertEqual(list(filter_jobs({})), [self.january, self.february, self.other])
+        self.assertEqual(
+            list(filter_jobs({"date_from": "2024-02-01", "date_to": "2024-02-10"})), [self.february],
+        )
+        self.assertEqual(list(filter_jobs({"party": " acme press "})), [self.january, self.february])
+        self.assertEqual(list(filter_jobs({"party": "Acme Press", "payment_type": "Cash"})), [self.january])
+        with self.assertRaisesMessage(ValueError, "Invalid date_to: 2024-13-01"):
+            filter_jobs({"date_to": "2024-13-01"})
+
+    def test_csv_export(self):
+        self.client.force_login(admin_user())
+        response = self.client.get(reverse("export_jobs"), {"party": "other party"})
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], EXPORT_HEADERS)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][:2], ["2024-02-20", "Other Party"])
+        self.assertEqual(rows[1][EXPORT_HEADERS.index("Job Details")], 'Cards, "gold" foil')
+        self.assertEqual(rows[1][EXPORT_HEADERS.index("Total")], "1200.00")
+
+    def test_xlsx_export(self):
+        self.client.force_login(admin_user())
+        response = self.client.get(reverse("export_jobs"), {"format": "xlsx", "date_from": "2024-02-01"})
+
+        sheet = openpyxl.load_workbook(io.BytesIO(b"".join(response.streaming_content))).active
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(list(rows[0]), EXPORT_HEADERS)
+        self.assertEqual([row[1] for row in rows[1:]], ["ACME PRESS", "Other Party"])
+        self.assertEqual(rows[1][EXPORT_HEADERS.index("Payment Type")], "Credit")
+
+    def test_export_rejects_bad_parameters(self):
+        self.client.force_login(admin_user())
+        self.assertEqual(self.client.get(reverse("export_jobs"), {"format": "pdf"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("export_jobs"), {"date_from": "soon"}).status_code, 400)
+
+    async def test_async_csv_matches_sync(self):
+        jobs = filter_jobs({"party": "acme press"})
+        lines = [line async for line in aiter_jobs_csv(jobs, chunk_size=1)]
+        self.assertEqual(lines, await sync_to_async(lambda: list(iter_jobs_csv(jobs)))())
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.output = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.january = make_job(date=date(2024, 1, 10))
+        self.february = make_job(date=date(2024, 2, 5), party_name="Other Party")
+
+    def snapshot(self):
+        stdout = io.StringIO()
+        call_command("snapshot_jobs", output=str(self.output), stdout=stdout)
+        return [line for line in stdout.getvalue().splitlines() if line.startswith(("Wrote", "Removed"))]
+
+    def partition(self, month):
+        return pd.read_parquet(self.output / "jobs" / f"month={month}" / "part-0.parquet")
+
+    def test_writes_monthly_partitions_and_party_balances(self):
+        self.assertEqual(self.snapshot(), ["Wrote 2024-01: 1 jobs", "Wrote 2024-02: 1 jobs"])
+
+        self.assertEqual(self.partition("2024-01")["id"].tolist(), [self.january.id])
+        balances = pd.read_parquet(self.output / "party_balances.parquet")
+        self.assertEqual(balances["party_name"].tolist(), ["Acme Press", "Other Party"])
+        self.assertEqual(balances["bal_amt"].tolist(), [200.0, 200.0])
+        manifest = json.loads((self.output / "manifest.json").read_text())
+        self.assertEqual(sorted(manifest["partitions"]), ["2024-01", "2024-02"])
+
+    def test_rewrites_only_months_that_changed(self):
+        self.snapshot()
+        self.assertEqual(self.snapshot(), [])
+
+        # No count, id range or money total moves; only updated_at does
+        self.january.narration = "Reprint"
+        self.january.save()
+        self.assertEqual(self.snapshot(), ["Wrote 2024-01: 1 jobs"])
+        self.assertEqual(self.partition("2024-01")["narration"].tolist(), ["Reprint"])
+
+        self.february.delete()
+        self.assertEqual(self.snapshot(), ["Removed month=2024-02/part-0.parquet"])
+        self.assertFalse((self.output / "jobs" / "month=2024-02").exists())
+
+
+class StatementTests(TestCase):
+    def setUp(self):
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(self.settings(STATEMENT_ROOT=self.root))
+        make_job(date=date(2024, 1, 10), party_name="Acme Press")
+        make_job(date=date(2024, 2, 5), party_name="ACME PRESS", total=Decimal("800.00"), bal_amt=Decimal("800.00"))
+        make_job(date=date(2024, 2, 20), party_name="Other Party")
+
+    def download(self, **params):
+        self.client.force_login(admin_user())
+        response = self.client.get(reverse("party_statement"), params)
+        if response.status_code == 200:
+            b"".join(response.streaming_content)
+        return response
+
+    def cached_files(self):
+        return sorted(path.name for path in self.root.glob("*/*.pdf"))
+
+    def test_party_names_differing_in_case_share_a_statement(self):
+        statements = list(iter_party_statements(Job.objects.all()))
+
+        self.assertEqual([statement["party"] for statement in statements], ["Acme Press", "Other Party"])
+        self.assertEqual(len(statements[0]["lines"]), 2)
+        self.assertEqual(statements[0]["total"], Decimal("2000.00"))
+        self.assertEqual(statements[0]["bal_amt"], Decimal("1000.00"))
+
+    def test_download_renders_once_until_the_jobs_change(self):
+        response = self.download(party="acme press")
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertIn('filename="statement_acme-press.pdf"', response["Content-Disposition"])
+        [first] = self.cached_files()
+
+        self.download(party="ACME PRESS")
+        self.assertEqual(self.cached_files(), [first])
+
+        make_job(date=date(2024, 3, 1), party_name="acme press")
+        self.download(party="Acme Press")
+        [second] = self.cached_files()
+        self.assertNotEqual(second, first)
+
+        self.assertEqual(self.download(party="Nobody").status_code, 404)
+        self.assertEqual(self.download().status_code, 400)
+
+    def test_generate_statements_matches_parties_case_insensitively(self):
+        stdout = io.StringIO()
+        call_command("generate_statements", party=["acme press"], workers=1, output=str(self.root), stdout=stdout)
+        call_command("generate_statements", party=["acme press"], workers=1, output=str(self.root), stdout=stdout)
+
+        self.assertEqual(len(self.cached_files()), 1)
+        self.assertIn("0 statements rendered, 1 unchanged", stdout.getvalue())
+
+    def test_parties_with_the_same_slug_keep_separate_files(self):
+        directory = self.root / "all"
+        directory.mkdir()
+        paths = []
+        for party in ("A&B Traders", "A B Traders"):
+            statement = {"party": party, "lines": [], "total": 0, "recieved": 0, "bal_amt": 0}
+            path = statement_path(directory, statement, statement_hash(statement, "All dates"))
+            path.write_bytes(b"%PDF")
+            paths.append(path)
+
+        self.assertNotEqual(paths[0], paths[1])
+        self.assertTrue(all(path.exists() for path in paths))
+
+
+IMPORT_HEADER = ["Date", "Party Name", "Job Size", "Paper", "Quantity", "Total", "Payment Type", "Job Details", "CTP No"]
+
+
+def csv_bytes(rows):
+    output = io.StringIO()
+    csv.writer(output).writerows(rows)
+    return output.getvalue().encode()
+
+
+def xlsx_bytes(rows):
+    wb = openpyxl.Workbook()
+    for row in rows:
+        wb.active.append(row)
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+class ImportTests(TestCase):
+    rows = [
+        IMPORT_HEADER,
+        ["10/01/2024", "Acme Press", "A4", "Maplitho 70", "500", "1,200.50", "Cash", "Letterheads", "7"],
+        ["2024-02-05", "Other Party", "A5", "Bond 90", "250", "300", "Credit", "Bill books", ""],
+    ]
+
+    def assert_imported(self, upload):
+        self.assertEqual(import_jobs(upload), (2, []))
+        jobs = list(Job.objects.order_by("date").values_list("date", "party_name", "total", "ctp_no"))
+        self.assertEqual(jobs, [
+            (date(2024, 1, 10), "Acme Press", Decimal("1200.50"), 7),
+            (date(2024, 2, 5), "Other Party", Decimal("300.00"), None),
+        ])
+
+    def test_csv(self):
+        self.assert_imported(SimpleUploadedFile("jobs.csv", csv_bytes(self.rows)))
+
+    def test_gzip_csv(self):
+        self.assert_imported(SimpleUploadedFile("jobs.csv.gz", gzip.compress(csv_bytes(self.rows))))
+
+    def test_xlsx(self):
+        rows = [self.rows[0], [date(2024, 1, 10), "Acme Press", "A4", "Maplitho 70", 500, 1200.5, "Cash", "Letterheads", 7]]
+        rows.append(self.rows[2])
+        self.assert_imported(SimpleUploadedFile("jobs.xlsx", xlsx_bytes(rows)))
+
+    def test_export_loads_back(self):
+        make_job(narration="Rush", ctp_no=3)
+        exported = b"".join(line.encode() for line in iter_jobs_csv(Job.objects.all()))
+        Job.objects.all().delete()
+
+        self.assertEqual(import_jobs(SimpleUploadedFile("jobs.csv", exported)), (1, []))
+        job = Job.objects.get()
+        self.assertEqual((job.narration, job.ctp_no, job.bal_amt), ("Rush", 3, Decimal("200.00")))
+
+    def test_missing_columns(self):
+        upload = SimpleUploadedFile("jobs.csv", csv_bytes([IMPORT_HEADER[:5], ["10/01/2024", "Acme", "A4", "Bond", "1"]]))
+        with self.assertRaisesMessage(ValueError, "Missing columns: total, payment_type, job_details"):
+            import_jobs(upload)
+
+    def test_invalid_rows_roll_back_everything(self):
+        rows = [
+            *self.rows,
+            ["31/02/2024", "Acme Press", "A4", "Maplitho 70", "500", "100", "Cash", "Cards", ""],
+            ["2024-03-01", "", "A4", "Maplitho 70", "500", "100", "Cash", "Cards", ""],
+            ["2024-03-01", "Acme Press", "A4", "Maplitho 70", "500", "10000000000", "Cash", "Cards", ""],
+            ["2024-03-01", "Acme Press", "A4", "Maplitho 70", "500", "12.345", "Cash", "Cards", "-1"],
+            ["2024-03-01", "Acme Press", "A4", "Maplitho 70", "500", "NaN", "Cash", "Cards", ""],
+            ["2024-03-01", "Acme Press", "A4", "Maplitho 70", "500", "100", "Cash", "Cards", "1e400"],
+        ]
+
+        created, errors = import_jobs(SimpleUploadedFile("jobs.csv", csv_bytes(rows)), batch_size=1)
+
+        self.assertEqual(created, 0)
+        self.assertEqual([error["row"] for error in errors], [4, 5, 6, 7, 8, 9])
+        self.assertEqual(errors[0]["message"], "Invalid date: 31/02/2024")
+        self.assertEqual(errors[1]["message"], "party_name is required")
+        self.assertEqual(
+            [error["message"].split(":")[0] for error in errors[2:]],
+            ["Invalid total", "Invalid total", "Invalid total", "Invalid ctp_no"],
+        )
+        self.assertIn("no more than 10 digits before the decimal point", errors[2]["message"])
+        self.assertFalse(Job.objects.exists())
+
+    def test_upload_view(self):
+        self.client.force_login(admin_user())
+        url = reverse("upload_jobs")
+
+        response = self.client.post(url, {"jobs_file": SimpleUploadedFile("jobs.csv", csv_bytes(self.rows))})
+        self.assertEqual(response.json(), {"success": True, "message": "Successfully imported 2 jobs"})
 
-# Create your tests here.
+        bad = [IMPORT_HEADER, ["2024-03-01", "Acme Press", "A4", "Bond", "1", "abc", "Cash", "Cards", ""]]
+        response = self.client.post(url, {"jobs_file": SimpleUploadedFile("jobs.csv", csv_bytes(bad))})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"], [{"row": 2, "message": "Invalid total: abc"}])
+        self.assertEqual(Job.objects.count(), 2)
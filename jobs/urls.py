@@ -1,6 +1,12 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+io_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path("dashboard/", views.dashboard, name="jobs_dashboard"),
+    path("export/", io_views.export_jobs, name="export_jobs"),
+    path("import/", views.upload_jobs, name="upload_jobs"),
+    path("statement/", views.party_statement, name="party_statement"),
 ]
\ No newline at end of file
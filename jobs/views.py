@@ -1,6 +1,107 @@
+import csv
+from zipfile import BadZipFile
+
+from django.conf import settings
 from django.shortcuts import render
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_POST
+from accounts.views import is_admin
+from core.replica import use_replica
+from .exports import filter_jobs, iter_jobs_csv, write_jobs_xlsx
+from .imports import import_jobs
+from .statements import (
+    iter_party_statements, party_slug, period_dirname, period_label,
+    statement_hash, statement_path, write_statement,
+)
 
 @login_required
 def dashboard(request):
-    return render(request, "jobs/dashboard.html")
\ No newline at end of file
+    return render(request, "jobs/dashboard.html")
+
+@login_required
+@user_passes_test(is_admin)
+@use_replica
+def export_jobs(request):
+    """Stream jobs as CSV or XLSX, filtered by date range, party and payment type"""
+    export_format = request.GET.get("format", "csv").lower()
+    if export_format not in ("csv", "xlsx"):
+        return JsonResponse({"success": False, "message": f"Unsupported format: {export_format}"}, status=400)
+
+    try:
+        jobs = filter_jobs(request.GET)
+    except ValueError as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    filename = f"jobs_{timezone.localdate():%Y%m%d}.{export_format}"
+
+    if export_format == "xlsx":
+        return FileResponse(
+            write_jobs_xlsx(jobs),
+            as_attachment=True,
+            filename=filename,
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+    response = StreamingHttpResponse(iter_jobs_csv(jobs), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+@login_required
+@user_passes_test(is_admin)
+@use_replica
+def party_statement(request):
+    """Download one party's PDF statement, rendering it only if the jobs changed"""
+    party = request.GET.get("party", "").strip()
+    if not party:
+        return JsonResponse({"success": False, "message": "party is required"}, status=400)
+
+    try:
+        jobs = filter_jobs(request.GET)
+    except ValueError as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    statement = next(iter_party_statements(jobs), None)
+    if statement is None:
+        return JsonResponse({"success": False, "message": f"No jobs found for {party}"}, status=404)
+
+    date_from = parse_date(request.GET.get("date_from") or "")
+    date_to = parse_date(request.GET.get("date_to") or "")
+    period = period_label(date_from, date_to)
+    directory = settings.STATEMENT_ROOT / period_dirname(date_from, date_to)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    path = statement_path(directory, statement, statement_hash(statement, period))
+    if not path.exists():
+        write_statement(statement, period, path)
+
+    return FileResponse(
+        open(path, "rb"),
+        as_attachment=True,
+        filename=f"statement_{party_slug(statement['party'])}.pdf",
+        content_type="application/pdf",
+    )
+
+@login_required
+@user_passes_test(is_admin)
+@require_POST
+def upload_jobs(request):
+    """Load jobs from a CSV, gzip-CSV or XLSX file laid out like the export"""
+    upload = request.FILES.get("jobs_file")
+    if upload is None:
+        return JsonResponse({"success": False, "message": "No file provided"}, status=400)
+
+    try:
+        created, errors = import_jobs(upload)
+    except (ValueError, OSError, csv.Error, BadZipFile) as e:
+        return JsonResponse({"success": False, "message": f"Error processing file: {e}"}, status=400)
+
+    if errors:
+        return JsonResponse({
+            "success": False,
+            "message": f"{len(errors)} invalid rows, nothing imported",
+            "errors": errors,
+        }, status=400)
+    return JsonResponse({"success": True, "message": f"Successfully imported {created} jobs"})